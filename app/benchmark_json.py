@@ -0,0 +1,87 @@
+"""
+Compare la sérialisation des listes de fiches : chemin par défaut de FastAPI
+(serialize_response avec le champ du response_model, puis JSONResponse.render)
+et chemin rapide de routers.utils.json_list (TypeAdapter précompilé, JSON écrit
+par pydantic-core). Les versions récentes de FastAPI prennent d'elles-mêmes un
+raccourci dump_json quand la route n'a pas de response_class : le chemin par
+défaut mesuré ici est celui des autres cas.
+
+Usage : python benchmark_json.py [répétitions]
+"""
+
+import asyncio
+import datetime
+import json
+import sys
+import time
+import uuid
+from types import SimpleNamespace
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from serializers.ficheLapin import FicheLapinWithAuthor, fiche_lapin_list_adapter
+
+ROWS = (1_000, 10_000)
+
+# Construit une fois, comme route.response_field au chargement de l'application
+response_field = create_model_field(
+    name="Response_benchmark", type_=list[FicheLapinWithAuthor], mode="serialization"
+)
+loop = asyncio.new_event_loop()
+
+
+def make_fiches(count: int) -> list:
+    """Objets à attributs, comme les instances ORM renvoyées par les services."""
+    now = datetime.datetime(2024, 1, 1)
+    author = SimpleNamespace(
+        id="auteur", username="benevole", firstName="Jeanne", lastName="Martin", email="j@m.fr", role="benevole"
+    )
+    return [
+        SimpleNamespace(**{
+            **dict.fromkeys(FicheLapinWithAuthor.model_fields),
+            "id": str(uuid.uuid4()),
+            "nom": f"Lapin {i}",
+            "auteur_id": "auteur",
+            "numero_arrivee_association": i,
+            "date_creation_fiche": now,
+            "date_arrivee_association": now,
+            "sexe": "F",
+            "poids_actuel": 1800,
+            "caractere": "calme",
+            "auteur": author,
+        })
+        for i in range(count)
+    ]
+
+
+def default_path(fiches: list) -> bytes:
+    # Ce que fait FastAPI pour response_model=list[FicheLapinWithAuthor] puis JSONResponse
+    content = loop.run_until_complete(serialize_response(field=response_field, response_content=fiches))
+    return JSONResponse(content).body
+
+
+def fast_path(fiches: list) -> bytes:
+    adapter = fiche_lapin_list_adapter
+    return adapter.dump_json(adapter.validate_python(fiches, from_attributes=True))
+
+
+def measure(fn, fiches: list, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(fiches)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"{'lignes':>8} {'défaut (ms)':>12} {'rapide (ms)':>12} {'gain':>6} {'lignes/s (rapide)':>18}")
+    for rows in ROWS:
+        fiches = make_fiches(rows)
+        assert json.loads(default_path(fiches)) == json.loads(fast_path(fiches))
+        slow = measure(default_path, fiches, repeat)
+        fast = measure(fast_path, fiches, repeat)
+        print(f"{rows:>8} {slow * 1000:>12.1f} {fast * 1000:>12.1f} {slow / fast:>5.1f}x {rows / fast:>18,.0f}")
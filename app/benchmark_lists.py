@@ -0,0 +1,95 @@
+"""
+Compare la lecture de la liste des fiches : chemin ORM (objets FicheLapin,
+auteurs par selectinload) et chemin Core de services.ficheLapin (lignes et
+auteur joint dans la même requête). Chaque mesure parcourt toute la table page
+par page, une session par page comme une requête HTTP, sérialisation comprise.
+
+Usage : python benchmark_lists.py [répétitions]
+"""
+
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from database import BaseSQL
+from models import FicheLapin, User
+from serializers.ficheLapin import fiche_lapin_list_adapter
+from services.ficheLapin import FICHES_ORDER_BY, get_all_ficheslapin, select_ficheslapin
+from services.pagination import PAGE_SIZE_MAX, make_page
+
+ROWS = (1_000, 10_000)
+AUTHORS = 20
+
+
+def make_engine(count: int):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    BaseSQL.metadata.create_all(engine)
+    start = datetime(2024, 1, 1)
+    with engine.begin() as connection:
+        connection.execute(insert(User), [
+            {"id": f"u{i}", "username": f"benevole_{i}", "password": "x", "role": "benevole"} for i in range(AUTHORS)
+        ])
+        connection.execute(insert(FicheLapin), [
+            {
+                "id": f"f{i:06}", "nom": f"Lapin {i}", "numero_arrivee_association": i,
+                "date_creation_fiche": start + timedelta(minutes=i), "sexe": "F", "poids_actuel": 1800,
+                "caractere": "calme", "auteur_id": f"u{i % AUTHORS}",
+            }
+            for i in range(count)
+        ])
+    return engine
+
+
+def orm_page(db: Session, cursor: str):
+    stmt, limit = select_ficheslapin(cursor=cursor, limit=PAGE_SIZE_MAX)
+    return make_page(db.execute(stmt).scalars().all(), FICHES_ORDER_BY, limit)
+
+
+def core_page(db: Session, cursor: str):
+    return get_all_ficheslapin(db=db, cursor=cursor, limit=PAGE_SIZE_MAX)
+
+
+def walk(engine, fetch) -> tuple[int, int]:
+    """Parcourt toutes les pages : (fiches lues, requêtes SQL)."""
+    queries = []
+    listener = lambda *args: queries.append(1)
+    event.listen(engine, "before_cursor_execute", listener)
+    rows, cursor = 0, None
+    try:
+        while True:
+            with Session(engine) as db:
+                page = fetch(db, cursor)
+                adapter = fiche_lapin_list_adapter
+                adapter.dump_json(adapter.validate_python(page.items, from_attributes=True))
+            rows += len(page.items)
+            cursor = page.next_cursor
+            if cursor is None:
+                return rows, len(queries)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+
+def measure(engine, fetch, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        walk(engine, fetch)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"{'lignes':>8} {'ORM (ms)':>10} {'Core (ms)':>10} {'gain':>6} {'requêtes ORM/Core':>18}")
+    for count in ROWS:
+        engine = make_engine(count)
+        (orm_rows, orm_queries), (core_rows, core_queries) = walk(engine, orm_page), walk(engine, core_page)
+        assert orm_rows == core_rows == count
+        orm = measure(engine, orm_page, repeat)
+        core = measure(engine, core_page, repeat)
+        print(f"{count:>8} {orm * 1000:>10.1f} {core * 1000:>10.1f} {orm / core:>5.1f}x {orm_queries:>9}/{core_queries}")
+        engine.dispose()
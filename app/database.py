@@ -1,29 +1,367 @@
+import functools
+import hashlib
+import inspect
 import os
+import random
+import threading
+import time
+from contextlib import contextmanager
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 POSTGRES_USER = os.environ.get("POSTGRES_USER")
 POSTGRES_PASSWORD = os.environ.get("POSTGRES_PASSWORD")
 POSTGRES_DB = os.environ.get("POSTGRES_DB")
+POSTGRES_HOST = os.environ.get("POSTGRES_HOST", "db")
+POSTGRES_PORT = os.environ.get("POSTGRES_PORT", "5432")
 
+# Active le chemin asynchrone (AsyncSession + services *_async)
+DATABASE_ASYNC = os.environ.get("DATABASE_ASYNC", "false").lower() in ("1", "true", "yes")
 
-SQLALCHEMY_DATABASE_URL = (
-    f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@db/{POSTGRES_DB}"
+# Réglages du pool de connexions
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# Nombre de connexions ouvertes au démarrage (par défaut : la taille du pool)
+DB_POOL_WARMUP = int(os.environ.get("DB_POOL_WARMUP", str(DB_POOL_SIZE)))
+
+
+SQLALCHEMY_DATABASE_URL = os.environ.get("DATABASE_URL") or (
+    f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}"
+    f"@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
 )
 
+# Réplicas en lecture seule, séparés par des virgules (vide : tout va sur le primaire)
+DATABASE_REPLICA_URLS = [
+    url.strip() for url in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+]
+# Durée pendant laquelle un appelant qui vient d'écrire lit sur le primaire
+DATABASE_PRIMARY_PIN_SECONDS = float(os.environ.get("DATABASE_PRIMARY_PIN_SECONDS", "5"))
+
+
+def to_async_url(url: str) -> str:
+    """Convertit une URL synchrone vers le driver asynchrone correspondant."""
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    if url.startswith("postgresql+psycopg2://"):
+        return url.replace("postgresql+psycopg2://", "postgresql+asyncpg://", 1)
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return url
+
+
+# ============================================================================
+# STATISTIQUES DU POOL
+# ============================================================================
+class PoolStatistics:
+    """Compteurs cumulés d'un pool : emprunts, attentes, timeouts, débordement."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.timeouts = 0
+        self.overflow_peak = 0
+
+    def record_checkout(self, waited: bool, elapsed: float, overflow: int):
+        with self._lock:
+            self.checkouts += 1
+            if waited:
+                self.waits += 1
+                self.wait_time_total += elapsed
+                self.wait_time_max = max(self.wait_time_max, elapsed)
+            self.overflow_peak = max(self.overflow_peak, overflow)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "wait_time_total_ms": round(self.wait_time_total * 1000, 3),
+                "wait_time_max_ms": round(self.wait_time_max * 1000, 3),
+                "timeouts": self.timeouts,
+                "overflow_peak": self.overflow_peak,
+            }
+
+
+# Une entrée par pool, indexée par son pool_logging_name
+POOL_STATISTICS: dict[str, PoolStatistics] = {}
+
+
+class _InstrumentedPoolMixin:
+    """Mesure chaque emprunt de connexion et le temps passé à attendre un slot libre."""
+
+    def _do_get(self):
+        stats = POOL_STATISTICS.setdefault(self._orig_logging_name or "default", PoolStatistics())
+        # Pool saturé à l'entrée : cet emprunt va attendre une restitution.
+        # Débordement illimité (max_overflow < 0) ou pool sans taille : jamais d'attente.
+        bounded = self._max_overflow >= 0 and self.size() > 0
+        waited = bounded and self.checkedout() >= self.size() + self._max_overflow
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            stats.record_timeout()
+            raise
+        stats.record_checkout(waited, time.perf_counter() - start, max(self.overflow(), 0))
+        return connection
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _engine_options(url: str, name: str) -> dict:
+    options = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "pool_logging_name": name,
+    }
+    if url.startswith("sqlite"):
+        # La session est créée et utilisée dans des threads différents
+        options["connect_args"] = {"check_same_thread": False}
+    return options
+
+
+def create_db_engine(url: str, name: str = "primary"):
+    """Crée un moteur synchrone avec un pool instrumenté et configuré par l'environnement."""
+    return create_engine(url, poolclass=InstrumentedQueuePool, **_engine_options(url, name))
+
+
+def create_async_db_engine(url: str, name: str = "primary-async"):
+    """Crée un moteur asynchrone avec un pool instrumenté et configuré par l'environnement."""
+    url = to_async_url(url)
+    options = _engine_options(url, name)
+    options.pop("connect_args", None)
+    return create_async_engine(url, poolclass=InstrumentedAsyncQueuePool, **options)
+
+
+def _pool(db_engine):
+    return getattr(db_engine, "sync_engine", db_engine).pool
+
+
+def pool_name(db_engine) -> str:
+    return _pool(db_engine)._orig_logging_name or "default"
+
+
+def pool_statistics(*engines) -> dict:
+    """État instantané (taille, empruntées, débordement) et compteurs cumulés de chaque pool."""
+    engines = engines or tuple(
+        e for e in (engine, async_engine, *replica_engines, *async_replica_engines) if e is not None
+    )
+    statistics = {}
+    for db_engine in engines:
+        pool = _pool(db_engine)
+        name = pool_name(db_engine)
+        statistics[name] = {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+            **POOL_STATISTICS.setdefault(name, PoolStatistics()).as_dict(),
+        }
+    return statistics
+
+
+def warm_up_pool(db_engine, connections: int = DB_POOL_WARMUP) -> int:
+    """Ouvre `connections` connexions puis les rend au pool, qui les garde ouvertes."""
+    opened = [db_engine.connect() for _ in range(min(connections, _pool(db_engine).size()))]
+    for connection in opened:
+        connection.close()
+    return len(opened)
+
+
+async def warm_up_async_pool(db_engine, connections: int = DB_POOL_WARMUP) -> int:
+    """Équivalent asynchrone de warm_up_pool."""
+    opened = [await db_engine.connect() for _ in range(min(connections, _pool(db_engine).size()))]
+    for connection in opened:
+        await connection.close()
+    return len(opened)
+
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=True, bind=engine)
+async def warm_up_pools() -> dict:
+    """Préchauffe les pools utilisés par les routers (primaire et réplicas) ; renvoie {pool: connexions}."""
+    if DATABASE_ASYNC:
+        return {pool_name(e): await warm_up_async_pool(e) for e in (async_engine, *async_replica_engines)}
+    return {pool_name(e): warm_up_pool(e) for e in (engine, *replica_engines)}
+
+
+# ============================================================================
+# ROUTAGE PRIMAIRE / RÉPLICAS
+# ============================================================================
+class PrimaryPins:
+    """Appelants ayant écrit récemment, épinglés sur le primaire (read-your-writes)."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self._lock = threading.Lock()
+        self._deadlines: dict[str, float] = {}
+
+    def pin(self, caller: str):
+        with self._lock:
+            now = time.monotonic()
+            # Purge opportuniste des épinglages expirés
+            self._deadlines = {c: d for c, d in self._deadlines.items() if d > now}
+            self._deadlines[caller] = now + self.seconds
+
+    def is_pinned(self, caller: str) -> bool:
+        with self._lock:
+            return self._deadlines.get(caller, 0.0) > time.monotonic()
+
+
+class RoutingSession(Session):
+    """
+    Session qui envoie les lectures marquées read_only vers un réplica.
+
+    Les écritures (flush, INSERT/UPDATE/DELETE) vont toujours sur le primaire, et
+    l'appelant reste épinglé sur le primaire pendant `pins.seconds` après son commit.
+
+    Le choix du réplica (ou du primaire si l'appelant est épinglé) est fait à la
+    première lecture read_only puis gardé jusqu'à la prochaine écriture : les
+    compteurs des ETag et les données d'une même requête sont lus au même endroit.
+    """
+
+    def __init__(self, primary=None, replicas=(), pins=None, **kw):
+        super().__init__(**kw)
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.pins = pins
+        self._read_bind = None
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or (clause is not None and getattr(clause, "is_dml", False)):
+            self.info["wrote"] = True
+            self._read_bind = None
+            return self.primary
+        if self.replicas and self.info.get("read_only"):
+            if self._read_bind is None:
+                self._read_bind = self.primary if self._caller_pinned() else random.choice(self.replicas)
+            return self._read_bind
+        return self.primary
+
+    def _caller_pinned(self) -> bool:
+        caller = self.info.get("caller")
+        return caller is not None and self.pins is not None and self.pins.is_pinned(caller)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _pin_caller_after_write(session):
+    if session.info.pop("wrote", False) and session.pins is not None:
+        caller = session.info.get("caller")
+        if caller is not None:
+            session.pins.pin(caller)
+
+
+@contextmanager
+def use_replica(db):
+    """Marque les requêtes du bloc comme lecture seule (routables vers un réplica)."""
+    previous = db.info.get("read_only", False)
+    db.info["read_only"] = True
+    try:
+        yield db
+    finally:
+        db.info["read_only"] = previous
+
+
+def read_only(service):
+    """Décorateur de service : ses requêtes sur l'argument `db` peuvent aller sur un réplica."""
+    signature = inspect.signature(service)
+
+    def _session(args, kwargs):
+        return signature.bind_partial(*args, **kwargs).arguments["db"]
+
+    if inspect.iscoroutinefunction(service):
+        @functools.wraps(service)
+        async def async_wrapper(*args, **kwargs):
+            with use_replica(_session(args, kwargs)):
+                return await service(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(service)
+    def wrapper(*args, **kwargs):
+        with use_replica(_session(args, kwargs)):
+            return service(*args, **kwargs)
+    return wrapper
+
+
+def caller_key(request: Request) -> str:
+    """Identifie l'appelant pour l'épinglage : son token s'il en a un, sinon son adresse."""
+    authorization = request.headers.get("authorization")
+    if authorization:
+        return hashlib.sha256(authorization.encode()).hexdigest()
+    return request.client.host if request.client else "anonymous"
+
+
+engine = create_db_engine(SQLALCHEMY_DATABASE_URL)
+replica_engines = [
+    create_db_engine(url, name=f"replica-{i}") for i, url in enumerate(DATABASE_REPLICA_URLS)
+]
+primary_pins = PrimaryPins(DATABASE_PRIMARY_PIN_SECONDS)
+SessionLocal = sessionmaker(
+    class_=RoutingSession,
+    autocommit=False,
+    autoflush=True,
+    primary=engine,
+    replicas=replica_engines,
+    pins=primary_pins,
+)
+
+# Le moteur asynchrone n'ouvre aucune connexion tant qu'il n'est pas utilisé
+async_engine = create_async_db_engine(SQLALCHEMY_DATABASE_URL) if DATABASE_ASYNC else None
+async_replica_engines = [
+    create_async_db_engine(url, name=f"replica-{i}-async")
+    for i, url in enumerate(DATABASE_REPLICA_URLS)
+] if DATABASE_ASYNC else []
+AsyncSessionLocal = async_sessionmaker(
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    autoflush=True,
+    expire_on_commit=False,
+    primary=async_engine.sync_engine if async_engine is not None else None,
+    replicas=[e.sync_engine for e in async_replica_engines],
+    pins=primary_pins,
+)
 
 BaseSQL = declarative_base()
 
 
-def get_db():
+def get_sync_db(request: Request):
     try:
         db = SessionLocal()
+        db.info["caller"] = caller_key(request)
         yield db
     finally:
         db.close()
 
+
+async def get_async_db(request: Request):
+    async with AsyncSessionLocal() as db:
+        db.info["caller"] = caller_key(request)
+        yield db
+
+
+# Dépendance utilisée par les routers : session synchrone ou AsyncSession
+get_db = get_async_db if DATABASE_ASYNC else get_sync_db
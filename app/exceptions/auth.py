@@ -0,0 +1,6 @@
+class PasswordHashingBusy(Exception):
+    pass
+
+
+class InvalidRefreshToken(Exception):
+    pass
@@ -0,0 +1,6 @@
+class InvalidExportColumns(Exception):
+    pass
+
+
+class ExportFormatUnavailable(Exception):
+    pass
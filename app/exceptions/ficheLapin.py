@@ -8,3 +8,15 @@ class FicheLapinAlreadyExists(Exception):
 
 class WrongAuthor(Exception):
     pass
+
+
+class InvalidFields(Exception):
+    pass
+
+
+class InvalidFilter(Exception):
+    pass
+
+
+class InvalidSort(Exception):
+    pass
@@ -0,0 +1,54 @@
+"""
+Export des tables vers CSV ou Parquet, pour les tableurs et les notebooks.
+
+    python export.py fiches --format csv -o fiches.csv
+    python export.py posts --format parquet -o posts.parquet
+    python export.py fiches --columns nom,sexe,date_creation_fiche --from 2024-01-01 --to 2024-12-31 -o 2024.csv
+
+Même flux que GET /ficheslapin/export.{format} : lecture par lots sur un
+curseur côté serveur, écriture au fil de l'eau (Parquet : pip install pyarrow).
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime
+
+from database import SessionLocal
+from exceptions.export import ExportFormatUnavailable, InvalidExportColumns
+from services.export import EXPORT_FORMATS, EXPORT_TABLES, prepare_export, stream_export
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export CSV / Parquet des tables SPI LOEN")
+    parser.add_argument("table", choices=sorted(EXPORT_TABLES), help="Table à exporter")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="csv")
+    parser.add_argument("--columns", default=None, help="Colonnes séparées par des virgules (toutes par défaut)")
+    parser.add_argument("--from", dest="date_min", type=datetime.fromisoformat, default=None, help="Date minimale (incluse)")
+    parser.add_argument("--to", dest="date_max", type=datetime.fromisoformat, default=None, help="Date maximale (incluse)")
+    parser.add_argument("-o", "--output", required=True, help="Fichier de sortie")
+    args = parser.parse_args(argv)
+
+    try:
+        export = prepare_export(args.table, args.format, args.columns, args.date_min, args.date_max)
+    except InvalidExportColumns as e:
+        print(f" Colonnes inconnues : {e}", file=sys.stderr)
+        return 2
+    except ExportFormatUnavailable:
+        print(" L'export Parquet nécessite pyarrow (pip install pyarrow)", file=sys.stderr)
+        return 2
+
+    start = time.perf_counter()
+    db = SessionLocal()
+    try:
+        with open(args.output, "wb") as output:
+            for chunk in stream_export(db, export):
+                output.write(chunk)
+    finally:
+        db.close()
+    print(f" {args.output} écrit en {time.perf_counter() - start:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+"""
+Import des tableurs historiques (export CSV) dans les fiches lapin.
+
+    python import_csv.py lapins.csv --auteur cedric
+    python import_csv.py ancien_export.csv --auteur cedric --encoding cp1252
+
+Les fiches existantes (même numéro d'identification, sinon même numéro
+d'arrivée) sont mises à jour, les autres créées au nom de --auteur. Le fichier
+est traité par blocs (--chunk-size lignes, un commit par bloc).
+"""
+
+import argparse
+import json
+import sys
+
+from database import SessionLocal
+from models.user import User
+from services.csv_import import CSV_IMPORT_CHUNK_SIZE, import_csv
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import CSV des fiches lapin SPI LOEN")
+    parser.add_argument("path", help="Fichier CSV (séparateur ; , ou tabulation)")
+    parser.add_argument("--auteur", required=True, help="Nom d'utilisateur auteur des fiches créées")
+    parser.add_argument("--encoding", default="utf-8-sig", help="Encodage du fichier (cp1252 pour un ancien Excel)")
+    parser.add_argument("--chunk-size", type=int, default=CSV_IMPORT_CHUNK_SIZE, help="Lignes par bloc")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        auteur = db.query(User).filter(User.username == args.auteur).first()
+        if auteur is None:
+            print(f" Utilisateur inconnu : {args.auteur}", file=sys.stderr)
+            return 2
+        with open(args.path, encoding=args.encoding, newline="") as stream:
+            report = import_csv(db, stream, str(auteur.id), chunk_size=args.chunk_size).as_dict()
+    finally:
+        db.close()
+
+    print(f" {report['rows']} lignes lues en {report['seconds']} s ({report['rows_per_second']} lignes/s)")
+    print(f" Créées : {report['inserted']}  Mises à jour : {report['updated']}  Rejetées : {report['rejected']}")
+    if report["unknown_columns"]:
+        print(f" Colonnes ignorées : {', '.join(report['unknown_columns'])}")
+    for reject in report["rejects"]:
+        print(f"   ligne {reject['line']} : {json.dumps(reject['errors'], ensure_ascii=False, default=str)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
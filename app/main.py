@@ -5,29 +5,58 @@ from routers.post import post_router
 from routers.user import user_router
 from routers.health import health_router
 from routers.ficheLapin import ficheLapin_router
-from database import BaseSQL, engine
+from routers.admin import admin_router
+import database
+import migrations
+from services import invalidation
+from services.hashing import hashing_pool
+from database import engine
 from models import User, Post, FicheLapin
 from fastapi.middleware.cors import CORSMiddleware
+import os
+
+# Applique les migrations manquantes au démarrage au lieu d'échouer
+DATABASE_AUTO_MIGRATE = os.environ.get("DATABASE_AUTO_MIGRATE", "false").lower() in ("1", "true", "yes")
+# Écoute les invalidations de cache publiées par les autres workers (PostgreSQL uniquement)
+CACHE_INVALIDATION_LISTEN = os.environ.get("CACHE_INVALIDATION_LISTEN", "true").lower() in ("1", "true", "yes")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     Cycle de vie de l'application.
-    Crée les tables au démarrage.
+    Vérifie la révision du schéma au démarrage (les tables sont créées par
+    `python migrate.py upgrade`, ou ici si DATABASE_AUTO_MIGRATE est activé).
     """
     print("🚀 Démarrage de l'application...")
-    print("📊 Création des tables dans la base de données...")
-    
-    # Créer toutes les tables
-    BaseSQL.metadata.create_all(bind=engine)
-    
-    print("✅ Tables créées avec succès !")
-    print(f"📋 Tables disponibles : {list(BaseSQL.metadata.tables.keys())}")
+
+    if DATABASE_AUTO_MIGRATE:
+        applied = migrations.upgrade(engine)
+        print(f"📊 Migrations appliquées : {applied or 'aucune'}")
+
+    revision = migrations.verify(engine)
+    print(f"✅ Schéma à jour (révision {revision})")
+
+    # Ouvre les connexions minimales des pools utilisés par les routers avant la première requête
+    for name, opened in (await database.warm_up_pools()).items():
+        print(f"🔥 Pool {name} préchauffé : {opened} connexion(s)")
+
+    hashing_pool.start()
+    print(f"🔐 Pool de hachage démarré : {hashing_pool.workers} processus")
+
+    listener = invalidation.start_listener(engine) if CACHE_INVALIDATION_LISTEN else None
+    if listener:
+        print("📡 Écoute des invalidations de cache des autres workers")
     
     yield
     
     print("👋 Arrêt de l'application...")
+    if listener:
+        listener.stop()
+    hashing_pool.shutdown()
+    engine.dispose()
+    if database.async_engine is not None:
+        await database.async_engine.dispose()
 
 
 app = FastAPI(
@@ -56,6 +85,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Curseur de la page suivante des listes paginées, version (requêtes conditionnelles)
+    expose_headers=["X-Next-Cursor", "Link", "ETag"],
 )
 
 
@@ -64,6 +95,7 @@ app.include_router(auth_router)
 app.include_router(user_router)
 app.include_router(post_router)
 app.include_router(ficheLapin_router)
+app.include_router(admin_router)
 
 # from fastapi import FastAPI
 # from contextlib import asynccontextmanager
@@ -0,0 +1,47 @@
+"""
+Point d'entrée des migrations de schéma.
+
+    python migrate.py upgrade            # applique toutes les migrations
+    python migrate.py upgrade --to 1     # s'arrête à la révision 1
+    python migrate.py downgrade --to 0   # annule jusqu'à la révision 0
+    python migrate.py current            # révision appliquée / dernière révision
+    python migrate.py history            # révisions appliquées
+"""
+
+import argparse
+import sys
+
+import migrations
+from database import engine
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migrations du schéma SPI LOEN")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    upgrade_parser = subparsers.add_parser("upgrade", help="Appliquer les migrations")
+    upgrade_parser.add_argument("--to", type=int, default=None, help="Révision cible")
+    downgrade_parser = subparsers.add_parser("downgrade", help="Annuler des migrations")
+    downgrade_parser.add_argument("--to", type=int, required=True, help="Révision cible")
+    subparsers.add_parser("current", help="Afficher la révision courante")
+    subparsers.add_parser("history", help="Afficher les révisions appliquées")
+    args = parser.parse_args(argv)
+
+    if args.command == "upgrade":
+        applied = migrations.upgrade(engine, target=args.to)
+        print(f" Révisions appliquées : {applied or 'aucune, base à jour'}")
+    elif args.command == "downgrade":
+        reverted = migrations.downgrade(engine, target=args.to)
+        print(f" Révisions annulées : {reverted or 'aucune'}")
+    elif args.command == "current":
+        with engine.connect() as connection:
+            current = migrations.current_version(connection)
+        print(f" Révision courante : {current} (dernière : {migrations.head_version()})")
+    elif args.command == "history":
+        with engine.connect() as connection:
+            for row in migrations.history(connection):
+                print(f" {row.version:04d}  {row.applied_at:%Y-%m-%d %H:%M}  {row.description}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
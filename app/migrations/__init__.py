@@ -0,0 +1,112 @@
+"""
+Migrations de schéma versionnées.
+
+Chaque migration est un module de migrations/versions/ nommé vNNNN_description.py
+qui expose `revision` (entier croissant), `description`, `upgrade(connection)` et
+`downgrade(connection)`. Les révisions appliquées sont enregistrées dans la table
+schema_version ; chaque migration s'exécute dans sa propre transaction.
+
+Utilisation : python migrate.py upgrade | downgrade --to N | current | history
+"""
+
+import importlib
+import pkgutil
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select
+
+from migrations import versions
+
+SCHEMA_VERSION_TABLE = "schema_version"
+
+_metadata = MetaData()
+schema_version = Table(
+    SCHEMA_VERSION_TABLE,
+    _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String),
+    Column("applied_at", DateTime, default=datetime.utcnow),
+)
+
+
+class SchemaOutOfDate(Exception):
+    pass
+
+
+def load_migrations() -> list:
+    """Modules de migrations/versions/, triés par révision."""
+    modules = [
+        importlib.import_module(f"{versions.__name__}.{info.name}")
+        for info in pkgutil.iter_modules(versions.__path__)
+        if info.name.startswith("v")
+    ]
+    return sorted(modules, key=lambda module: module.revision)
+
+
+def head_version() -> int:
+    migrations = load_migrations()
+    return migrations[-1].revision if migrations else 0
+
+
+def current_version(connection) -> int:
+    """Révision appliquée en base (0 si la base n'a jamais été migrée)."""
+    if not inspect(connection).has_table(SCHEMA_VERSION_TABLE):
+        return 0
+    return connection.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+
+def history(connection) -> list:
+    if not inspect(connection).has_table(SCHEMA_VERSION_TABLE):
+        return []
+    return connection.execute(select(schema_version).order_by(schema_version.c.version)).all()
+
+
+def upgrade(engine, target: int = None) -> list:
+    """Applique les migrations jusqu'à `target` (par défaut la dernière). Renvoie les révisions appliquées."""
+    with engine.begin() as connection:
+        _metadata.create_all(bind=connection)
+        current = current_version(connection)
+
+    applied = []
+    for migration in load_migrations():
+        if migration.revision <= current or (target is not None and migration.revision > target):
+            continue
+        with engine.begin() as connection:
+            migration.upgrade(connection)
+            connection.execute(
+                schema_version.insert().values(
+                    version=migration.revision,
+                    description=migration.description,
+                    applied_at=datetime.utcnow(),
+                )
+            )
+        applied.append(migration.revision)
+    return applied
+
+
+def downgrade(engine, target: int) -> list:
+    """Annule les migrations au-dessus de `target`, de la plus récente à la plus ancienne."""
+    with engine.connect() as connection:
+        current = current_version(connection)
+
+    reverted = []
+    for migration in reversed(load_migrations()):
+        if migration.revision <= target or migration.revision > current:
+            continue
+        with engine.begin() as connection:
+            migration.downgrade(connection)
+            connection.execute(schema_version.delete().where(schema_version.c.version == migration.revision))
+        reverted.append(migration.revision)
+    return reverted
+
+
+def verify(engine):
+    """Vérifie au démarrage que la base est à la dernière révision (une seule requête)."""
+    with engine.connect() as connection:
+        current = current_version(connection)
+    head = head_version()
+    if current != head:
+        raise SchemaOutOfDate(
+            f"Database schema is at revision {current}, expected {head}: run `python migrate.py upgrade`"
+        )
+    return current
@@ -0,0 +1,103 @@
+"""
+Schéma initial (users, fiche_lapin, posts) et index des requêtes fréquentes.
+
+Les tables sont créées avec checkfirst : une base déjà créée par l'ancien
+`create_all` du démarrage est reprise telle quelle, seuls les index manquants
+sont ajoutés.
+"""
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, MetaData, String, Table
+
+revision = 1
+description = "initial schema and hot query indexes"
+
+metadata = MetaData()
+
+users = Table(
+    "users",
+    metadata,
+    Column("id", String, primary_key=True),
+    Column("username", String, unique=True),
+    Column("password", String),
+    Column("firstName", String),
+    Column("lastName", String),
+    Column("email", String),
+    Column("role", String),
+)
+
+fiche_lapin = Table(
+    "fiche_lapin",
+    metadata,
+    Column("id", String, primary_key=True),
+    Column("nom", String, nullable=False),
+    Column("numero_arrivee_association", Integer, nullable=False),
+    Column("date_creation_fiche", DateTime),
+    Column("date_arrivee_association", DateTime),
+    Column("photo", String),
+    Column("numero_identification", String),
+    Column("statut_vetonac", String),
+    Column("date_naissance", DateTime),
+    Column("sexe", String),
+    Column("poids_actuel", Integer),
+    Column("poids_ideal", Integer),
+    Column("nom_veterinaire", String),
+    Column("date_sterilisation", DateTime),
+    Column("date_dernier_vaccin", DateTime),
+    Column("nom_dernier_vaccin", String),
+    Column("date_prochain_vaccin", DateTime),
+    Column("date_dernier_controle_sante", DateTime),
+    Column("date_deparasitage", DateTime),
+    Column("nom_deparasitage", String),
+    Column("problemes_sante_connus", String),
+    Column("type_litiere_actuelle", String),
+    Column("type_foin", String),
+    Column("marque_granules", String),
+    Column("quantite_granules", Integer),
+    Column("verdure_introduite", String),
+    Column("quantite_verdure", Integer),
+    Column("caractere", String),
+    Column("sociabilite_autres_lapins", String),
+    Column("sociabilite_autres_animaux", String),
+    Column("sociabilite_enfants", String),
+    Column("proprete", String),
+    Column("dynamisme", String),
+    Column("auteur_id", String, ForeignKey("users.id"), nullable=False),
+)
+
+posts = Table(
+    "posts",
+    metadata,
+    Column("id", String, primary_key=True),
+    Column("title", String),
+    Column("content", String),
+    Column("date_creation_post", DateTime),
+    Column("author_id", String, ForeignKey("users.id")),
+    Column("fiche_lapin_id", String, ForeignKey("fiche_lapin.id", ondelete="CASCADE")),
+)
+
+indexes = [
+    Index("ix_users_id", users.c.id),
+    Index("ix_posts_id", posts.c.id),
+    # Filtres des services
+    Index("ix_fiche_lapin_auteur_id", fiche_lapin.c.auteur_id),
+    Index("ix_fiche_lapin_nom", fiche_lapin.c.nom),
+    Index("ix_fiche_lapin_date_prochain_vaccin", fiche_lapin.c.date_prochain_vaccin),
+    Index("ix_posts_fiche_lapin_id", posts.c.fiche_lapin_id),
+    Index("ix_posts_author_id", posts.c.author_id),
+    Index("ix_posts_title", posts.c.title),
+    # Pagination par curseur
+    Index("ix_fiche_lapin_date_creation_fiche_id", fiche_lapin.c.date_creation_fiche, fiche_lapin.c.id),
+    Index("ix_posts_date_creation_post_id", posts.c.date_creation_post, posts.c.id),
+]
+
+
+def upgrade(connection):
+    for table in (users, fiche_lapin, posts):
+        table.create(bind=connection, checkfirst=True)
+    for index in indexes:
+        index.create(bind=connection, checkfirst=True)
+
+
+def downgrade(connection):
+    for table in (posts, fiche_lapin, users):
+        table.drop(bind=connection, checkfirst=True)
@@ -0,0 +1,37 @@
+"""
+Index des filtres et tris de la liste des fiches (?sexe=, ?statut_vetonac=,
+?caractere=, ?date_arrivee_min=/max=, ?sort=date_arrivee_association).
+"""
+
+from sqlalchemy import Column, DateTime, Index, MetaData, String, Table
+
+revision = 2
+description = "fiche list filter and sort indexes"
+
+metadata = MetaData()
+
+fiche_lapin = Table(
+    "fiche_lapin",
+    metadata,
+    Column("date_arrivee_association", DateTime),
+    Column("statut_vetonac", String),
+    Column("sexe", String),
+    Column("caractere", String),
+)
+
+indexes = [
+    Index("ix_fiche_lapin_date_arrivee_association", fiche_lapin.c.date_arrivee_association),
+    Index("ix_fiche_lapin_statut_vetonac", fiche_lapin.c.statut_vetonac),
+    Index("ix_fiche_lapin_sexe", fiche_lapin.c.sexe),
+    Index("ix_fiche_lapin_caractere", fiche_lapin.c.caractere),
+]
+
+
+def upgrade(connection):
+    for index in indexes:
+        index.create(bind=connection, checkfirst=True)
+
+
+def downgrade(connection):
+    for index in indexes:
+        index.drop(bind=connection, checkfirst=True)
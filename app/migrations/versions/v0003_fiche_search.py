@@ -0,0 +1,75 @@
+"""
+Recherche plein texte sur les champs libres des fiches.
+
+PostgreSQL : colonne générée `search_vector` (tsvector, configuration french,
+donc racinisée) maintenue par la base à chaque écriture, et index GIN.
+SQLite (exécutions locales et tests) : table FTS5 `fiche_lapin_fts` qui garde
+sa propre copie des champs, clé par l'id de la fiche (le rowid implicite de
+fiche_lapin peut être renuméroté par VACUUM), tenue à jour par triggers.
+
+Le nom pèse plus que le caractère et la santé, eux-mêmes plus que le foin et
+le vétérinaire (poids A/B/C côté PostgreSQL, poids bm25 côté SQLite).
+"""
+
+from sqlalchemy import text
+
+revision = 3
+description = "fiche full-text search"
+
+SEARCH_COLUMNS = ("nom", "caractere", "problemes_sante_connus", "type_foin", "nom_veterinaire")
+WEIGHTS = {"nom": "A", "caractere": "B", "problemes_sante_connus": "B", "type_foin": "C", "nom_veterinaire": "C"}
+
+
+def _postgresql_upgrade(connection):
+    document = " || ".join(
+        f"setweight(to_tsvector('french', coalesce({name}, '')), '{WEIGHTS[name]}')" for name in SEARCH_COLUMNS
+    )
+    connection.execute(text(
+        f"ALTER TABLE fiche_lapin ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({document}) STORED"
+    ))
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_fiche_lapin_search_vector ON fiche_lapin USING gin (search_vector)"
+    ))
+
+
+def _sqlite_upgrade(connection):
+    columns = ", ".join(SEARCH_COLUMNS)
+    new_values = ", ".join(f"new.{name}" for name in SEARCH_COLUMNS)
+    connection.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS fiche_lapin_fts USING fts5(id UNINDEXED, {columns}, "
+        f"tokenize='unicode61 remove_diacritics 2')"
+    ))
+    connection.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS fiche_lapin_fts_insert AFTER INSERT ON fiche_lapin BEGIN "
+        f"INSERT INTO fiche_lapin_fts(id, {columns}) VALUES (new.id, {new_values}); END"
+    ))
+    connection.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS fiche_lapin_fts_delete AFTER DELETE ON fiche_lapin BEGIN "
+        "DELETE FROM fiche_lapin_fts WHERE id = old.id; END"
+    ))
+    connection.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS fiche_lapin_fts_update AFTER UPDATE ON fiche_lapin BEGIN "
+        f"DELETE FROM fiche_lapin_fts WHERE id = old.id; "
+        f"INSERT INTO fiche_lapin_fts(id, {columns}) VALUES (new.id, {new_values}); END"
+    ))
+    # Indexe les fiches déjà présentes
+    connection.execute(text("DELETE FROM fiche_lapin_fts"))
+    connection.execute(text(f"INSERT INTO fiche_lapin_fts(id, {columns}) SELECT id, {columns} FROM fiche_lapin"))
+
+
+def upgrade(connection):
+    if connection.dialect.name == "postgresql":
+        _postgresql_upgrade(connection)
+    elif connection.dialect.name == "sqlite":
+        _sqlite_upgrade(connection)
+
+
+def downgrade(connection):
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("DROP INDEX IF EXISTS ix_fiche_lapin_search_vector"))
+        connection.execute(text("ALTER TABLE fiche_lapin DROP COLUMN IF EXISTS search_vector"))
+    elif connection.dialect.name == "sqlite":
+        for trigger in ("fiche_lapin_fts_insert", "fiche_lapin_fts_delete", "fiche_lapin_fts_update"):
+            connection.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+        connection.execute(text("DROP TABLE IF EXISTS fiche_lapin_fts"))
@@ -0,0 +1,39 @@
+"""
+Index trigrammes (pg_trgm, GIN) sur fiche_lapin.nom pour la recherche approchée
+des noms (GET /ficheslapin/names).
+
+L'extension n'est créée que si le serveur la fournit et que le rôle a le droit
+de l'installer ; sinon la migration ne fait rien et le service utilise l'index
+n-grammes en mémoire (services.trigram), comme sous SQLite. La migration 8
+remplace cet index par un index sur le nom sans accents.
+"""
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+revision = 4
+description = "fiche name trigram index"
+
+
+def upgrade(connection):
+    if connection.dialect.name != "postgresql":
+        return
+    available = connection.execute(
+        text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+    ).first()
+    if available is None:
+        return
+    try:
+        with connection.begin_nested():
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    except DBAPIError:
+        # Droits insuffisants : repli sur l'index en mémoire
+        return
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_fiche_lapin_nom_trgm ON fiche_lapin USING gin (nom gin_trgm_ops)"
+    ))
+
+
+def downgrade(connection):
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("DROP INDEX IF EXISTS ix_fiche_lapin_nom_trgm"))
@@ -0,0 +1,28 @@
+"""
+Compteurs d'écritures par table (ETag des listes et détails de fiches et posts).
+"""
+
+from sqlalchemy import Column, Integer, MetaData, String, Table
+
+revision = 5
+description = "table write-version counters"
+
+metadata = MetaData()
+
+table_versions = Table(
+    "table_versions",
+    metadata,
+    Column("name", String, primary_key=True),
+    Column("version", Integer, nullable=False),
+)
+
+TRACKED_TABLES = ("fiche_lapin", "posts", "users")
+
+
+def upgrade(connection):
+    table_versions.create(bind=connection, checkfirst=True)
+    connection.execute(table_versions.insert(), [{"name": name, "version": 0} for name in TRACKED_TABLES])
+
+
+def downgrade(connection):
+    table_versions.drop(bind=connection, checkfirst=True)
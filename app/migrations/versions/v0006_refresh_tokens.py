@@ -0,0 +1,35 @@
+"""
+Refresh tokens (stockés hachés, rotation à chaque échange).
+"""
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, MetaData, String, Table
+
+revision = 6
+description = "refresh tokens"
+
+metadata = MetaData()
+
+users = Table("users", metadata, Column("id", String, primary_key=True))
+
+refresh_tokens = Table(
+    "refresh_tokens",
+    metadata,
+    Column("id", String, primary_key=True),
+    Column("token_hash", String, nullable=False),
+    Column("user_id", String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+    Column("family_id", String, nullable=False),
+    Column("created_at", DateTime, nullable=False),
+    Column("expires_at", DateTime, nullable=False),
+    Column("revoked_at", DateTime),
+    Index("ix_refresh_tokens_token_hash", "token_hash", unique=True),
+    Index("ix_refresh_tokens_user_id", "user_id"),
+    Index("ix_refresh_tokens_family_id", "family_id"),
+)
+
+
+def upgrade(connection):
+    refresh_tokens.create(bind=connection, checkfirst=True)
+
+
+def downgrade(connection):
+    refresh_tokens.drop(bind=connection, checkfirst=True)
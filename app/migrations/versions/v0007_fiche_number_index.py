@@ -0,0 +1,23 @@
+"""
+Index du numéro d'arrivée (?numero_arrivee_association= de la liste des fiches,
+recherche par numéro du tableau de bord).
+"""
+
+from sqlalchemy import Column, Index, Integer, MetaData, Table
+
+revision = 7
+description = "fiche arrival number index"
+
+metadata = MetaData()
+
+fiche_lapin = Table("fiche_lapin", metadata, Column("numero_arrivee_association", Integer))
+
+index = Index("ix_fiche_lapin_numero_arrivee_association", fiche_lapin.c.numero_arrivee_association)
+
+
+def upgrade(connection):
+    index.create(bind=connection, checkfirst=True)
+
+
+def downgrade(connection):
+    index.drop(bind=connection, checkfirst=True)
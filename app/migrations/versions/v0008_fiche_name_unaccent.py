@@ -0,0 +1,57 @@
+"""
+Recherche approchée des noms insensible aux accents sous PostgreSQL, comme
+l'index en mémoire (services.trigram) : « helene » trouve « Hélène ».
+
+unaccent() n'est que STABLE (son dictionnaire peut changer) et ne peut pas
+servir dans un index : f_unaccent l'enveloppe en IMMUTABLE avec un dictionnaire
+fixé. L'index trigrammes de la migration 4 est remplacé par un index sur
+f_unaccent(nom). Sans pg_trgm ou sans l'extension unaccent, la migration ne
+fait rien et le service reste sur l'index en mémoire.
+"""
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+revision = 8
+description = "fiche name unaccent trigram index"
+
+CREATE_F_UNACCENT = """
+CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+"""
+
+
+def upgrade(connection):
+    if connection.dialect.name != "postgresql":
+        return
+    installed = connection.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first()
+    available = connection.execute(
+        text("SELECT 1 FROM pg_available_extensions WHERE name = 'unaccent'")
+    ).first()
+    if installed is None or available is None:
+        return
+    try:
+        with connection.begin_nested():
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS unaccent SCHEMA public"))
+    except DBAPIError:
+        # Droits insuffisants : repli sur l'index en mémoire
+        return
+    connection.execute(text(CREATE_F_UNACCENT))
+    connection.execute(text("DROP INDEX IF EXISTS ix_fiche_lapin_nom_trgm"))
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_fiche_lapin_nom_unaccent_trgm "
+        "ON fiche_lapin USING gin (f_unaccent(nom) gin_trgm_ops)"
+    ))
+
+
+def downgrade(connection):
+    if connection.dialect.name != "postgresql":
+        return
+    if connection.execute(text("SELECT 1 FROM pg_proc WHERE proname = 'f_unaccent'")).first() is None:
+        return
+    connection.execute(text("DROP INDEX IF EXISTS ix_fiche_lapin_nom_unaccent_trgm"))
+    connection.execute(text("DROP FUNCTION IF EXISTS f_unaccent(text)"))
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_fiche_lapin_nom_trgm ON fiche_lapin USING gin (nom gin_trgm_ops)"
+    ))
@@ -1,3 +1,5 @@
 from .ficheLapin import FicheLapin
 from .post import Post
 from .user import User
+from .tableVersion import TableVersion
+from .refreshToken import RefreshToken
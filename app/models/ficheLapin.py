@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, ForeignKey, DateTime, Integer
+from sqlalchemy import Column, String, ForeignKey, DateTime, Integer, Index
 import uuid
 from datetime import datetime
 from sqlalchemy.orm import relationship
@@ -9,17 +9,17 @@ class FicheLapin(BaseSQL):
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
 
-    nom = Column(String, nullable=False)
-    numero_arrivee_association = Column(Integer, nullable=False)
+    nom = Column(String, nullable=False, index=True)
+    numero_arrivee_association = Column(Integer, nullable=False, index=True)
     date_creation_fiche = Column(DateTime, default=datetime.utcnow)
-    date_arrivee_association = Column(DateTime)
+    date_arrivee_association = Column(DateTime, index=True)
     photo = Column(String)
 
     # Identité
     numero_identification = Column(String)
-    statut_vetonac = Column(String)
+    statut_vetonac = Column(String, index=True)
     date_naissance = Column(DateTime)
-    sexe = Column(String)
+    sexe = Column(String, index=True)
     poids_actuel = Column(Integer)
     poids_ideal = Column(Integer)
 
@@ -28,7 +28,7 @@ class FicheLapin(BaseSQL):
     date_sterilisation = Column(DateTime)
     date_dernier_vaccin = Column(DateTime)
     nom_dernier_vaccin = Column(String)
-    date_prochain_vaccin = Column(DateTime)
+    date_prochain_vaccin = Column(DateTime, index=True)
     date_dernier_controle_sante = Column(DateTime)
     date_deparasitage = Column(DateTime)
     nom_deparasitage = Column(String)
@@ -43,14 +43,14 @@ class FicheLapin(BaseSQL):
     quantite_verdure = Column(Integer)
 
     # Comportement
-    caractere = Column(String)
+    caractere = Column(String, index=True)
     sociabilite_autres_lapins = Column(String)
     sociabilite_autres_animaux = Column(String)
     sociabilite_enfants = Column(String)
     proprete = Column(String)
     dynamisme = Column(String)
 
-    auteur_id = Column(String, ForeignKey("users.id"), nullable=False)
+    auteur_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
     auteur = relationship("User", back_populates="ficheLapin")
 
     # posts attachés
@@ -60,3 +60,8 @@ class FicheLapin(BaseSQL):
         passive_deletes=True,
         back_populates="fiche_lapin"
     )
+
+    __table_args__ = (
+        # Clé de la pagination par curseur de la liste des fiches
+        Index("ix_fiche_lapin_date_creation_fiche_id", "date_creation_fiche", "id"),
+    )
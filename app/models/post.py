@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey
+from sqlalchemy import Column, String, DateTime, ForeignKey, Index
 import uuid
 from datetime import datetime
 from sqlalchemy.orm import relationship
@@ -8,16 +8,19 @@ class Post(BaseSQL):
     __tablename__ = "posts"
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()), index=True)
-    title = Column(String)
+    title = Column(String, index=True)
     content = Column(String)
     date_creation_post = Column(DateTime, default=datetime.utcnow)
 
-    author_id = Column(String, ForeignKey("users.id"))
+    author_id = Column(String, ForeignKey("users.id"), index=True)
     author = relationship("User", back_populates="posts")
 
-    fiche_lapin_id = Column(String, ForeignKey("fiche_lapin.id", ondelete="CASCADE"))
+    fiche_lapin_id = Column(String, ForeignKey("fiche_lapin.id", ondelete="CASCADE"), index=True)
     fiche_lapin = relationship("FicheLapin", back_populates="posts")
 
-    __table_args__ = ()
+    __table_args__ = (
+        # Clé de la pagination par curseur de la liste des posts
+        Index("ix_posts_date_creation_post_id", "date_creation_post", "id"),
+    )
 
 
@@ -0,0 +1,20 @@
+import uuid
+
+from sqlalchemy import Column, DateTime, ForeignKey, String
+from database import BaseSQL
+
+
+class RefreshToken(BaseSQL):
+    """
+    Refresh token (stocké haché). Chaque échange le révoque et en émet un
+    nouveau de la même famille ; rejouer un token révoqué révoque la famille.
+    """
+    __tablename__ = "refresh_tokens"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    token_hash = Column(String, nullable=False, unique=True, index=True)
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    family_id = Column(String, nullable=False, index=True)
+    created_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime)
@@ -0,0 +1,10 @@
+from sqlalchemy import Column, Integer, String
+from database import BaseSQL
+
+
+class TableVersion(BaseSQL):
+    """Compteur d'écritures d'une table, incrémenté dans la transaction de chaque mutation (ETag)."""
+    __tablename__ = "table_versions"
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
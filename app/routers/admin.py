@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends
+
+import database
+from routers.utils import get_admin_user_id
+from services.auth import token_statistics
+from services.cache import fiche_cache
+from services.hashing import hashing_pool
+from services.ratelimit import login_limiter
+from services.user import user_cache
+
+admin_router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@admin_router.get("/pool")
+def get_pool_statistics(user_id: str = Depends(get_admin_user_id)):
+    """Taille, occupation et compteurs (emprunts, attentes, débordement) des pools de connexions."""
+    return database.pool_statistics()
+
+
+@admin_router.get("/hashing")
+def get_hashing_statistics(user_id: str = Depends(get_admin_user_id)):
+    """Processus, calculs en cours et refus (503) du pool de hachage des mots de passe."""
+    return hashing_pool.statistics()
+
+
+@admin_router.get("/ratelimit")
+def get_rate_limit_statistics(user_id: str = Depends(get_admin_user_id)):
+    """Tentatives de connexion admises et refusées (429) par le limiteur de /auth/token."""
+    return login_limiter.statistics()
+
+
+@admin_router.get("/caches")
+def get_cache_statistics(user_id: str = Depends(get_admin_user_id)):
+    """Taille et compteurs (succès, échecs, évictions) des caches en mémoire de ce worker."""
+    return {"users": user_cache.statistics(), "fiches": fiche_cache.statistics(), "tokens": token_statistics()}
@@ -1,10 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 
 import database
-from serializers.auth_token import AuthToken
+from serializers.auth_token import AuthToken, RefreshRequest
 from serializers import User
-from services.auth import generate_access_token
+from routers.utils import bearer_scheme, run_service
+if database.DATABASE_ASYNC:
+    from services.auth_async import generate_tokens, logout, refresh_tokens
+else:
+    from services.auth import generate_tokens, logout, refresh_tokens
+from services.auth import verify_token
+from exceptions.auth import InvalidRefreshToken, PasswordHashingBusy
+from services.ratelimit import client_address, login_limiter
 from exceptions.user import UserNotFound, IncorrectPassword
 
 auth_router = APIRouter(prefix="/auth")
@@ -12,16 +22,55 @@ auth_router = APIRouter(prefix="/auth")
 
 @auth_router.post("/token", tags=["auth"])
 async def get_access_token(
+    request: Request,
     user_login: User,
     db: Session = Depends(database.get_db),
 ) -> AuthToken:
+    # Avant toute requête SQL ou tout hachage : une tentative refusée ne coûte rien
+    retry_after = login_limiter.check(client_address(request), user_login.username)
+    if retry_after:
+        raise HTTPException(status_code=429, detail="Too many login attempts", headers={"Retry-After": str(retry_after)})
+
     try:
-        access_token = generate_access_token(db=db, user_login=user_login)
+        access_token, refresh_token = await run_service(generate_tokens, db=db, user_login=user_login)
 
     except UserNotFound as e:
         raise HTTPException(status_code=404, detail=str(e))
     except IncorrectPassword as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except PasswordHashingBusy:
+        raise HTTPException(status_code=503, detail="Too many logins in progress", headers={"Retry-After": "1"})
+    return AuthToken(
+        access_token=access_token,
+        refresh_token=refresh_token,
+    )
+
+
+@auth_router.post("/refresh", tags=["auth"])
+async def refresh_access_token(
+    body: RefreshRequest,
+    db: Session = Depends(database.get_db),
+) -> AuthToken:
+    """Échange un refresh token contre un nouvel access token et un nouveau refresh token (sans mot de passe)."""
+    try:
+        access_token, refresh_token = await run_service(refresh_tokens, db=db, refresh_token=body.refresh_token)
+    except InvalidRefreshToken:
+        raise HTTPException(status_code=401, detail="Invalid refresh token", headers={"WWW-Authenticate": "Bearer"})
     return AuthToken(
         access_token=access_token,
+        refresh_token=refresh_token,
+    )
+
+
+@auth_router.post("/logout", tags=["auth"], status_code=status.HTTP_204_NO_CONTENT)
+async def revoke_access_token(
+    body: Optional[RefreshRequest] = None,
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+    db: Session = Depends(database.get_db),
+):
+    """Révoque l'access token présenté (sur tous les workers) et, s'il est fourni, le refresh token et sa famille."""
+    verify_token(credentials.credentials)
+    await run_service(
+        logout, db=db, access_token=credentials.credentials, refresh_token=body.refresh_token if body else None
     )
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
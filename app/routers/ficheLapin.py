@@ -1,15 +1,70 @@
+import io
+import json
+import tempfile
+
 import serializers
 import database
-from fastapi import APIRouter, Depends, HTTPException, status
-from exceptions.ficheLapin import FicheLapinNotFound, FicheLapinAlreadyExists, WrongAuthor
+from datetime import datetime
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from exceptions.ficheLapin import (
+    FicheLapinNotFound,
+    FicheLapinAlreadyExists,
+    InvalidFields,
+    InvalidSort,
+    WrongAuthor,
+)
+from exceptions.pagination import InvalidCursor
 from exceptions.user import UserNotFound
-from routers.utils import get_user_id
-from serializers.ficheLapin import FicheLapinWithAuthor
-from services import ficheLapin as ficheLapin_service
+from routers.utils import (
+    ENVELOPE_DESCRIPTION, enveloped, export_response, get_user_id, json_page, json_with_etag, not_modified, paginated,
+    run_service,
+)
+from serializers.ficheLapin import (
+    FicheLapinFilters,
+    FicheLapinNameMatch,
+    FicheLapinWithAuthor,
+    dump_projection,
+    fiche_lapin_list_adapter,
+    parse_fields,
+)
+from services.pagination import PAGE_SIZE_MAX
+from services.versions import FICHES, USERS
+if database.DATABASE_ASYNC:
+    from services import csv_import_async as csv_import_service
+    from services import ficheLapin_async as ficheLapin_service
+else:
+    from services import csv_import as csv_import_service
+    from services import ficheLapin as ficheLapin_service
 from sqlalchemy.orm import Session
 
 ficheLapin_router = APIRouter(prefix="/ficheslapin", tags=["fichelapin"])
 
+# Tables lues par les réponses de fiches (l'auteur est inclus) : base de l'ETag
+FICHE_TABLES = (FICHES, USERS)
+
+
+def _parse_fields(fields: Optional[str]) -> Optional[frozenset]:
+    try:
+        return parse_fields(fields)
+    except InvalidFields as e:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {e}")
+
+
+def _projected(fields: frozenset, data, response: Response = None) -> Response:
+    """Sérialise uniquement les champs demandés (fiche ou liste), sans passer par FicheLapinWithAuthor."""
+    headers = dict(response.headers) if response is not None else None
+    return Response(content=dump_projection(fields, data), media_type="application/json", headers=headers)
+
+
+# Le response_model décrit la réponse complète ; avec ?fields= seuls id et les
+# champs demandés sont présents (même sérialisation pour la liste et le détail)
+FIELDS_DESCRIPTION = "Champs à renvoyer, séparés par des virgules ; id est toujours inclus"
+PARTIAL_RESPONSE = {
+    200: {"description": "Fiche(s) complète(s) ; avec `fields=`, objets réduits à `id` et aux champs demandés"}
+}
+
 
 # ============================================================================
 # CREATE
@@ -22,30 +77,260 @@ async def create_fichelapin(
 ):
     try:
         fichelapin.auteur_id = user_id
-        return ficheLapin_service.create_fichelapin(db=db, fichelapin=fichelapin)
+        return await run_service(ficheLapin_service.create_fichelapin, db=db, fichelapin=fichelapin)
     except FicheLapinAlreadyExists:
         raise HTTPException(status_code=400, detail="FicheLapin already exists")
 
 
 
+# ============================================================================
+# IMPORT EN MASSE
+# ============================================================================
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+def _parse_records(body: bytes, content_type: str) -> list:
+    """Tableau JSON, ou NDJSON (une fiche par ligne ; une ligne illisible devient une erreur de cette ligne)."""
+    if content_type.split(";")[0].strip() in NDJSON_MEDIA_TYPES:
+        records = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                records.append(None)
+        return records
+    try:
+        records = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON")
+    if not isinstance(records, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of fiches")
+    return records
+
+
+@ficheLapin_router.post("/bulk")
+async def bulk_import(
+    request: Request,
+    all_or_nothing: bool = Query(False, description="Ne rien créer si une fiche est invalide"),
+    db: Session = Depends(database.get_db),
+    user_id: str = Depends(get_user_id),
+):
+    """
+    Crée plusieurs fiches (tableau JSON ou NDJSON) en une transaction, au nom de
+    l'utilisateur connecté. Renvoie les ids créés et les erreurs par ligne
+    (index dans la requête) ; 422 si all_or_nothing et au moins une erreur.
+    """
+    records = _parse_records(await request.body(), request.headers.get("content-type", ""))
+    if len(records) > ficheLapin_service.BULK_IMPORT_MAX_ROWS:
+        raise HTTPException(
+            status_code=413, detail=f"At most {ficheLapin_service.BULK_IMPORT_MAX_ROWS} fiches per request"
+        )
+    try:
+        report = await run_service(
+            ficheLapin_service.import_ficheslapin,
+            db=db,
+            records=records,
+            auteur_id=user_id,
+            all_or_nothing=all_or_nothing,
+        )
+    except UserNotFound:
+        raise HTTPException(status_code=404, detail="User not found")
+    except FicheLapinAlreadyExists:
+        raise HTTPException(status_code=409, detail="FicheLapin already exists")
+    content = {"created": len(report.ids), "ids": report.ids, "errors": report.errors}
+    if report.errors and all_or_nothing:
+        return JSONResponse(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, content=content)
+    return content
+
+
+
+# Au-delà, le fichier reçu est écrit sur disque plutôt que gardé en mémoire
+CSV_IMPORT_SPOOL_BYTES = 1024 * 1024
+
+
+@ficheLapin_router.post(
+    "/import.csv",
+    openapi_extra={"requestBody": {"content": {"text/csv": {"schema": {"type": "string", "format": "binary"}}}}},
+)
+async def import_csv(
+    request: Request,
+    encoding: str = Query("utf-8-sig", description="Encodage du fichier (cp1252 pour un ancien export Excel)"),
+    db: Session = Depends(database.get_db),
+    user_id: str = Depends(get_user_id),
+):
+    """
+    Importe un tableur historique (corps text/csv) : fiches mises à jour selon
+    leur numéro d'identification ou d'arrivée (seulement celles de l'utilisateur,
+    sauf pour un admin), créées sinon. Renvoie le débit et les lignes rejetées.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=CSV_IMPORT_SPOOL_BYTES) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        try:
+            stream = io.TextIOWrapper(spool, encoding=encoding, newline="")
+        except LookupError:
+            raise HTTPException(status_code=400, detail=f"Unknown encoding: {encoding}")
+        try:
+            report = await run_service(csv_import_service.import_csv, db=db, stream=stream, auteur_id=user_id)
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail=f"File is not valid {encoding}")
+        except UserNotFound:
+            raise HTTPException(status_code=404, detail="User not found")
+        finally:
+            stream.detach()
+    return report.as_dict()
+
+
+
 # ============================================================================
 # READ ALL
 # ============================================================================
-@ficheLapin_router.get("/", response_model=list[FicheLapinWithAuthor])
-async def get_all(db: Session = Depends(database.get_db), user_id: str = Depends(get_user_id)):
-    return ficheLapin_service.get_all_ficheslapin(db=db, user_id=None)
+@ficheLapin_router.get("/", response_model=list[FicheLapinWithAuthor], responses=PARTIAL_RESPONSE)
+async def get_all(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=PAGE_SIZE_MAX),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    sort: Optional[str] = Query(None, description="Clé de tri, préfixée de - pour l'ordre décroissant"),
+    envelope: bool = Query(False, description=ENVELOPE_DESCRIPTION),
+    filters: FicheLapinFilters = Depends(),
+    db: Session = Depends(database.get_db),
+    user_id: str = Depends(get_user_id),
+):
+    selected = _parse_fields(fields)
+    cached = await not_modified(request, response, db, FICHE_TABLES)
+    if cached:
+        return cached
+    try:
+        page = await run_service(
+            ficheLapin_service.get_all_ficheslapin,
+            db=db,
+            user_id=filters.auteur_id,
+            cursor=cursor,
+            limit=limit,
+            fields=selected,
+            filters=filters.model_dump(exclude_none=True, exclude={"auteur_id"}),
+            sort=sort,
+        )
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    except InvalidSort as e:
+        raise HTTPException(status_code=400, detail=f"Unknown sort key: {e}")
+    if selected:
+        items = paginated(request, response, page)
+        if envelope:
+            return enveloped(dump_projection(selected, items), page.next_cursor, response)
+        return _projected(selected, items, response)
+    return json_page(fiche_lapin_list_adapter, request, response, page, envelope)
 
    
 
+# ============================================================================
+# SEARCH (déclarée avant /{fichelapin_id})
+# ============================================================================
+@ficheLapin_router.get("/search", response_model=list[FicheLapinWithAuthor])
+async def search(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, description="Mots recherchés dans le nom, le caractère, la santé, le foin et le vétérinaire"),
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=PAGE_SIZE_MAX),
+    envelope: bool = Query(False, description=ENVELOPE_DESCRIPTION),
+    db: Session = Depends(database.get_db),
+    user_id: str = Depends(get_user_id),
+):
+    try:
+        page = await run_service(ficheLapin_service.search_ficheslapin, db=db, q=q, cursor=cursor, limit=limit)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return json_page(fiche_lapin_list_adapter, request, response, page, envelope)
+
+
+# ============================================================================
+# NOMS PROCHES (tolérant aux fautes de frappe, déclarée avant /{fichelapin_id})
+# ============================================================================
+@ficheLapin_router.get("/names", response_model=list[FicheLapinNameMatch])
+async def similar_names(
+    q: str = Query(..., min_length=1, description="Nom, même mal orthographié"),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(database.get_db),
+    user_id: str = Depends(get_user_id),
+):
+    matches = await run_service(ficheLapin_service.get_similar_names, db=db, q=q, limit=limit)
+    return [match._asdict() for match in matches]
+
+
+# ============================================================================
+# EXPORT NDJSON (déclaré avant /{fichelapin_id})
+# ============================================================================
+@ficheLapin_router.get("/export.ndjson", response_class=StreamingResponse)
+async def export_ndjson(
+    db: Session = Depends(database.get_db),
+    user_id: str = Depends(get_user_id),
+):
+    """
+    Toutes les fiches (avec leur auteur), une par ligne, envoyées au fil de la
+    lecture. La session reste ouverte jusqu'à la fin du flux : les dépendances
+    à yield ne sont fermées qu'après la réponse depuis FastAPI 0.118 (requirements.txt).
+    """
+    return StreamingResponse(
+        ficheLapin_service.export_ficheslapin_ndjson(db),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="ficheslapin.ndjson"'},
+    )
+
+
+# ============================================================================
+# EXPORT CSV / PARQUET (déclaré avant /{fichelapin_id})
+# ============================================================================
+EXPORT_COLUMNS_DESCRIPTION = "Colonnes de la table, séparées par des virgules ; toutes par défaut"
+
+
+@ficheLapin_router.get("/export.{format}", response_class=StreamingResponse)
+async def export_table(
+    format: Literal["csv", "parquet"],
+    columns: Optional[str] = Query(None, description=EXPORT_COLUMNS_DESCRIPTION),
+    date_min: Optional[datetime] = Query(None, description="date_creation_fiche minimale (incluse)"),
+    date_max: Optional[datetime] = Query(None, description="date_creation_fiche maximale (incluse)"),
+    db: Session = Depends(database.get_db),
+    user_id: str = Depends(get_user_id),
+):
+    """Table fiche_lapin en CSV ou Parquet (colonnes de la base, sans l'auteur), pour les tableurs et notebooks."""
+    return export_response(db, "fiches", format, columns, date_min, date_max)
+
+
 # ============================================================================
 # READ BY ID
 # ============================================================================
-@ficheLapin_router.get("/{fichelapin_id}", response_model=FicheLapinWithAuthor)
-async def get_by_id(fichelapin_id: str, db: Session = Depends(database.get_db), user_id: str = Depends(get_user_id)):
+@ficheLapin_router.get("/{fichelapin_id}", response_model=FicheLapinWithAuthor, responses=PARTIAL_RESPONSE)
+async def get_by_id(
+    fichelapin_id: str,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(database.get_db),
+    user_id: str = Depends(get_user_id),
+):
+    selected = _parse_fields(fields)
+    if not selected:
+        # Fiche complète : JSON servi par le cache des fiches, ETag calculé sur son contenu
+        try:
+            content = await run_service(ficheLapin_service.get_fichelapin_json, fichelapin_id, db)
+        except FicheLapinNotFound:
+            raise HTTPException(status_code=404, detail="Fiche lapin not found")
+        return json_with_etag(request, content)
+    cached = await not_modified(request, response, db, FICHE_TABLES)
+    if cached:
+        return cached
     try:
-        return ficheLapin_service.get_fichelapin_by_id(fichelapin_id, db)
+        fiche = await run_service(ficheLapin_service.get_fichelapin_by_id, fichelapin_id, db, fields=selected)
     except FicheLapinNotFound:
         raise HTTPException(status_code=404, detail="Fiche lapin not found")
+    return _projected(selected, fiche, response)
 
 
 # ============================================================================
@@ -59,7 +344,7 @@ async def update(
     user_id: str = Depends(get_user_id),
 ):
     try:
-        return ficheLapin_service.update_fichelapin(fichelapin_id, db, updates, user_id)
+        return await run_service(ficheLapin_service.update_fichelapin, fichelapin_id, db, updates, user_id)
     except FicheLapinNotFound:
         raise HTTPException(status_code=404, detail="Fiche lapin not found")
     except WrongAuthor:
@@ -76,7 +361,7 @@ async def delete_by_user(
     user_id: str = Depends(get_user_id),
 ):
     try:
-        return ficheLapin_service.delete_fichelapin_by_user(fichelapin_id, db, user_id)
+        return await run_service(ficheLapin_service.delete_fichelapin_by_user, fichelapin_id, db, user_id)
     except FicheLapinNotFound:
         raise HTTPException(status_code=404, detail="Fiche lapin not found")
     except WrongAuthor:
@@ -1,12 +1,21 @@
 import serializers
 import database
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
+from exceptions.pagination import InvalidCursor
 from exceptions.post import PostNotFound, PostAlreadyExists, WrongAuthor
 from exceptions.user import UserNotFound
-from routers.utils import get_user_id
-from serializers.post import PostWithAuthor
-from services import posts as posts_service
+from routers.utils import ENVELOPE_DESCRIPTION, export_response, get_user_id, json_page, not_modified, run_service
+from serializers.post import PostWithAuthor, post_list_adapter
+from services.pagination import PAGE_SIZE_MAX
+from services.versions import POSTS, USERS
+if database.DATABASE_ASYNC:
+    from services import posts_async as posts_service
+else:
+    from services import posts as posts_service
 from sqlalchemy.orm import Session
 
 post_router = APIRouter(prefix="/posts")
@@ -15,7 +24,7 @@ post_router = APIRouter(prefix="/posts")
 @post_router.post("/", tags=["posts"])
 async def create_post(post: serializers.Post, db: Session = Depends(database.get_db)):
     try:
-        return posts_service.create_post(post=post, db=db)
+        return await run_service(posts_service.create_post, post=post, db=db)
     except UserNotFound:
         raise HTTPException(status_code=404, detail="User not found")
     except PostAlreadyExists:
@@ -24,7 +33,7 @@ async def create_post(post: serializers.Post, db: Session = Depends(database.get
 @post_router.post("/fiches/{fiche_id}/posts", tags=["posts"])
 async def create_post_for_fiche(fiche_id: str, post: serializers.Post, db: Session = Depends(database.get_db)):
     try:
-        return posts_service.create_post_for_fiche(fiche_id=fiche_id, post=post, db=db)
+        return await run_service(posts_service.create_post_for_fiche, fiche_id=fiche_id, post=post, db=db)
     except UserNotFound:
         raise HTTPException(status_code=404, detail="User not found")
     except PostAlreadyExists:
@@ -35,8 +44,36 @@ async def create_post_for_fiche(fiche_id: str, post: serializers.Post, db: Sessi
 
 
 @post_router.get("/", tags=["posts"], response_model=list[PostWithAuthor])
-async def get_all_posts(db: Session = Depends(database.get_db)):
-    return posts_service.get_all_posts(db=db)
+async def get_all_posts(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=PAGE_SIZE_MAX),
+    skip: Optional[int] = Query(None, ge=0, deprecated=True, description="Obsolète (OFFSET) : suivre X-Next-Cursor"),
+    envelope: bool = Query(False, description=ENVELOPE_DESCRIPTION),
+    db: Session = Depends(database.get_db),
+):
+    cached = await not_modified(request, response, db, (POSTS, USERS))
+    if cached:
+        return cached
+    try:
+        page = await run_service(posts_service.get_all_posts, db=db, cursor=cursor, limit=limit, skip=skip)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return json_page(post_list_adapter, request, response, page, envelope)
+
+
+@post_router.get("/export.{format}", tags=["posts"], response_class=StreamingResponse)
+async def export_posts(
+    format: Literal["csv", "parquet"],
+    columns: Optional[str] = Query(None, description="Colonnes de la table, séparées par des virgules ; toutes par défaut"),
+    date_min: Optional[datetime] = Query(None, description="date_creation_post minimale (incluse)"),
+    date_max: Optional[datetime] = Query(None, description="date_creation_post maximale (incluse)"),
+    db: Session = Depends(database.get_db),
+    user_id: str = Depends(get_user_id),
+):
+    """Table posts en CSV ou Parquet, pour les tableurs et notebooks."""
+    return export_response(db, "posts", format, columns, date_min, date_max)
 
 
 @post_router.delete("/{post_id}", tags=["posts"])
@@ -46,8 +83,8 @@ async def delete_post_by_id(
     user_id: str = Depends(get_user_id),
 ):
     try:
-        return posts_service.delete_post_by_user(
-            post_id=post_id, db=db, user_id=user_id
+        return await run_service(
+            posts_service.delete_post_by_user, post_id=post_id, db=db, user_id=user_id
         )
     except PostNotFound:
         raise HTTPException(status_code=404, detail="Post not found")
@@ -57,4 +94,4 @@ async def delete_post_by_id(
 
 @post_router.delete("/", tags=["posts"])
 async def delete_all_posts(db: Session = Depends(database.get_db)):
-    return posts_service.delete_all_posts(db=db)
+    return await run_service(posts_service.delete_all_posts, db=db)
@@ -1,10 +1,19 @@
 import serializers
 import database
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 
+from exceptions.auth import PasswordHashingBusy
+from exceptions.pagination import InvalidCursor
 from exceptions.user import UserNotFound
-from services import user as user_service
+from routers.utils import ENVELOPE_DESCRIPTION, json_page, run_service
+from serializers.user import user_list_adapter
+from services.pagination import PAGE_SIZE_MAX
+if database.DATABASE_ASYNC:
+    from services import user_async as user_service
+else:
+    from services import user as user_service
 
 user_router = APIRouter(prefix="/users")
 
@@ -13,17 +22,32 @@ user_router = APIRouter(prefix="/users")
 async def create_user(
     user: serializers.User, db: Session = Depends(database.get_db)
 ) -> serializers.UserOutput:
-    return user_service.create_user(user=user, db=db)
-
-
-@user_router.get("/", tags=["users"])
-async def get_all_users(db: Session = Depends(database.get_db)):
-    return user_service.get_all_users(db=db)
+    try:
+        return await run_service(user_service.create_user, user=user, db=db)
+    except PasswordHashingBusy:
+        raise HTTPException(status_code=503, detail="Too many password operations in progress", headers={"Retry-After": "1"})
+
+
+@user_router.get("/", tags=["users"], response_model=list[serializers.UserOutput])
+async def get_all_users(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=PAGE_SIZE_MAX),
+    skip: Optional[int] = Query(None, ge=0, deprecated=True, description="Obsolète (OFFSET) : suivre X-Next-Cursor"),
+    envelope: bool = Query(False, description=ENVELOPE_DESCRIPTION),
+    db: Session = Depends(database.get_db),
+):
+    try:
+        page = await run_service(user_service.get_all_users, db=db, cursor=cursor, limit=limit, skip=skip)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return json_page(user_list_adapter, request, response, page, envelope)
 
 
 @user_router.delete("/{user_id}", tags=["users"])
 async def delete_user_by_id(user_id: str, db: Session = Depends(database.get_db)):
     try:
-        return user_service.delete_user(user_id=user_id, db=db)
+        return await run_service(user_service.delete_user, user_id=user_id, db=db)
     except UserNotFound:
         raise HTTPException(status_code=404, detail="User not found")
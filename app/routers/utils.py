@@ -1,6 +1,27 @@
-from fastapi import HTTPException, status, Depends
+import hashlib
+import inspect
+import json
+import os
+from typing import Optional
+
+from fastapi import HTTPException, Request, Response, status, Depends
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from services.auth import decode_jwt
+from pydantic import TypeAdapter
+from starlette.concurrency import run_in_threadpool
+import database
+from exceptions.export import ExportFormatUnavailable, InvalidExportColumns
+from services.auth import verify_token
+from services.export import prepare_export
+if database.DATABASE_ASYNC:
+    from services import export_async as export_service
+    from services import versions_async as versions_service
+else:
+    from services import export as export_service
+    from services import versions as versions_service
+
+# Listes sérialisées directement en JSON par pydantic-core (voir json_list)
+FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "0") == "1"
 
 # Schéma de sécurité HTTP Bearer pour Swagger UI
 bearer_scheme = HTTPBearer(
@@ -9,35 +30,34 @@ bearer_scheme = HTTPBearer(
 )
 
 
-def get_user_id(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)) -> str:
+def get_token_payload(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)) -> dict:
     """
-    Extrait et valide l'ID utilisateur depuis le token JWT.
-    
+    Extrait et valide le payload du token JWT (vérifié une fois, puis servi par le cache).
+
     Args:
         credentials: Les credentials HTTP Bearer extraits du header Authorization
-        
+
     Returns:
-        str: L'ID de l'utilisateur authentifié
-        
+        dict: Le payload du token, qui porte au moins user_id
+
     Raises:
         HTTPException: Si le token est invalide ou expiré
     """
     try:
         token = credentials.credentials
-        payload = decode_jwt(token)
-        user_id = payload.get("user_id")
+        payload = verify_token(token)
 
-        if not user_id:
+        if not payload.get("user_id"):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid token: user_id missing",
                 headers={"WWW-Authenticate": "Bearer"},
             )
 
-        return user_id
+        return payload
     
     except HTTPException:
-        # Re-lever les HTTPException de decode_jwt (token expiré, invalide, etc.)
+        # Re-lever les HTTPException de verify_token (token expiré, invalide, révoqué, etc.)
         raise
     
     except Exception as e:
@@ -46,4 +66,152 @@ def get_user_id(credentials: HTTPAuthorizationCredentials = Depends(bearer_schem
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=f"Authentication error: {str(e)}",
             headers={"WWW-Authenticate": "Bearer"},
-        )
\ No newline at end of file
+        )
+
+
+def get_user_id(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)) -> str:
+    """
+    Extrait et valide l'ID utilisateur depuis le token JWT (voir get_token_payload).
+
+    Raises:
+        HTTPException: Si le token est invalide ou expiré
+    """
+    return get_token_payload(credentials)["user_id"]
+
+
+def get_admin_user_id(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)) -> str:
+    """
+    Comme get_user_id, mais réservé aux comptes dont le token porte le rôle admin.
+    Le token n'est décodé (et sa révocation vérifiée) qu'une fois.
+
+    Raises:
+        HTTPException: 401 si le token est invalide, 403 si le rôle n'est pas admin
+    """
+    payload = get_token_payload(credentials)
+    if payload.get("role") != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin role required",
+        )
+    return payload["user_id"]
+
+
+def paginated(request: Request, response: Response, page) -> list:
+    """
+    Renvoie les éléments d'une page et publie le curseur suivant dans les en-têtes
+    `X-Next-Cursor` et `Link` (rel="next"), absents sur la dernière page.
+
+    Les listes sont paginées même sans `cursor` ni `limit` : un client qui lit le
+    tableau sans suivre ces en-têtes ne reçoit que les PAGE_SIZE_DEFAULT premiers
+    éléments. `?envelope=true` met le curseur dans le corps (voir json_page).
+    """
+    if page.next_cursor:
+        next_url = request.url.include_query_params(cursor=page.next_cursor)
+        response.headers["X-Next-Cursor"] = page.next_cursor
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    return page.items
+
+
+def json_list(adapter: TypeAdapter, items: list, response: Response):
+    """
+    Avec FAST_JSON_RESPONSES, valide les objets ORM et écrit le JSON en une
+    passe dans pydantic-core (TypeAdapter construit une fois au chargement),
+    sans la validation du response_model suivie de jsonable_encoder et
+    json.dumps. Les en-têtes déjà posés (ETag, pagination) sont conservés.
+
+    Sinon, renvoie la liste telle quelle : FastAPI la sérialise via le response_model.
+    """
+    if not FAST_JSON_RESPONSES:
+        return items
+    content = adapter.dump_json(adapter.validate_python(items, from_attributes=True))
+    return Response(content=content, media_type="application/json", headers=dict(response.headers))
+
+
+ENVELOPE_DESCRIPTION = "Renvoie {items, next_cursor} plutôt qu'un tableau (le curseur reste aussi dans X-Next-Cursor)"
+
+
+def enveloped(content: bytes, next_cursor: Optional[str], response: Response) -> Response:
+    """Emballe un tableau JSON déjà sérialisé dans {"items": [...], "next_cursor": ...}."""
+    body = b'{"items":' + content + b',"next_cursor":' + json.dumps(next_cursor).encode() + b"}"
+    return Response(content=body, media_type="application/json", headers=dict(response.headers))
+
+
+def json_page(adapter: TypeAdapter, request: Request, response: Response, page, envelope: bool = False):
+    """Page d'une liste : tableau (json_list, curseur dans les en-têtes) ou, avec envelope, objet enveloppe."""
+    items = paginated(request, response, page)
+    if not envelope:
+        return json_list(adapter, items, response)
+    return enveloped(adapter.dump_json(adapter.validate_python(items, from_attributes=True)), page.next_cursor, response)
+
+
+async def run_service(service, *args, **kwargs):
+    """
+    Appelle une fonction de service sans bloquer la boucle d'événements.
+
+    Les services asynchrones (services/*_async.py) sont attendus directement,
+    les services synchrones sont exécutés dans le threadpool de Starlette.
+    """
+    if inspect.iscoroutinefunction(service):
+        return await service(*args, **kwargs)
+    return await run_in_threadpool(service, *args, **kwargs)
+
+
+def make_etag(request: Request, versions: dict) -> str:
+    """ETag fort : chemin, paramètres de la requête et compteurs d'écritures des tables lues."""
+    key = repr((request.url.path, sorted(request.query_params.multi_items()), sorted(versions.items())))
+    return '"' + hashlib.sha256(key.encode()).hexdigest()[:32] + '"'
+
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def json_with_etag(request: Request, content: bytes) -> Response:
+    """
+    Réponse JSON déjà sérialisée (cache), avec un ETag fort calculé sur son contenu :
+    304 sans corps si le client a déjà ces octets.
+    """
+    etag = '"' + hashlib.sha256(content).hexdigest()[:32] + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+async def not_modified(request: Request, response: Response, db, tables: tuple) -> Optional[Response]:
+    """
+    Pose l'ETag de la réponse d'après les compteurs des tables lues, lus sur la
+    même base que les données de la liste (réplica de la session ou primaire).
+
+    Renvoie une 304 (sans lire les données ni sérialiser) si le client a déjà
+    cette version, sinon None et la route continue normalement.
+    """
+    versions = await run_service(versions_service.get_versions, db, tables)
+    etag = make_etag(request, versions)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    if _matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=dict(response.headers))
+    return None
+
+
+def export_response(db, name: str, format: str, columns: Optional[str], date_min, date_max) -> StreamingResponse:
+    """
+    Fichier CSV ou Parquet d'une table (services.export), envoyé lot par lot
+    avec la session de la requête, ouverte jusqu'à la fin du flux (FastAPI >= 0.118).
+    Colonnes inconnues : 400 ; Parquet sans pyarrow installé : 501.
+    """
+    try:
+        export = prepare_export(name, format, columns, date_min, date_max)
+    except InvalidExportColumns as e:
+        raise HTTPException(status_code=400, detail=f"Unknown columns: {e}")
+    except ExportFormatUnavailable:
+        raise HTTPException(status_code=501, detail=f"{format} export requires pyarrow")
+    return StreamingResponse(
+        export_service.stream_export(db, export),
+        media_type=export.encoder.media_type,
+        headers={"Content-Disposition": f'attachment; filename="{export.filename}"'},
+    )
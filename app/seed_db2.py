@@ -1,5 +1,6 @@
 import os
-from database import SessionLocal, engine, BaseSQL
+import migrations
+from database import SessionLocal, engine
 from models.user import User
 from models.ficheLapin import FicheLapin
 from models.post import Post
@@ -9,8 +10,8 @@ from datetime import datetime
 
 
 def seed():
-    # Création des tables
-    BaseSQL.metadata.create_all(bind=engine)
+    # Appliquer les migrations manquantes (crée les tables sur une base vide)
+    migrations.upgrade(engine)
     db = SessionLocal()
 
     try:
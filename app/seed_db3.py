@@ -1,6 +1,7 @@
 import os
 import sys
-from database import SessionLocal, engine, BaseSQL
+import migrations
+from database import SessionLocal, engine
 from models.user import User
 from models.ficheLapin import FicheLapin
 from models.post import Post
@@ -47,10 +48,10 @@ def seed():
     print(" Démarrage du script de seed")
     print("=" * 60)
     
-    # Créer les tables si elles n'existent pas
-    print("\n Vérification des tables...")
-    BaseSQL.metadata.create_all(bind=engine)
-    print(" Tables vérifiées")
+    # Appliquer les migrations manquantes (crée les tables sur une base vide)
+    print("\n Vérification du schéma...")
+    migrations.upgrade(engine)
+    print(" Schéma à jour")
     
     db = SessionLocal()
 
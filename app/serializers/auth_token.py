@@ -1,5 +1,12 @@
+from typing import Optional
+
 from pydantic import BaseModel
 
 
 class AuthToken(BaseModel):
     access_token: str
+    refresh_token: Optional[str] = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
@@ -2,11 +2,13 @@
 Schémas Pydantic pour les fiches lapin
 """
 
-from pydantic import BaseModel, ConfigDict
+from functools import lru_cache
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model
 from datetime import datetime
 from typing import Optional
 
-from serializers import User
+from exceptions.ficheLapin import InvalidFields
+from serializers import UserOutput
 
 
 class FicheLapin(BaseModel):
@@ -101,7 +103,7 @@ class FicheLapinWithAuthor(BaseModel):
     sociabilite_enfants: Optional[str] = None
     proprete: Optional[str] = None
     dynamisme: Optional[str] = None
-    auteur: User
+    auteur: UserOutput
 
     model_config = {
         "from_attributes": True  
@@ -115,4 +117,87 @@ class FicheLapinOutput(FicheLapin):
         "from_attributes": True  
     }
 
-        
\ No newline at end of file
+
+# ============================================================================
+# RECHERCHE APPROCHÉE DES NOMS
+# ============================================================================
+class FicheLapinNameMatch(BaseModel):
+    """Nom proche de la requête ; score de similarité trigrammes entre 0 et 1."""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    nom: str
+    score: float
+
+
+# ============================================================================
+# FILTRES DE LA LISTE (?sexe=...&date_arrivee_min=...)
+# ============================================================================
+class FicheLapinFilters(BaseModel):
+    """Filtres typés de GET /ficheslapin/ ; les bornes de dates sont incluses."""
+    sexe: Optional[str] = None
+    statut_vetonac: Optional[str] = None
+    caractere: Optional[str] = None
+    numero_arrivee_association: Optional[int] = None
+    date_arrivee_min: Optional[datetime] = None
+    date_arrivee_max: Optional[datetime] = None
+    date_prochain_vaccin_min: Optional[datetime] = None
+    date_prochain_vaccin_max: Optional[datetime] = None
+    auteur_id: Optional[str] = None
+
+
+# ============================================================================
+# SPARSE FIELDSETS (?fields=)
+# ============================================================================
+FICHE_LAPIN_FIELDS = frozenset(FicheLapinWithAuthor.model_fields)
+
+
+def parse_fields(fields: Optional[str]) -> Optional[frozenset]:
+    """Transforme `?fields=nom,photo` en jeu de champs validé ; l'id est toujours inclus."""
+    if not fields:
+        return None
+    requested = frozenset(name.strip() for name in fields.split(",") if name.strip())
+    unknown = requested - FICHE_LAPIN_FIELDS
+    if unknown:
+        raise InvalidFields(", ".join(sorted(unknown)))
+    return requested | {"id"}
+
+
+@lru_cache(maxsize=128)
+def fiche_lapin_projection(fields: frozenset) -> type[BaseModel]:
+    """Modèle réduit aux champs demandés, construit une seule fois par jeu de champs."""
+    definitions = {
+        name: (FicheLapinWithAuthor.model_fields[name].annotation, FicheLapinWithAuthor.model_fields[name])
+        for name in sorted(fields)
+    }
+    return create_model(
+        "FicheLapinPartial", __config__=ConfigDict(from_attributes=True), **definitions
+    )
+
+
+@lru_cache(maxsize=128)
+def fiche_lapin_list_projection(fields: frozenset) -> TypeAdapter:
+    return TypeAdapter(list[fiche_lapin_projection(fields)])
+
+
+@lru_cache(maxsize=128)
+def fiche_lapin_item_projection(fields: frozenset) -> TypeAdapter:
+    return TypeAdapter(fiche_lapin_projection(fields))
+
+
+fiche_lapin_adapter = TypeAdapter(FicheLapinWithAuthor)
+fiche_lapin_list_adapter = TypeAdapter(list[FicheLapinWithAuthor])
+
+
+def dump_fiche(fiche) -> bytes:
+    """JSON complet d'une fiche et de son auteur (contenu de fiche_cache)."""
+    return fiche_lapin_adapter.dump_json(fiche_lapin_adapter.validate_python(fiche, from_attributes=True))
+
+
+def dump_projection(fields: frozenset, data) -> bytes:
+    """JSON d'une fiche ou d'une liste de fiches réduite aux champs demandés."""
+    if isinstance(data, list):
+        adapter = fiche_lapin_list_projection(fields)
+    else:
+        adapter = fiche_lapin_item_projection(fields)
+    return adapter.dump_json(adapter.validate_python(data, from_attributes=True))
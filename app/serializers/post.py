@@ -1,6 +1,6 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, TypeAdapter
 
-from serializers import User
+from serializers import UserOutput
 
 
 class Post(BaseModel):
@@ -17,8 +17,7 @@ class PostWithAuthor(BaseModel):
     id: str
     title: str
     content: str
-    author: User
+    author: UserOutput
 
 
-
-    
+post_list_adapter = TypeAdapter(list[PostWithAuthor])
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, TypeAdapter
 from typing import Optional
 
 
@@ -23,3 +23,6 @@ class UserOutput(BaseModel):
     role : str
     
     model_config = {"from_attributes": True}
+
+
+user_list_adapter = TypeAdapter(list[UserOutput])
@@ -1,25 +1,41 @@
-import base64
 import hashlib
-import hmac
 import os
 import datetime
+import secrets
+import threading
+import time
+from typing import Optional
+import uuid
 import jwt
 from fastapi import HTTPException
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
 from jwt.exceptions import ExpiredSignatureError, DecodeError, InvalidTokenError
 import models
+from exceptions.auth import InvalidRefreshToken
 from exceptions.user import UserNotFound, IncorrectPassword
 from serializers import User
+from services import invalidation, revocation
+from services import user as user_service
+from services.cache import MISSING, LRUCache
+from services.hashing import check_password, hash_password, hashing_pool, verify_password
 
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "should-be-an-environment-variable")
 JWT_SECRET_ALGORITHM = os.getenv("JWT_SECRET_ALGORITHM", "HS256")
 JWT_EXPIRATION_MINUTES = 30  # Par exemple, 30 minutes de validité
+# Durée de vie d'un refresh token ; chaque échange en émet un nouveau
+REFRESH_TOKEN_DAYS = int(os.getenv("REFRESH_TOKEN_DAYS", "30"))
+
+# Payloads des tokens déjà vérifiés, par empreinte du token, jusqu'à leur exp
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "512"))
+token_cache = LRUCache(TOKEN_CACHE_SIZE, ttl=JWT_EXPIRATION_MINUTES * 60)
 
 def _encode_jwt(user: User) -> str:
     expiration = datetime.datetime.utcnow() + datetime.timedelta(minutes=JWT_EXPIRATION_MINUTES)
     payload = {
         "user_id": str(user.id),
         "role": user.role,  # rôle de l'utilisateur
+        "iat": time.time(),  # émission, comparée aux révocations de l'utilisateur (services.revocation)
         "exp": expiration,  # date d’expiration du token
     }
 
@@ -37,10 +53,86 @@ def decode_jwt(token: str) -> dict:
         raise HTTPException(status_code=401, detail="Invalid token")
 
 
-def generate_access_token(
+class DecodeStatistics:
+    """Vérifications complètes (signature HMAC + JSON) faites faute d'entrée dans token_cache."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.decodes = 0
+        self.decode_time_total = 0.0
+
+    def record(self, elapsed: float):
+        with self._lock:
+            self.decodes += 1
+            self.decode_time_total += elapsed
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {"decodes": self.decodes, "decode_time_total_ms": round(self.decode_time_total * 1000, 3)}
+
+
+decode_statistics = DecodeStatistics()
+
+
+def _token_key(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+def _seconds_left(payload: dict) -> float:
+    exp = payload.get("exp")
+    return exp - time.time() if isinstance(exp, (int, float)) else token_cache.ttl
+
+
+def verify_token(token: str) -> dict:
+    """
+    Comme decode_jwt, mais un token déjà vérifié est servi par token_cache
+    jusqu'à son expiration. Les tokens refusés ne sont jamais mis en cache ; la
+    révocation est vérifiée à chaque appel.
+    """
+    key = _token_key(token)
+    payload = token_cache.get(key)
+    if payload is MISSING:
+        start = time.perf_counter()
+        try:
+            payload = decode_jwt(token)
+        finally:
+            decode_statistics.record(time.perf_counter() - start)
+        token_cache.set(key, payload, ttl=_seconds_left(payload))
+    if revocation.is_revoked(key.hex(), payload):
+        raise HTTPException(status_code=401, detail="Token revoked")
+    return dict(payload)
+
+
+def revoke_token(token: str) -> Optional[str]:
+    """
+    Refuse le token sur ce worker jusqu'à son expiration. Renvoie la clé de
+    l'événement TOKEN à publier pour les autres (None si le token est déjà invalide).
+    """
+    key = _token_key(token)
+    token_cache.invalidate(key)
+    try:
+        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_SECRET_ALGORITHM])
+    except InvalidTokenError:
+        # Déjà expiré ou invalide : refusé de toute façon
+        return None
+    expires_at = time.time() + _seconds_left(payload)
+    revocation.revoke_token(key.hex(), expires_at)
+    return revocation.event_key(key.hex(), expires_at)
+
+
+def token_statistics() -> dict:
+    return {
+        **token_cache.statistics(),
+        "revoked": len(revocation.revoked_tokens),
+        "revoked_users": len(revocation.revoked_users),
+        **decode_statistics.as_dict(),
+    }
+
+
+def authenticate(
     db: Session,
     user_login: User,
-):
+) -> models.User:
     password = user_login.password
 
     user = (
@@ -54,34 +146,104 @@ def generate_access_token(
     if not user:
         raise UserNotFound
 
-    if not check_password(password, user.password):
+    # Hachage dans le pool de processus dédié (lève PasswordHashingBusy s'il est saturé)
+    valid, upgraded_hash = hashing_pool.run(verify_password, password, user.password)
+    if not valid:
         raise IncorrectPassword
 
-    return _encode_jwt(user)
+    if upgraded_hash:
+        # Hash d'un ancien schéma ou de coût inférieur aux réglages : remplacé sans réinitialisation
+        user.password = upgraded_hash
+        db.commit()
 
+    return user
 
-def hash_password(password: str, iterations: int = 600_000) -> str:
-    # Generate a random 16-byte salt
-    salt = os.urandom(16)
-    # Derive the hash using PBKDF2-HMAC-SHA256
-    dk = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
-    # Encode salt and hash in base64 for safe storage
-    salt_b64 = base64.b64encode(salt).decode("utf-8")
-    hash_b64 = base64.b64encode(dk).decode("utf-8")
-    # Return full formatted hash string
-    return f"pbkdf2_sha256${iterations}${salt_b64}${hash_b64}"
 
+def generate_access_token(db: Session, user_login: User) -> str:
+    return _encode_jwt(authenticate(db, user_login))
+
+
+def generate_tokens(db: Session, user_login: User) -> tuple[str, str]:
+    """Access token et nouveau refresh token (nouvelle famille) après vérification du mot de passe."""
+    user = authenticate(db, user_login)
+    refresh_token = new_refresh_token(db, user.id)
+    db.commit()
+    return _encode_jwt(user), refresh_token
+
+
+# ============================================================================
+# REFRESH TOKENS
+# ============================================================================
+# Le token est aléatoire (256 bits) : un SHA-256 suffit pour le stocker, sans
+# hachage lent. L'échange d'un refresh token ne fait donc aucun calcul coûteux.
+def refresh_token_hash(refresh_token: str) -> str:
+    return hashlib.sha256(refresh_token.encode()).hexdigest()
 
-def check_password(password: str, stored_hash: str) -> bool:
-    try:
-        algorithm, iterations, salt_b64, hash_b64 = stored_hash.split("$")
-    except Exception:
-        raise ValueError("Invalid hash format")
 
-    iterations = int(iterations)
-    salt = base64.b64decode(salt_b64)
-    stored_dk = base64.b64decode(hash_b64)
+def new_refresh_token(db, user_id: str, family_id: str = None) -> str:
+    """Ajoute à la session un refresh token de la famille donnée (ou d'une nouvelle) ; à valider par l'appelant."""
+    refresh_token = secrets.token_urlsafe(32)
+    now = datetime.datetime.utcnow()
+    db.add(models.RefreshToken(
+        token_hash=refresh_token_hash(refresh_token),
+        user_id=user_id,
+        family_id=family_id or str(uuid.uuid4()),
+        created_at=now,
+        expires_at=now + datetime.timedelta(days=REFRESH_TOKEN_DAYS),
+    ))
+    return refresh_token
 
-    new_dk = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
 
-    return hmac.compare_digest(stored_dk, new_dk)
+def select_refresh_token(refresh_token: str):
+    # Verrouillé : deux échanges simultanés du même token sont sérialisés
+    return (
+        select(models.RefreshToken)
+        .where(models.RefreshToken.token_hash == refresh_token_hash(refresh_token))
+        .with_for_update()
+    )
+
+
+def revoke_refresh_family(family_id: str, now: datetime.datetime):
+    return (
+        update(models.RefreshToken)
+        .where(models.RefreshToken.family_id == family_id, models.RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=now)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def logout(db: Session, access_token: str, refresh_token: str = None):
+    """Révoque l'access token sur tous les workers et, s'il est fourni, la famille du refresh token."""
+    event = revoke_token(access_token)
+    if event:
+        invalidation.publish(db, invalidation.TOKEN, event)
+    if refresh_token:
+        record = db.execute(select_refresh_token(refresh_token)).scalars().first()
+        if record is not None:
+            db.execute(revoke_refresh_family(record.family_id, datetime.datetime.utcnow()))
+    db.commit()
+
+
+def refresh_tokens(db: Session, refresh_token: str) -> tuple[str, str]:
+    """
+    Échange un refresh token valide contre un access token et un nouveau
+    refresh token de la même famille. Un token déjà échangé qui revient est
+    probablement volé : toute sa famille est révoquée.
+    """
+    record = db.execute(select_refresh_token(refresh_token)).scalars().first()
+    now = datetime.datetime.utcnow()
+    if record is None or record.expires_at <= now:
+        raise InvalidRefreshToken
+    if record.revoked_at is not None:
+        db.execute(revoke_refresh_family(record.family_id, now))
+        db.commit()
+        raise InvalidRefreshToken
+
+    try:
+        user = user_service.get_user_ref(record.user_id, db)
+    except UserNotFound:
+        raise InvalidRefreshToken
+    record.revoked_at = now
+    new_token = new_refresh_token(db, record.user_id, record.family_id)
+    db.commit()
+    return _encode_jwt(user), new_token
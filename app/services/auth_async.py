@@ -0,0 +1,84 @@
+"""
+Version asynchrone (AsyncSession) du service d'authentification.
+Le JWT et le hachage restent ceux de services.auth.
+"""
+
+import datetime
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+from exceptions.auth import InvalidRefreshToken
+from exceptions.user import UserNotFound, IncorrectPassword
+from serializers import User
+from services import invalidation_async as invalidation
+from services import user_async as user_service
+from services.auth import _encode_jwt, new_refresh_token, revoke_refresh_family, revoke_token, select_refresh_token
+from services.hashing import hashing_pool, verify_password
+
+
+async def authenticate(
+    db: AsyncSession,
+    user_login: User,
+) -> models.User:
+    result = await db.execute(
+        select(models.User).where(models.User.username == user_login.username)
+    )
+    user = result.scalars().first()
+
+    if not user:
+        raise UserNotFound
+
+    # Le hachage ne doit pas bloquer la boucle d'événements
+    valid, upgraded_hash = await hashing_pool.run_async(verify_password, user_login.password, user.password)
+    if not valid:
+        raise IncorrectPassword
+
+    if upgraded_hash:
+        user.password = upgraded_hash
+        await db.commit()
+
+    return user
+
+
+async def generate_access_token(db: AsyncSession, user_login: User) -> str:
+    return _encode_jwt(await authenticate(db, user_login))
+
+
+async def generate_tokens(db: AsyncSession, user_login: User) -> tuple[str, str]:
+    user = await authenticate(db, user_login)
+    refresh_token = new_refresh_token(db, user.id)
+    await db.commit()
+    return _encode_jwt(user), refresh_token
+
+
+async def logout(db: AsyncSession, access_token: str, refresh_token: str = None):
+    event = revoke_token(access_token)
+    if event:
+        await invalidation.publish(db, invalidation.TOKEN, event)
+    if refresh_token:
+        record = (await db.execute(select_refresh_token(refresh_token))).scalars().first()
+        if record is not None:
+            await db.execute(revoke_refresh_family(record.family_id, datetime.datetime.utcnow()))
+    await db.commit()
+
+
+async def refresh_tokens(db: AsyncSession, refresh_token: str) -> tuple[str, str]:
+    record = (await db.execute(select_refresh_token(refresh_token))).scalars().first()
+    now = datetime.datetime.utcnow()
+    if record is None or record.expires_at <= now:
+        raise InvalidRefreshToken
+    if record.revoked_at is not None:
+        await db.execute(revoke_refresh_family(record.family_id, now))
+        await db.commit()
+        raise InvalidRefreshToken
+
+    try:
+        user = await user_service.get_user_ref(record.user_id, db)
+    except UserNotFound:
+        raise InvalidRefreshToken
+    record.revoked_at = now
+    new_token = new_refresh_token(db, record.user_id, record.family_id)
+    await db.commit()
+    return _encode_jwt(user), new_token
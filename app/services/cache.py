@@ -0,0 +1,245 @@
+"""
+Caches en mémoire du processus et caches de réponses sérialisées.
+
+LRUCache : cache LRU borné avec durée de vie. Chaque worker a son propre cache :
+une entrée invalidée par un autre worker y reste au plus `ttl` secondes. Les
+valeurs mises en cache doivent être immuables (tuples nommés, bytes), jamais
+des objets ORM liés à une session.
+
+CacheBackend : cache de réponses JSON déjà sérialisées (clés str, valeurs
+bytes), en mémoire (MemoryBackend) ou partagé par les workers dans un serveur
+parlant le protocole Redis (RedisBackend). Le backend est choisi par
+l'environnement, voir make_backend.
+"""
+
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+# Valeur renvoyée par get quand la clé est absente ou expirée
+MISSING = object()
+
+
+def _weight(value: Any) -> int:
+    return len(value) if isinstance(value, bytes) else 0
+
+
+class LRUCache:
+    """
+    Au plus `maxsize` entrées, chacune valable `ttl` secondes ; sûr entre threads.
+    Avec max_bytes, la taille totale des valeurs bytes est aussi bornée.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, max_bytes: int = 0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _pop(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= _weight(entry[0])
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                self._pop(key)
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: Hashable, value: Any, ttl: float = None):
+        """`ttl` raccourcit la durée de vie de cette entrée (jamais au-delà de self.ttl)."""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        weight = _weight(value)
+        if self.maxsize <= 0 or ttl <= 0 or (self.max_bytes and weight > self.max_bytes):
+            return
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self.bytes += weight
+            while len(self._entries) > self.maxsize or (self.max_bytes and self.bytes > self.max_bytes):
+                self._pop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def statistics(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# ============================================================================
+# CACHES DE RÉPONSES SÉRIALISÉES
+# ============================================================================
+class CacheBackend(ABC):
+    """Interface commune : get renvoie None en cas d'absence."""
+
+    # Les appels font des entrées-sorties (réseau) : à sortir de la boucle d'événements
+    blocking = False
+    # Partagé par tous les workers : rien à invalider localement sur un événement distant
+    shared = False
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: bytes):
+        ...
+
+    @abstractmethod
+    def delete(self, key: str):
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+    @abstractmethod
+    def statistics(self) -> dict:
+        ...
+
+
+class MemoryBackend(CacheBackend):
+    """LRU en mémoire du worker, borné en entrées et en octets."""
+
+    def __init__(self, maxsize: int, ttl: float, max_bytes: int = 0):
+        self.entries = LRUCache(maxsize, ttl, max_bytes)
+
+    def get(self, key: str) -> Optional[bytes]:
+        value = self.entries.get(key)
+        return None if value is MISSING else value
+
+    def set(self, key: str, value: bytes):
+        self.entries.set(key, value)
+
+    def delete(self, key: str):
+        self.entries.invalidate(key)
+
+    def clear(self):
+        self.entries.clear()
+
+    def statistics(self) -> dict:
+        return {"backend": "memory", **self.entries.statistics()}
+
+
+class RedisBackend(CacheBackend):
+    """
+    Cache partagé dans un serveur Redis (ou compatible : Valkey, KeyDB...).
+
+    L'éviction est celle du serveur (maxmemory-policy allkeys-lru conseillé),
+    chaque clé expire après `ttl` secondes. Une erreur du serveur compte comme
+    un échec de lecture : la fiche est relue en base, jamais refusée.
+    """
+
+    blocking = True
+    shared = True
+
+    def __init__(self, client, ttl: float, prefix: str):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _count(self, **counters):
+        with self._lock:
+            for name, increment in counters.items():
+                setattr(self, name, getattr(self, name) + increment)
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            value = self.client.get(self.prefix + key)
+        except Exception:
+            self._count(errors=1, misses=1)
+            return None
+        self._count(hits=value is not None, misses=value is None)
+        return value
+
+    def set(self, key: str, value: bytes):
+        try:
+            self.client.set(self.prefix + key, value, px=int(self.ttl * 1000))
+        except Exception:
+            self._count(errors=1)
+
+    def delete(self, key: str):
+        try:
+            self.client.delete(self.prefix + key)
+        except Exception:
+            # L'entrée obsolète disparaîtra à l'expiration de son ttl
+            self._count(errors=1)
+
+    def clear(self):
+        try:
+            keys = list(self.client.scan_iter(match=self.prefix + "*"))
+            if keys:
+                self.client.delete(*keys)
+        except Exception:
+            self._count(errors=1)
+
+    def statistics(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": "redis",
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "errors": self.errors,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+def make_backend(name: str, prefix: str) -> CacheBackend:
+    """
+    Backend configuré par {NAME}_CACHE_BACKEND (memory, redis ou none),
+    {NAME}_CACHE_SIZE, {NAME}_CACHE_MAX_BYTES, {NAME}_CACHE_TTL et REDIS_URL.
+    """
+    backend = os.getenv(f"{name}_CACHE_BACKEND", "memory").lower()
+    ttl = float(os.getenv(f"{name}_CACHE_TTL", "300"))
+    if backend == "redis":
+        # Dépendance optionnelle, seulement pour ce backend
+        import redis
+
+        return RedisBackend(redis.Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0")), ttl, prefix)
+    maxsize = 0 if backend == "none" else int(os.getenv(f"{name}_CACHE_SIZE", "1024"))
+    return MemoryBackend(maxsize, ttl, int(os.getenv(f"{name}_CACHE_MAX_BYTES", str(16 * 1024 * 1024))))
+
+
+# Détail des fiches (JSON de FicheLapinWithAuthor), par id. Déclaré ici plutôt
+# que dans services.ficheLapin : services.user l'invalide (auteur embarqué).
+# Préfixe à changer avec le format du JSON (v2 : auteur sans hash du mot de passe).
+fiche_cache = make_backend("FICHE", prefix="fiche:v2:")
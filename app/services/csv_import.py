@@ -0,0 +1,377 @@
+"""
+Import CSV des tableurs historiques de l'association (époque Trello) dans fiche_lapin.
+
+Le fichier est lu ligne à ligne et traité par blocs de CSV_IMPORT_CHUNK_SIZE
+lignes : chaque bloc est converti (en-têtes libres, dates françaises, poids en
+kg ou en g), puis écrit et validé par un commit avant la lecture du suivant.
+La mémoire utilisée ne dépend pas de la taille du fichier.
+
+Une ligne désigne une fiche existante par son numero_identification, sinon par
+son numero_arrivee_association : la fiche est mise à jour (les cellules vides
+ne modifient rien), sinon elle est créée au nom de l'utilisateur de l'import.
+"""
+
+import csv
+import itertools
+import os
+import re
+import time
+import unicodedata
+import uuid
+from datetime import datetime, timedelta
+from typing import Iterator, TextIO
+
+from pydantic import ValidationError
+from sqlalchemy import DateTime, Integer, or_, select, update
+from sqlalchemy.orm import Session
+
+import serializers
+from models.ficheLapin import FicheLapin
+from services import ficheLapin as ficheLapin_service
+from services import invalidation
+from services import user as user_service
+from services import versions as versions_service
+from services.cache import fiche_cache
+
+CSV_IMPORT_CHUNK_SIZE = int(os.getenv("CSV_IMPORT_CHUNK_SIZE", "500"))
+# Détail conservé pour les premières lignes refusées (les suivantes sont seulement comptées)
+CSV_IMPORT_MAX_REJECTS = int(os.getenv("CSV_IMPORT_MAX_REJECTS", "1000"))
+# Un poids sans unité inférieur à ce seuil est en kg (« 1,8 »), sinon en g (« 1800 »)
+WEIGHT_KG_THRESHOLD = 100
+
+
+# ============================================================================
+# EN-TÊTES : libellés des tableurs -> champs de FicheLapin
+# ============================================================================
+IMPORT_FIELDS = [name for name in serializers.FicheLapin.model_fields if name != "auteur_id"]
+
+COLUMN_ALIASES = {
+    **{name: name for name in IMPORT_FIELDS},
+    "lapin": "nom",
+    "nom_du_lapin": "nom",
+    "n_arrivee": "numero_arrivee_association",
+    "no_arrivee": "numero_arrivee_association",
+    "num_arrivee": "numero_arrivee_association",
+    "numero_arrivee": "numero_arrivee_association",
+    "numero_d_arrivee": "numero_arrivee_association",
+    "n_d_arrivee": "numero_arrivee_association",
+    "arrivee": "date_arrivee_association",
+    "date_arrivee": "date_arrivee_association",
+    "date_d_arrivee": "date_arrivee_association",
+    "identification": "numero_identification",
+    "n_identification": "numero_identification",
+    "puce": "numero_identification",
+    "n_puce": "numero_identification",
+    "tatouage": "numero_identification",
+    "vetonac": "statut_vetonac",
+    "naissance": "date_naissance",
+    "date_de_naissance": "date_naissance",
+    "poids": "poids_actuel",
+    "poids_g": "poids_actuel",
+    "poids_kg": "poids_actuel",
+    "poids_actuel_g": "poids_actuel",
+    "poids_ideal_g": "poids_ideal",
+    "veto": "nom_veterinaire",
+    "veterinaire": "nom_veterinaire",
+    "sterilisation": "date_sterilisation",
+    "sterilise_le": "date_sterilisation",
+    "dernier_vaccin": "date_dernier_vaccin",
+    "vaccin": "nom_dernier_vaccin",
+    "nom_vaccin": "nom_dernier_vaccin",
+    "prochain_vaccin": "date_prochain_vaccin",
+    "rappel_vaccin": "date_prochain_vaccin",
+    "dernier_controle": "date_dernier_controle_sante",
+    "controle_sante": "date_dernier_controle_sante",
+    "deparasitage": "nom_deparasitage",
+    "vermifuge": "nom_deparasitage",
+    "sante": "problemes_sante_connus",
+    "problemes_de_sante": "problemes_sante_connus",
+    "litiere": "type_litiere_actuelle",
+    "type_litiere": "type_litiere_actuelle",
+    "foin": "type_foin",
+    "granules": "marque_granules",
+    "granules_g": "quantite_granules",
+    "verdure": "verdure_introduite",
+    "verdure_g": "quantite_verdure",
+    "temperament": "caractere",
+    "entente_lapins": "sociabilite_autres_lapins",
+    "sociabilite_lapins": "sociabilite_autres_lapins",
+    "entente_animaux": "sociabilite_autres_animaux",
+    "sociabilite_animaux": "sociabilite_autres_animaux",
+    "entente_enfants": "sociabilite_enfants",
+    "activite": "dynamisme",
+    "cree_le": "date_creation_fiche",
+    "date_creation": "date_creation_fiche",
+}
+
+
+def normalize_header(name: str) -> str:
+    """« N° d'arrivée » -> « n_d_arrivee » (sans accents, minuscules, séparateurs unifiés)."""
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(char for char in name if not unicodedata.combining(char)).lower()
+    return re.sub(r"[^a-z0-9]+", "_", name).strip("_")
+
+
+def map_columns(header: list) -> tuple[list, list]:
+    """(champ de chaque colonne ou None, libellés des colonnes ignorées)."""
+    fields = [COLUMN_ALIASES.get(normalize_header(name)) for name in header]
+    unknown = [name for name, field in zip(header, fields) if field is None and name.strip()]
+    return fields, unknown
+
+
+# ============================================================================
+# VALEURS
+# ============================================================================
+DATE_FORMATS = ("%d/%m/%Y", "%d/%m/%y", "%d-%m-%Y", "%d.%m.%Y", "%Y-%m-%d", "%d/%m/%Y %H:%M", "%Y-%m-%d %H:%M:%S")
+# Date « numéro de série » d'Excel (jours depuis le 30/12/1899)
+EXCEL_EPOCH = datetime(1899, 12, 30)
+
+
+def parse_date(value: str) -> datetime:
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            pass
+    if value.isdigit() and len(value) == 5:
+        return EXCEL_EPOCH + timedelta(days=int(value))
+    return datetime.fromisoformat(value)
+
+
+def parse_weight(value: str) -> int:
+    """Poids en grammes : « 1,8 kg », « 1800 g », « 1800 » et « 1.8 » donnent 1800."""
+    match = re.fullmatch(r"(\d+(?:[.,]\d+)?)\s*(kg|kgs|kilos?|g|gr|grammes?)?", value.lower())
+    if not match:
+        raise ValueError(value)
+    weight = float(match[1].replace(",", "."))
+    unit = match[2]
+    if (unit and unit.startswith("k")) or (not unit and weight < WEIGHT_KG_THRESHOLD):
+        weight *= 1000
+    return round(weight)
+
+
+def parse_int(value: str) -> int:
+    """« 32 », « N°32 », « 32.0 » ou « 30 g » -> 32 / 30."""
+    match = re.fullmatch(r"(?:n\s*[°o]?\s*)?(\d+)(?:[.,]0+)?\s*(?:g|gr)?", value.lower())
+    if not match:
+        raise ValueError(value)
+    return int(match[1])
+
+
+SEXES = {"m": "Mâle", "male": "Mâle", "masculin": "Mâle", "f": "Femelle", "femelle": "Femelle", "feminin": "Femelle"}
+
+
+def parse_sexe(value: str) -> str:
+    return SEXES.get(normalize_header(value), value)
+
+
+def _parsers() -> dict:
+    columns = FicheLapin.__table__.columns
+    parsers = {}
+    for name in IMPORT_FIELDS:
+        if name.startswith("poids_"):
+            parsers[name] = parse_weight
+        elif isinstance(columns[name].type, DateTime):
+            parsers[name] = parse_date
+        elif isinstance(columns[name].type, Integer):
+            parsers[name] = parse_int
+    parsers["sexe"] = parse_sexe
+    return parsers
+
+
+FIELD_PARSERS = _parsers()
+
+
+def convert_row(fields: list, values: list) -> tuple[dict, list]:
+    """Cellules non vides converties -> (valeurs par champ, erreurs de conversion)."""
+    data, errors = {}, []
+    for field, raw in zip(fields, values):
+        raw = raw.strip()
+        if field is None or not raw:
+            continue
+        try:
+            data[field] = FIELD_PARSERS.get(field, str)(raw)
+        except ValueError:
+            errors.append({"loc": [field], "msg": f"Unreadable value: {raw}"})
+    return data, errors
+
+
+# ============================================================================
+# LECTURE PAR BLOCS
+# ============================================================================
+def open_csv(stream: TextIO) -> Iterator[list]:
+    """Lecteur CSV ; séparateur détecté (« ; » des tableurs français, « , » ou tabulation)."""
+    sample = stream.read(8192)
+    stream.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=";,\t")
+    except csv.Error:
+        dialect = csv.excel
+    return csv.reader(stream, dialect)
+
+
+def read_chunks(rows: Iterator[list], size: int) -> Iterator[list]:
+    """Blocs de (numéro de ligne du fichier, cellules) ; l'en-tête est la ligne 1."""
+    numbered = zip(itertools.count(2), rows)
+    while chunk := list(itertools.islice(numbered, size)):
+        yield chunk
+
+
+class CsvImportReport:
+    def __init__(self, unknown_columns: list = ()):
+        self.started = time.perf_counter()
+        self.unknown_columns = list(unknown_columns)
+        self.rows = 0
+        self.inserted = 0
+        self.updated = 0
+        self.rejected = 0
+        self.rejects = []
+
+    def reject(self, line: int, errors: list):
+        self.rejected += 1
+        if len(self.rejects) < CSV_IMPORT_MAX_REJECTS:
+            self.rejects.append({"line": line, "errors": errors})
+
+    def as_dict(self) -> dict:
+        seconds = time.perf_counter() - self.started
+        return {
+            "rows": self.rows,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "rejected": self.rejected,
+            "rejects": self.rejects,
+            "unknown_columns": self.unknown_columns,
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(self.rows / seconds) if seconds else None,
+        }
+
+
+def convert_chunk(chunk: list, fields: list, report: CsvImportReport) -> list:
+    """Lignes converties (numéro de ligne, valeurs) ; les autres sont rejetées dans le rapport."""
+    converted = []
+    for line, values in chunk:
+        report.rows += 1
+        data, errors = convert_row(fields, values)
+        if errors:
+            report.reject(line, errors)
+        elif data:
+            converted.append((line, data))
+    return converted
+
+
+def select_existing(converted: list):
+    """Fiches désignées par les numéros d'identification ou d'arrivée du bloc (None si aucun)."""
+    idents = {data["numero_identification"] for _, data in converted if "numero_identification" in data}
+    numbers = {data["numero_arrivee_association"] for _, data in converted if "numero_arrivee_association" in data}
+    conditions = []
+    if idents:
+        conditions.append(FicheLapin.numero_identification.in_(idents))
+    if numbers:
+        conditions.append(FicheLapin.numero_arrivee_association.in_(numbers))
+    if not conditions:
+        return None
+    return select(
+        FicheLapin.id, FicheLapin.auteur_id, FicheLapin.numero_identification, FicheLapin.numero_arrivee_association
+    ).where(or_(*conditions))
+
+
+def plan_chunk(
+    converted: list, existing: list, auteur_id: str, report: CsvImportReport, is_admin: bool = False
+) -> tuple[list, list]:
+    """
+    Répartit le bloc en (fiches à insérer, mises à jour par id). Une ligne
+    désigne une fiche par son numéro d'identification, ou à défaut seulement
+    par son numéro d'arrivée ; une ligne qui désigne une fiche déjà vue dans le
+    bloc la complète. Sont rejetées : un numéro d'arrivée porté par plusieurs
+    fiches existantes (ambigu) et, sauf pour un admin, une fiche d'un autre
+    auteur (même règle que update_fichelapin).
+    """
+    by_ident = {row.numero_identification: row for row in existing if row.numero_identification}
+    by_number = {}
+    for row in existing:
+        by_number.setdefault(row.numero_arrivee_association, []).append(row)
+    inserts, updates = {}, {}
+    now = datetime.utcnow()
+
+    for line, data in converted:
+        ident = data.get("numero_identification")
+        number = data.get("numero_arrivee_association")
+        keys = [key for key in (("ident", ident), ("number", number)) if key[1] is not None]
+        # Un numéro d'identification inconnu est un nouveau lapin, même si son numéro d'arrivée existe
+        lookup = [("ident", ident)] if ident is not None else keys
+
+        target = None
+        if ident is not None:
+            target = by_ident.get(ident)
+        elif number in by_number:
+            if len(by_number[number]) > 1:
+                report.reject(line, [{"loc": ["numero_arrivee_association"], "msg": "Several fiches have this number"}])
+                continue
+            target = by_number[number][0]
+        if target is not None:
+            if target.auteur_id != auteur_id and not is_admin:
+                report.reject(line, [{"loc": [], "msg": "Fiche belongs to another user"}])
+                continue
+            updates.setdefault(target.id, {"id": target.id}).update(data)
+            continue
+
+        pending = next((inserts[key] for key in lookup if key in inserts), None)
+        if pending is not None:
+            pending.update(data)
+            continue
+        try:
+            fiche = serializers.FicheLapin.model_validate({"date_creation_fiche": now, **data, "auteur_id": auteur_id})
+        except ValidationError as e:
+            report.reject(line, e.errors(include_url=False, include_context=False, include_input=False))
+            continue
+        row = {"id": str(uuid.uuid4()), **fiche.model_dump()}
+        for key in keys:
+            inserts[key] = row
+
+    unique_inserts = list({row["id"]: row for row in inserts.values()}.values())
+    return unique_inserts, list(updates.values())
+
+
+def publish_chunk(db, inserts: list, updates: list):
+    """Événements d'invalidation du bloc (émis dans sa transaction)."""
+    if inserts:
+        invalidation.publish(db, invalidation.FICHE)
+    for row in updates:
+        invalidation.publish(db, invalidation.FICHE, row["id"])
+
+
+def after_chunk(inserts: list, updates: list, report: CsvImportReport):
+    """Caches de ce worker après le commit du bloc."""
+    for row in updates:
+        fiche_cache.delete(row["id"])
+    for row in inserts:
+        ficheLapin_service.name_index.add(row["id"], row["nom"])
+    if updates:
+        ficheLapin_service.name_index.expire()
+    report.inserted += len(inserts)
+    report.updated += len(updates)
+
+
+def import_csv(db: Session, stream: TextIO, auteur_id: str, chunk_size: int = None) -> CsvImportReport:
+    """Importe le fichier bloc par bloc (un commit par bloc) et renvoie le rapport."""
+    author = user_service.get_user_ref(user_id=auteur_id, db=db)
+    rows = open_csv(stream)
+    fields, unknown = map_columns(next(rows, []))
+    report = CsvImportReport(unknown)
+
+    for chunk in read_chunks(rows, chunk_size or CSV_IMPORT_CHUNK_SIZE):
+        converted = convert_chunk(chunk, fields, report)
+        stmt = select_existing(converted)
+        existing = db.execute(stmt).all() if stmt is not None else []
+        inserts, updates = plan_chunk(converted, existing, auteur_id, report, is_admin=author.role == "admin")
+        if not inserts and not updates:
+            continue
+        if inserts:
+            ficheLapin_service.insert_fiche_rows(db, inserts)
+        if updates:
+            db.execute(update(FicheLapin), updates)
+        versions_service.bump_versions(db, versions_service.FICHES)
+        publish_chunk(db, inserts, updates)
+        db.commit()
+        after_chunk(inserts, updates, report)
+    return report
@@ -0,0 +1,71 @@
+"""
+Version asynchrone (AsyncSession) de l'import CSV.
+Même API que services.csv_import, utilisée quand DATABASE_ASYNC est activé :
+la lecture du fichier se fait dans le threadpool, bloc par bloc.
+"""
+
+from typing import TextIO
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from models.ficheLapin import FicheLapin
+from services import ficheLapin_async as ficheLapin_service
+from services import invalidation_async as invalidation
+from services import user_async as user_service
+from services import versions_async as versions_service
+from services.csv_import import (
+    CSV_IMPORT_CHUNK_SIZE,
+    CsvImportReport,
+    convert_chunk,
+    map_columns,
+    open_csv,
+    plan_chunk,
+    read_chunks,
+    select_existing,
+)
+from services.cache import fiche_cache
+from services.ficheLapin import name_index
+
+
+async def _after_chunk(inserts: list, updates: list, report: CsvImportReport):
+    for row in updates:
+        if fiche_cache.blocking:
+            await run_in_threadpool(fiche_cache.delete, row["id"])
+        else:
+            fiche_cache.delete(row["id"])
+    for row in inserts:
+        name_index.add(row["id"], row["nom"])
+    if updates:
+        name_index.expire()
+    report.inserted += len(inserts)
+    report.updated += len(updates)
+
+
+async def import_csv(db: AsyncSession, stream: TextIO, auteur_id: str, chunk_size: int = None) -> CsvImportReport:
+    author = await user_service.get_user_ref(user_id=auteur_id, db=db)
+    rows = await run_in_threadpool(open_csv, stream)
+    fields, unknown = map_columns(await run_in_threadpool(next, rows, []))
+    report = CsvImportReport(unknown)
+    chunks = read_chunks(rows, chunk_size or CSV_IMPORT_CHUNK_SIZE)
+
+    while (chunk := await run_in_threadpool(next, chunks, None)) is not None:
+        converted = convert_chunk(chunk, fields, report)
+        stmt = select_existing(converted)
+        existing = (await db.execute(stmt)).all() if stmt is not None else []
+        inserts, updates = plan_chunk(converted, existing, auteur_id, report, is_admin=author.role == "admin")
+        if not inserts and not updates:
+            continue
+        if inserts:
+            await ficheLapin_service.insert_fiche_rows(db, inserts)
+        if updates:
+            await db.execute(update(FicheLapin), updates)
+        await versions_service.bump_versions(db, versions_service.FICHES)
+        if inserts:
+            await invalidation.publish(db, invalidation.FICHE)
+        for row in updates:
+            await invalidation.publish(db, invalidation.FICHE, row["id"])
+        await db.commit()
+        await _after_chunk(inserts, updates, report)
+    return report
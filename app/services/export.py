@@ -0,0 +1,190 @@
+"""
+Exports tabulaires (CSV, Parquet) des fiches et des posts, pour les tableurs
+et les notebooks.
+
+Les lignes sont lues par un select Core (sans objets ORM) sur un curseur côté
+serveur, par lots de EXPORT_BATCH_SIZE, et chaque lot est encodé puis envoyé
+avant de lire le suivant : la mémoire utilisée ne dépend pas du nombre de
+lignes. Un lot devient un row group Parquet. Parquet nécessite pyarrow
+(dépendance optionnelle, pip install pyarrow).
+
+prepare_export valide la demande avant le premier octet envoyé ; stream_export
+(ou export_async.stream_export) produit ensuite les blocs du fichier.
+"""
+
+import csv
+import io
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from sqlalchemy import DateTime, Integer, select
+from sqlalchemy.orm import Session
+
+import database
+from exceptions.export import ExportFormatUnavailable, InvalidExportColumns
+from models.ficheLapin import FicheLapin
+from models.post import Post
+from services import ficheLapin as ficheLapin_service
+
+
+class ExportTable(NamedTuple):
+    table: object
+    # Colonne des filtres de dates et de l'ordre des lignes (avec l'id)
+    date_column: str
+
+
+EXPORT_TABLES = {
+    "fiches": ExportTable(FicheLapin.__table__, "date_creation_fiche"),
+    "posts": ExportTable(Post.__table__, "date_creation_post"),
+}
+
+
+def export_columns(name: str, columns: Optional[str] = None) -> list:
+    """`nom,sexe` -> colonnes de la table, dans l'ordre demandé ; toutes par défaut."""
+    table = EXPORT_TABLES[name].table
+    if not columns:
+        return list(table.columns)
+    requested = [column.strip() for column in columns.split(",") if column.strip()]
+    unknown = [column for column in requested if column not in table.columns]
+    if unknown or not requested:
+        raise InvalidExportColumns(", ".join(unknown))
+    return [table.columns[column] for column in dict.fromkeys(requested)]
+
+
+def select_export(
+    name: str,
+    columns: list,
+    date_min: datetime = None,
+    date_max: datetime = None,
+    batch_size: int = None,
+):
+    """Lignes de la table (colonnes choisies), bornes de dates incluses, lues par lots."""
+    table, date_column = EXPORT_TABLES[name]
+    stmt = select(*columns).order_by(table.c[date_column], table.c.id)
+    if date_min is not None:
+        stmt = stmt.where(table.c[date_column] >= date_min)
+    if date_max is not None:
+        stmt = stmt.where(table.c[date_column] <= date_max)
+    return stmt.execution_options(yield_per=batch_size or ficheLapin_service.EXPORT_BATCH_SIZE)
+
+
+# ============================================================================
+# ENCODEURS : en-tête, un bloc d'octets par lot, fin du fichier
+# ============================================================================
+class CsvEncoder:
+    media_type = "text/csv; charset=utf-8"
+
+    def __init__(self, columns: list):
+        self.names = [column.key for column in columns]
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+
+    def _drain(self) -> bytes:
+        data = self._buffer.getvalue().encode("utf-8")
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+    def header(self) -> bytes:
+        self._writer.writerow(self.names)
+        return self._drain()
+
+    def encode(self, rows: list) -> bytes:
+        self._writer.writerows(rows)
+        return self._drain()
+
+    def close(self) -> bytes:
+        return b""
+
+
+class _ChunkSink(io.RawIOBase):
+    """Fichier en écriture seule dont on récupère les octets au fur et à mesure."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ParquetEncoder:
+    media_type = "application/vnd.apache.parquet"
+
+    def __init__(self, columns: list):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ExportFormatUnavailable("parquet")
+        self._pa = pyarrow
+        self.schema = pyarrow.schema([(column.key, self._arrow_type(column)) for column in columns])
+        self._sink = _ChunkSink()
+        self._writer = pyarrow.parquet.ParquetWriter(self._sink, self.schema)
+
+    def _arrow_type(self, column):
+        if isinstance(column.type, Integer):
+            return self._pa.int64()
+        if isinstance(column.type, DateTime):
+            return self._pa.timestamp("us")
+        return self._pa.string()
+
+    def header(self) -> bytes:
+        return self._sink.drain()
+
+    def encode(self, rows: list) -> bytes:
+        arrays = [
+            self._pa.array([row[i] for row in rows], type=field.type)
+            for i, field in enumerate(self.schema)
+        ]
+        self._writer.write_batch(self._pa.record_batch(arrays, schema=self.schema))
+        return self._sink.drain()
+
+    def close(self) -> bytes:
+        # Pied de fichier (métadonnées des row groups)
+        self._writer.close()
+        return self._sink.drain()
+
+
+EXPORT_FORMATS = {"csv": CsvEncoder, "parquet": ParquetEncoder}
+
+
+class Export(NamedTuple):
+    stmt: object
+    encoder: object
+    filename: str
+
+
+def prepare_export(
+    name: str,
+    format: str,
+    columns: Optional[str] = None,
+    date_min: datetime = None,
+    date_max: datetime = None,
+) -> Export:
+    """Lève InvalidExportColumns ou ExportFormatUnavailable avant toute lecture."""
+    selected = export_columns(name, columns)
+    encoder = EXPORT_FORMATS[format](selected)
+    return Export(select_export(name, selected, date_min, date_max), encoder, f"{name}.{format}")
+
+
+def stream_export(db: Session, export: Export):
+    """Blocs du fichier : en-tête, un bloc par lot de lignes, puis la fin. Lecture sur un réplica si possible."""
+    with database.use_replica(db):
+        yield export.encoder.header()
+        for rows in db.execute(export.stmt).partitions():
+            yield export.encoder.encode(rows)
+    yield export.encoder.close()
@@ -0,0 +1,18 @@
+"""
+Version asynchrone (AsyncSession) du flux d'export.
+Même API que services.export, utilisée quand DATABASE_ASYNC est activé.
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import database
+from services.export import Export
+
+
+async def stream_export(db: AsyncSession, export: Export):
+    with database.use_replica(db):
+        yield export.encoder.header()
+        result = await db.stream(export.stmt)
+        async for rows in result.partitions():
+            yield export.encoder.encode(rows)
+    yield export.encoder.close()
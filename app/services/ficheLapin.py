@@ -1,46 +1,507 @@
+import io
+import os
+import re
+import uuid
+from typing import NamedTuple
+
+from pydantic import ValidationError
+from sqlalchemy import Float, cast, column, func, insert, literal, literal_column, select, table, text
+from sqlalchemy.dialects.postgresql import REGCONFIG
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload, load_only, selectinload
 from datetime import datetime
 
 from models.ficheLapin import FicheLapin
+from models.user import User
+import database
 import serializers
+from serializers.ficheLapin import dump_fiche
+from services import invalidation
 from services import user as user_service
-from exceptions.ficheLapin import FicheLapinNotFound, FicheLapinAlreadyExists, WrongAuthor
+from services.cache import fiche_cache
+from services import versions as versions_service
+from services.pagination import Page, encode_cursor, make_page, paginate
+from services.rows import RowsQuery
+from services.trigram import NameMatch, TrigramIndex
+from exceptions.ficheLapin import (
+    FicheLapinNotFound,
+    FicheLapinAlreadyExists,
+    InvalidFilter,
+    InvalidSort,
+    WrongAuthor,
+)
+
+
+# Ordre stable de la liste : date de création puis id (clé du curseur)
+FICHES_ORDER_BY = [FicheLapin.date_creation_fiche, FicheLapin.id]
+
+# Clés de tri autorisées (?sort=nom, ?sort=-date_prochain_vaccin) ; l'id départage
+# toujours les égalités. Toutes ces colonnes sont indexées.
+FICHES_SORT_KEYS = {
+    "date_creation_fiche": FicheLapin.date_creation_fiche,
+    "date_arrivee_association": FicheLapin.date_arrivee_association,
+    "date_prochain_vaccin": FicheLapin.date_prochain_vaccin,
+    "nom": FicheLapin.nom,
+}
+# Colonnes de tri pouvant être NULL (date_creation_fiche comprise : colonne nullable,
+# modifiable par PUT) ; leurs NULL sont parcourus en dernier
+FICHES_NULLABLE_SORT_KEYS = frozenset({"date_creation_fiche", "date_arrivee_association", "date_prochain_vaccin"})
+
+# Filtres autorisés : nom du paramètre -> prédicat SQL sur une colonne indexée.
+# Rien d'autre n'est traduit en SQL.
+FICHES_FILTERS = {
+    "sexe": lambda value: FicheLapin.sexe == value,
+    "statut_vetonac": lambda value: FicheLapin.statut_vetonac == value,
+    "caractere": lambda value: FicheLapin.caractere == value,
+    "numero_arrivee_association": lambda value: FicheLapin.numero_arrivee_association == value,
+    "date_arrivee_min": lambda value: FicheLapin.date_arrivee_association >= value,
+    "date_arrivee_max": lambda value: FicheLapin.date_arrivee_association <= value,
+    "date_prochain_vaccin_min": lambda value: FicheLapin.date_prochain_vaccin >= value,
+    "date_prochain_vaccin_max": lambda value: FicheLapin.date_prochain_vaccin <= value,
+}
+
+
+def fiches_order_by(sort: str = None) -> tuple:
+    """`?sort=` -> (colonnes du curseur, ordre décroissant)."""
+    if not sort:
+        return FICHES_ORDER_BY, False
+    descending = sort.startswith("-")
+    key = sort.lstrip("-")
+    if key not in FICHES_SORT_KEYS:
+        raise InvalidSort(sort)
+    return [FICHES_SORT_KEYS[key], FicheLapin.id], descending
+
+
+def filter_predicates(filters: dict = None) -> list:
+    predicates = []
+    for name, value in (filters or {}).items():
+        if name not in FICHES_FILTERS:
+            raise InvalidFilter(name)
+        if value is not None:
+            predicates.append(FICHES_FILTERS[name](value))
+    return predicates
+
+
+# Stratégies de chargement de l'auteur (sérialisé dans FicheLapinWithAuthor), par endpoint :
+# - liste ORM (select_ficheslapin) : un seul SELECT ... WHERE users.id IN (...) pour
+#   toute la page ; les endpoints lisent la liste en Core (select_ficheslapin_rows)
+# - détail : une jointure, la fiche et son auteur arrivent dans la même requête
+LIST_AUTHOR_LOADING = selectinload(FicheLapin.auteur)
+DETAIL_AUTHOR_LOADING = joinedload(FicheLapin.auteur)
+
 
+def projection_options(fields: frozenset = None, order_by: list = FICHES_ORDER_BY) -> list:
+    """Restreint le SELECT aux colonnes demandées par ?fields= (plus l'id et la clé de tri)."""
+    if not fields:
+        return []
+    columns = {"id", *(column.key for column in order_by), *(fields - {"auteur"})}
+    if "auteur" in fields:
+        columns.add("auteur_id")
+    return [load_only(*(getattr(FicheLapin, name) for name in sorted(columns)))]
 
-def get_all_ficheslapin(db: Session, user_id: str = None):
+
+def loading_options(author_loading, fields: frozenset = None, order_by: list = FICHES_ORDER_BY) -> list:
+    """Colonnes à lire et chargement de l'auteur, seulement s'il fait partie de la réponse."""
+    options = projection_options(fields, order_by)
+    if not fields or "auteur" in fields:
+        options.append(author_loading)
+    return options
+
+
+def select_ficheslapin(
+    user_id: str = None,
+    cursor: str = None,
+    limit: int = None,
+    fields: frozenset = None,
+    filters: dict = None,
+    sort: str = None,
+):
+    """
+    Construit le select paginé de la liste des fiches (partagé avec ficheLapin_async).
+    Les colonnes du curseur sont données par fiches_order_by(sort).
+    """
+    order_by, descending = fiches_order_by(sort)
+    stmt = select(FicheLapin).options(*loading_options(LIST_AUTHOR_LOADING, fields, order_by))
     if user_id:
-        return db.query(FicheLapin).filter(FicheLapin.auteur_id == user_id).all()
-    return db.query(FicheLapin).all()
+        stmt = stmt.where(FicheLapin.auteur_id == user_id)
+    stmt = stmt.where(*filter_predicates(filters))
+    return paginate(stmt, order_by, cursor, limit, descending, FICHES_NULLABLE_SORT_KEYS)
+
+
+def list_columns(fields: frozenset = None, order_by: list = FICHES_ORDER_BY) -> list:
+    """Colonnes de la fiche lues par la liste : toutes, ou celles de ?fields= (plus l'id et la clé de tri)."""
+    if not fields:
+        return [getattr(FicheLapin, column.key) for column in FicheLapin.__table__.columns]
+    names = {"id", *(column.key for column in order_by), *(fields - {"auteur"})}
+    return [getattr(FicheLapin, name) for name in sorted(names)]
+
+
+def select_ficheslapin_rows(
+    user_id: str = None,
+    cursor: str = None,
+    limit: int = None,
+    fields: frozenset = None,
+    filters: dict = None,
+    sort: str = None,
+) -> RowsQuery:
+    """
+    Même liste que select_ficheslapin, en select Core : des lignes plutôt que des
+    objets ORM. L'auteur, s'il fait partie de la réponse, arrive dans la même
+    requête (jointure externe) au lieu d'un second SELECT ... IN.
+    """
+    order_by, descending = fiches_order_by(sort)
+    columns = list_columns(fields, order_by)
+    stmt = select(*columns)
+    author_columns = ()
+    if not fields or "auteur" in fields:
+        author_columns = user_service.AUTHOR_COLUMNS
+        stmt = stmt.add_columns(*author_columns).outerjoin(User, User.id == FicheLapin.auteur_id)
+    if user_id:
+        stmt = stmt.where(FicheLapin.auteur_id == user_id)
+    stmt = stmt.where(*filter_predicates(filters))
+    stmt, limit = paginate(stmt, order_by, cursor, limit, descending, FICHES_NULLABLE_SORT_KEYS)
+    return RowsQuery(stmt, limit, columns, author_columns)
+
+
+# Export complet : fiches lues par lots sur un curseur côté serveur
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+
+def select_fiches_export():
+    """
+    Toutes les fiches avec leur auteur, dans l'ordre de la liste. L'auteur est
+    joint (many-to-one, compatible avec yield_per) : une seule requête pour l'export.
+    """
+    return (
+        select(FicheLapin)
+        .options(DETAIL_AUTHOR_LOADING)
+        .order_by(*FICHES_ORDER_BY)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+
+
+def select_fichelapin_by_id(fichelapin_id: str, fields: frozenset = None):
+    return (
+        select(FicheLapin)
+        .options(*loading_options(DETAIL_AUTHOR_LOADING, fields))
+        .where(FicheLapin.id == fichelapin_id)
+    )
+
+
+# Recherche plein texte : colonne et table créées par la migration 3 (hors modèle ORM)
+SEARCH_VECTOR = literal_column("fiche_lapin.search_vector")
+FICHE_LAPIN_FTS = table("fiche_lapin_fts", column("id"))
+SEARCH_CONFIG = "french"
+# Poids bm25 des colonnes de fiche_lapin_fts : id (non indexé), nom, caractere,
+# problemes_sante_connus, type_foin, nom_veterinaire
+FTS5_WEIGHTS = (0.0, 10.0, 4.0, 4.0, 1.0, 1.0)
+
+
+def search_terms(q: str) -> list:
+    return re.findall(r"[^\W_]+", q or "")
+
+
+def select_fiches_search(dialect: str, q: str, cursor: str = None, limit: int = None):
+    """
+    Select paginé des fiches correspondant à `q`, les plus pertinentes d'abord.
+
+    Même règle sur les deux bases : tous les mots doivent être présents, chacun
+    comme préfixe (« noise » trouve « Noisette »). Les mots sont extraits de `q`,
+    aucune syntaxe de requête n'est transmise. PostgreSQL interroge le tsvector
+    indexé (GIN, mots racinisés) ; SQLite, la table FTS5 (accents ignorés).
+    Le curseur porte (pertinence, id).
+    """
+    terms = search_terms(q)
+    if dialect == "postgresql":
+        query = func.to_tsquery(
+            cast(literal(SEARCH_CONFIG), REGCONFIG), " & ".join(f"{term}:*" for term in terms)
+        )
+        rank = cast(func.ts_rank(SEARCH_VECTOR, query), Float).label("rank")
+        stmt = select(FicheLapin, rank).where(SEARCH_VECTOR.op("@@")(query))
+    else:
+        match = " ".join(f'"{term}"*' for term in terms)
+        fts = literal_column("fiche_lapin_fts")
+        rank = (-func.bm25(fts, *FTS5_WEIGHTS, type_=Float)).label("rank")
+        stmt = (
+            select(FicheLapin, rank)
+            .join(FICHE_LAPIN_FTS, FICHE_LAPIN_FTS.c.id == FicheLapin.id)
+            .where(fts.op("MATCH")(match))
+        )
+    stmt = stmt.options(LIST_AUTHOR_LOADING)
+    return paginate(stmt, [rank, FicheLapin.id], cursor, limit, descending=True)
+
+
+def make_search_page(rows: list, limit: int) -> Page:
+    items = [row.FicheLapin for row in rows[:limit]]
+    if len(rows) <= limit:
+        return Page(items, None)
+    last = rows[limit - 1]
+    return Page(items, encode_cursor([last.rank, last.FicheLapin.id]))
+
+
+# Recherche approchée des noms : index GIN pg_trgm sur f_unaccent(nom) (migrations 4
+# et 8) quand les extensions sont installées, sinon index n-grammes en mémoire,
+# reconstruit au plus toutes les NAME_INDEX_TTL secondes et tenu à jour par les
+# écritures de ce processus. Les deux ignorent les accents et la casse.
+NAME_INDEX_TTL = float(os.getenv("NAME_INDEX_TTL", "300"))
+NAME_MATCHES_DEFAULT = 10
+name_index = TrigramIndex()
+pg_trgm_installed: dict[str, bool] = {}
+
+# f_unaccent n'existe que si la migration 8 a pu installer unaccent
+PG_TRGM_INSTALLED = text(
+    "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"
+    " AND EXISTS (SELECT 1 FROM pg_proc WHERE proname = 'f_unaccent')"
+)
+
+
+def select_similar_names(q: str, limit: int = NAME_MATCHES_DEFAULT):
+    """Noms proches de `q`, sans les accents, via l'opérateur % de pg_trgm (parcours de l'index GIN)."""
+    nom, query = func.f_unaccent(FicheLapin.nom), func.f_unaccent(q)
+    score = func.similarity(nom, query).label("score")
+    return (
+        select(FicheLapin.id, FicheLapin.nom, score)
+        .where(nom.op("%")(query))
+        .order_by(score.desc(), FicheLapin.nom)
+        .limit(limit)
+    )
+
+
+def select_names():
+    return select(FicheLapin.id, FicheLapin.nom)
+
+
+def name_matches(rows) -> list:
+    return [NameMatch(row.id, row.nom, round(row.score, 4)) for row in rows]
+
 
+def _uses_pg_trgm(db: Session) -> bool:
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return False
+    key = str(bind.url)
+    if key not in pg_trgm_installed:
+        pg_trgm_installed[key] = db.execute(PG_TRGM_INSTALLED).first() is not None
+    return pg_trgm_installed[key]
 
-def get_fichelapin_by_id(fichelapin_id: str, db: Session):
-    record = db.query(FicheLapin).filter(FicheLapin.id == fichelapin_id).first()
+
+@database.read_only
+def get_similar_names(db: Session, q: str, limit: int = NAME_MATCHES_DEFAULT) -> list:
+    if _uses_pg_trgm(db):
+        return name_matches(db.execute(select_similar_names(q, limit)))
+    if not name_index.is_fresh(NAME_INDEX_TTL):
+        name_index.rebuild(db.execute(select_names()).all())
+    return name_index.search(q, limit)
+
+
+@database.read_only
+def get_all_ficheslapin(
+    db: Session,
+    user_id: str = None,
+    cursor: str = None,
+    limit: int = None,
+    fields: frozenset = None,
+    filters: dict = None,
+    sort: str = None,
+) -> Page:
+    query = select_ficheslapin_rows(user_id, cursor, limit, fields, filters, sort)
+    order_by, _ = fiches_order_by(sort)
+    return make_page(query.records(db.execute(query.stmt).all(), "auteur"), order_by, query.limit)
+
+
+def export_ficheslapin_ndjson(db: Session):
+    """
+    Générateur NDJSON (une fiche complète par ligne), un bloc d'octets par lot
+    de EXPORT_BATCH_SIZE fiches : la mémoire utilisée ne dépend pas de la
+    taille de la table. Lecture sur un réplica si possible.
+    """
+    with database.use_replica(db):
+        result = db.execute(select_fiches_export())
+        for fiches in result.scalars().partitions():
+            yield b"".join(dump_fiche(fiche) + b"\n" for fiche in fiches)
+
+
+@database.read_only
+def search_ficheslapin(db: Session, q: str, cursor: str = None, limit: int = None) -> Page:
+    if not search_terms(q):
+        return Page([], None)
+    stmt, limit = select_fiches_search(db.get_bind().dialect.name, q, cursor, limit)
+    return make_search_page(db.execute(stmt).all(), limit)
+
+
+@database.read_only
+def get_fichelapin_by_id(fichelapin_id: str, db: Session, fields: frozenset = None):
+    record = db.execute(select_fichelapin_by_id(fichelapin_id, fields)).scalars().first()
     if not record:
         raise FicheLapinNotFound
     return record
 
 
+def get_fichelapin_json(fichelapin_id: str, db: Session) -> bytes:
+    """
+    Détail complet sérialisé, servi par fiche_cache sans toucher la base quand il y est.
+    Un échec est relu sur le primaire : lue sur un réplica en retard, une version
+    antérieure à refresh_cached_fiche serait remise en cache jusqu'à son ttl.
+    """
+    content = fiche_cache.get(fichelapin_id)
+    if content is None:
+        fiche = db.execute(select_fichelapin_by_id(fichelapin_id)).scalars().first()
+        if not fiche:
+            raise FicheLapinNotFound
+        content = dump_fiche(fiche)
+        fiche_cache.set(fichelapin_id, content)
+    return content
+
+
+def refresh_cached_fiche(fichelapin_id: str, db: Session):
+    """Réécrit l'entrée de fiche_cache après une modification, relue sur le primaire."""
+    stmt = select_fichelapin_by_id(fichelapin_id).execution_options(populate_existing=True)
+    fiche = db.execute(stmt).scalars().first()
+    if fiche is None:
+        fiche_cache.delete(fichelapin_id)
+    else:
+        fiche_cache.set(fichelapin_id, dump_fiche(fiche))
+
+
+def _evict_fiche(fichelapin_id: str = None):
+    """Fiche créée, modifiée ou supprimée par un autre worker."""
+    if fichelapin_id and not fiche_cache.shared:
+        fiche_cache.delete(fichelapin_id)
+    name_index.expire()
+
+
+def _evict_all_fiches(key: str = None):
+    if not fiche_cache.shared:
+        fiche_cache.clear()
+    name_index.expire()
+
+
+invalidation.subscribe(invalidation.FICHE, _evict_fiche)
+# Les fiches en cache embarquent leur auteur (et sont supprimées avec lui)
+invalidation.subscribe(invalidation.USER, _evict_all_fiches)
+invalidation.subscribe(invalidation.RESET, _evict_all_fiches)
+
+
 def create_fichelapin(db: Session, fichelapin: serializers.FicheLapin):
     author_id = fichelapin.auteur_id
 
     # Vérifie que l’auteur existe
-    user_service.get_user_by_id(user_id=author_id, db=db)
+    user_service.get_user_ref(user_id=author_id, db=db)
 
     db_fichelapin = FicheLapin(**fichelapin.model_dump())
 
     db.add(db_fichelapin)
     try:
+        versions_service.bump_versions(db, versions_service.FICHES)
+        # Nouvelle fiche : seul l'index des noms des autres workers est concerné
+        invalidation.publish(db, invalidation.FICHE)
         db.commit()
     except IntegrityError:
         db.rollback()
         raise FicheLapinAlreadyExists
 
     db.refresh(db_fichelapin)
+    name_index.add(db_fichelapin.id, db_fichelapin.nom)
     return db_fichelapin
 
 
 
+# ============================================================================
+# IMPORT EN MASSE (POST /ficheslapin/bulk)
+# ============================================================================
+# Les fiches valides sont insérées par lots dans une seule transaction : COPY
+# sur PostgreSQL, sinon un INSERT multi-lignes (executemany) par lot.
+BULK_IMPORT_BATCH_SIZE = int(os.getenv("BULK_IMPORT_BATCH_SIZE", "500"))
+BULK_IMPORT_MAX_ROWS = int(os.getenv("BULK_IMPORT_MAX_ROWS", "10000"))
+
+
+class BulkImportReport(NamedTuple):
+    ids: list
+    # {"row": index dans la requête, "errors": [...]} pour chaque fiche refusée
+    errors: list
+
+
+def validate_bulk_rows(records: list, auteur_id: str) -> tuple[list, list]:
+    """
+    Valide chaque enregistrement contre serializers.FicheLapin (l'auteur est
+    celui de la requête) -> (lignes à insérer avec leur id, erreurs par ligne).
+    """
+    rows, errors = [], []
+    for index, record in enumerate(records):
+        if not isinstance(record, dict):
+            errors.append({"row": index, "errors": [{"type": "object_type", "loc": [], "msg": "Expected a JSON object"}]})
+            continue
+        try:
+            fiche = serializers.FicheLapin.model_validate({**record, "auteur_id": auteur_id})
+        except ValidationError as e:
+            errors.append({"row": index, "errors": e.errors(include_url=False, include_context=False, include_input=False)})
+            continue
+        rows.append({"id": str(uuid.uuid4()), **fiche.model_dump()})
+    return rows, errors
+
+
+def bulk_batches(rows: list):
+    for start in range(0, len(rows), BULK_IMPORT_BATCH_SIZE):
+        yield rows[start:start + BULK_IMPORT_BATCH_SIZE]
+
+
+def _copy_field(value) -> str:
+    # CSV de COPY : NULL = champ vide non quoté, toute autre valeur est quotée
+    if value is None:
+        return ""
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def copy_rows(db: Session, rows: list):
+    """COPY ... FROM STDIN (psycopg2) sur la connexion de la transaction en cours."""
+    columns = list(rows[0])
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(",".join(_copy_field(row[column]) for column in columns) + "\n")
+    buffer.seek(0)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {FicheLapin.__tablename__} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+        )
+    finally:
+        cursor.close()
+
+
+def insert_fiche_rows(db: Session, rows: list):
+    """Insère un lot de fiches (dicts complets, id compris) dans la transaction en cours."""
+    bind = db.get_bind()
+    if bind.dialect.name == "postgresql" and bind.dialect.driver == "psycopg2":
+        copy_rows(db, rows)
+    else:
+        db.execute(insert(FicheLapin), rows)
+
+
+def import_ficheslapin(db: Session, records: list, auteur_id: str, all_or_nothing: bool = False) -> BulkImportReport:
+    """
+    Crée les fiches valides de `records` en une transaction et rapporte les
+    refusées. Avec all_or_nothing, aucune fiche n'est créée s'il y a une erreur.
+    """
+    user_service.get_user_ref(user_id=auteur_id, db=db)
+    rows, errors = validate_bulk_rows(records, auteur_id)
+    if not rows or (errors and all_or_nothing):
+        return BulkImportReport([], errors)
+
+    try:
+        for batch in bulk_batches(rows):
+            insert_fiche_rows(db, batch)
+        versions_service.bump_versions(db, versions_service.FICHES)
+        invalidation.publish(db, invalidation.FICHE)
+        db.commit()
+    except (IntegrityError, db.get_bind().dialect.dbapi.IntegrityError):
+        db.rollback()
+        raise FicheLapinAlreadyExists
+
+    for row in rows:
+        name_index.add(row["id"], row["nom"])
+    return BulkImportReport([row["id"] for row in rows], errors)
+
+
 def update_fichelapin(fichelapin_id: str, db: Session, updates: dict, user_id: str):
     fiche = db.query(FicheLapin).filter(FicheLapin.id == fichelapin_id).first()
 
@@ -55,19 +516,30 @@ def update_fichelapin(fichelapin_id: str, db: Session, updates: dict, user_id: s
         if hasattr(fiche, key):
             setattr(fiche, key, value)
 
+    versions_service.bump_versions(db, versions_service.FICHES)
+    invalidation.publish(db, invalidation.FICHE, fiche.id)
     db.commit()
     db.refresh(fiche)
+    name_index.add(fiche.id, fiche.nom)
+    refresh_cached_fiche(fiche.id, db)
 
     return fiche
 
 
 
 def delete_fichelapin_by_user(fichelapin_id: str, db: Session, user_id: str):
-    fiche = get_fichelapin_by_id(fichelapin_id, db)
+    # Relu sur le primaire (et non via get_fichelapin_by_id, routé vers un réplica)
+    fiche = db.query(FicheLapin).filter(FicheLapin.id == fichelapin_id).first()
+    if not fiche:
+        raise FicheLapinNotFound
 
     if fiche.auteur_id != user_id:
         raise WrongAuthor
 
     db.delete(fiche)
+    versions_service.bump_versions(db, versions_service.FICHES, versions_service.POSTS)
+    invalidation.publish(db, invalidation.FICHE, fiche.id)
     db.commit()
+    name_index.remove(fiche.id)
+    fiche_cache.delete(fiche.id)
     return fiche
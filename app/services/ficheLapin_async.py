@@ -0,0 +1,249 @@
+"""
+Version asynchrone (AsyncSession) des services de fiches lapin.
+Même API que services.ficheLapin, utilisée quand DATABASE_ASYNC est activé.
+Les selects (et donc le chargement de l'auteur) sont partagés avec la version synchrone :
+aucun lazy loading n'est possible sur une AsyncSession.
+"""
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from models.ficheLapin import FicheLapin
+import database
+import serializers
+from serializers.ficheLapin import dump_fiche
+from services import invalidation_async as invalidation
+from services import user_async as user_service
+from services import versions_async as versions_service
+from services.ficheLapin import (
+    BULK_IMPORT_BATCH_SIZE,
+    BULK_IMPORT_MAX_ROWS,
+    BulkImportReport,
+    NAME_INDEX_TTL,
+    NAME_MATCHES_DEFAULT,
+    PG_TRGM_INSTALLED,
+    pg_trgm_installed,
+    fiches_order_by,
+    make_search_page,
+    name_index,
+    name_matches,
+    bulk_batches,
+    search_terms,
+    select_fiches_search,
+    select_names,
+    select_similar_names,
+    select_fichelapin_by_id,
+    select_fiches_export,
+    select_ficheslapin_rows,
+    validate_bulk_rows,
+)
+from services.cache import fiche_cache
+from services.pagination import Page, make_page
+from exceptions.ficheLapin import FicheLapinNotFound, FicheLapinAlreadyExists, WrongAuthor
+
+
+@database.read_only
+async def get_all_ficheslapin(
+    db: AsyncSession,
+    user_id: str = None,
+    cursor: str = None,
+    limit: int = None,
+    fields: frozenset = None,
+    filters: dict = None,
+    sort: str = None,
+) -> Page:
+    query = select_ficheslapin_rows(user_id, cursor, limit, fields, filters, sort)
+    order_by, _ = fiches_order_by(sort)
+    result = await db.execute(query.stmt)
+    return make_page(query.records(result.all(), "auteur"), order_by, query.limit)
+
+
+async def export_ficheslapin_ndjson(db: AsyncSession):
+    with database.use_replica(db):
+        result = await db.stream(select_fiches_export())
+        async for fiches in result.scalars().partitions():
+            yield b"".join(dump_fiche(fiche) + b"\n" for fiche in fiches)
+
+
+@database.read_only
+async def search_ficheslapin(db: AsyncSession, q: str, cursor: str = None, limit: int = None) -> Page:
+    if not search_terms(q):
+        return Page([], None)
+    stmt, limit = select_fiches_search(db.get_bind().dialect.name, q, cursor, limit)
+    result = await db.execute(stmt)
+    return make_search_page(result.all(), limit)
+
+
+async def _uses_pg_trgm(db: AsyncSession) -> bool:
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return False
+    key = str(bind.url)
+    if key not in pg_trgm_installed:
+        pg_trgm_installed[key] = (await db.execute(PG_TRGM_INSTALLED)).first() is not None
+    return pg_trgm_installed[key]
+
+
+@database.read_only
+async def get_similar_names(db: AsyncSession, q: str, limit: int = NAME_MATCHES_DEFAULT) -> list:
+    if await _uses_pg_trgm(db):
+        return name_matches(await db.execute(select_similar_names(q, limit)))
+    if not name_index.is_fresh(NAME_INDEX_TTL):
+        name_index.rebuild((await db.execute(select_names())).all())
+    return name_index.search(q, limit)
+
+
+@database.read_only
+async def get_fichelapin_by_id(fichelapin_id: str, db: AsyncSession, fields: frozenset = None):
+    result = await db.execute(select_fichelapin_by_id(fichelapin_id, fields))
+    record = result.scalars().first()
+    if not record:
+        raise FicheLapinNotFound
+    return record
+
+
+async def _cache(method, *args):
+    # Un backend réseau (Redis) ne doit pas bloquer la boucle d'événements
+    if fiche_cache.blocking:
+        return await run_in_threadpool(method, *args)
+    return method(*args)
+
+
+async def get_fichelapin_json(fichelapin_id: str, db: AsyncSession) -> bytes:
+    content = await _cache(fiche_cache.get, fichelapin_id)
+    if content is None:
+        # Sur le primaire, voir services.ficheLapin.get_fichelapin_json
+        fiche = (await db.execute(select_fichelapin_by_id(fichelapin_id))).scalars().first()
+        if not fiche:
+            raise FicheLapinNotFound
+        content = dump_fiche(fiche)
+        await _cache(fiche_cache.set, fichelapin_id, content)
+    return content
+
+
+async def refresh_cached_fiche(fichelapin_id: str, db: AsyncSession):
+    stmt = select_fichelapin_by_id(fichelapin_id).execution_options(populate_existing=True)
+    fiche = (await db.execute(stmt)).scalars().first()
+    if fiche is None:
+        await _cache(fiche_cache.delete, fichelapin_id)
+    else:
+        await _cache(fiche_cache.set, fichelapin_id, dump_fiche(fiche))
+
+
+async def create_fichelapin(db: AsyncSession, fichelapin: serializers.FicheLapin):
+    author_id = fichelapin.auteur_id
+
+    # Vérifie que l’auteur existe
+    await user_service.get_user_ref(user_id=author_id, db=db)
+
+    db_fichelapin = FicheLapin(**fichelapin.model_dump())
+
+    db.add(db_fichelapin)
+    try:
+        await versions_service.bump_versions(db, versions_service.FICHES)
+        await invalidation.publish(db, invalidation.FICHE)
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise FicheLapinAlreadyExists
+
+    await db.refresh(db_fichelapin)
+    name_index.add(db_fichelapin.id, db_fichelapin.nom)
+    return db_fichelapin
+
+
+async def copy_rows(db: AsyncSession, rows: list):
+    """
+    COPY (asyncpg copy_records_to_table) sur la connexion de la transaction en cours.
+    Appel direct au pilote : ses violations de contrainte sont converties en
+    IntegrityError SQLAlchemy, comme pour un INSERT.
+    """
+    # Seulement avec le pilote asyncpg (voir insert_fiche_rows)
+    import asyncpg
+
+    columns = list(rows[0])
+    connection = await (await db.connection()).get_raw_connection()
+    try:
+        await connection.driver_connection.copy_records_to_table(
+            FicheLapin.__tablename__,
+            records=[tuple(row[column] for column in columns) for row in rows],
+            columns=columns,
+        )
+    except asyncpg.exceptions.IntegrityConstraintViolationError as e:
+        raise IntegrityError(f"COPY {FicheLapin.__tablename__}", None, e) from e
+
+
+async def insert_fiche_rows(db: AsyncSession, rows: list):
+    bind = db.get_bind()
+    if bind.dialect.name == "postgresql" and bind.dialect.driver == "asyncpg":
+        await copy_rows(db, rows)
+    else:
+        await db.execute(insert(FicheLapin), rows)
+
+
+async def import_ficheslapin(
+    db: AsyncSession, records: list, auteur_id: str, all_or_nothing: bool = False
+) -> BulkImportReport:
+    await user_service.get_user_ref(user_id=auteur_id, db=db)
+    rows, errors = validate_bulk_rows(records, auteur_id)
+    if not rows or (errors and all_or_nothing):
+        return BulkImportReport([], errors)
+
+    try:
+        for batch in bulk_batches(rows):
+            await insert_fiche_rows(db, batch)
+        await versions_service.bump_versions(db, versions_service.FICHES)
+        await invalidation.publish(db, invalidation.FICHE)
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise FicheLapinAlreadyExists
+
+    for row in rows:
+        name_index.add(row["id"], row["nom"])
+    return BulkImportReport([row["id"] for row in rows], errors)
+
+
+async def update_fichelapin(fichelapin_id: str, db: AsyncSession, updates: dict, user_id: str):
+    result = await db.execute(select(FicheLapin).where(FicheLapin.id == fichelapin_id))
+    fiche = result.scalars().first()
+
+    if not fiche:
+        raise FicheLapinNotFound
+
+    if fiche.auteur_id != user_id:
+        raise WrongAuthor
+
+    for key, value in updates.items():
+        if hasattr(fiche, key):
+            setattr(fiche, key, value)
+
+    await versions_service.bump_versions(db, versions_service.FICHES)
+    await invalidation.publish(db, invalidation.FICHE, fiche.id)
+    await db.commit()
+    await db.refresh(fiche)
+    name_index.add(fiche.id, fiche.nom)
+    await refresh_cached_fiche(fiche.id, db)
+
+    return fiche
+
+
+async def delete_fichelapin_by_user(fichelapin_id: str, db: AsyncSession, user_id: str):
+    # Relu sur le primaire (et non via get_fichelapin_by_id, routé vers un réplica)
+    result = await db.execute(select(FicheLapin).where(FicheLapin.id == fichelapin_id))
+    fiche = result.scalars().first()
+    if not fiche:
+        raise FicheLapinNotFound
+
+    if fiche.auteur_id != user_id:
+        raise WrongAuthor
+
+    await db.delete(fiche)
+    await versions_service.bump_versions(db, versions_service.FICHES, versions_service.POSTS)
+    await invalidation.publish(db, invalidation.FICHE, fiche.id)
+    await db.commit()
+    name_index.remove(fiche.id)
+    await _cache(fiche_cache.delete, fiche.id)
+    return fiche
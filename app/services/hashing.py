@@ -0,0 +1,283 @@
+"""
+Hachage des mots de passe (PBKDF2, scrypt, argon2) et pool de processus dédié.
+
+600 000 itérations PBKDF2 prennent des centaines de millisecondes de CPU : elles
+s'exécutent dans un pool de processus (HASH_POOL_WORKERS) pour ne bloquer ni la
+boucle d'événements ni, via le GIL, les autres requêtes du worker. Au-delà de
+HASH_POOL_MAX_PENDING calculs en cours ou en attente, les demandes sont refusées
+(PasswordHashingBusy, 503) au lieu de s'empiler.
+
+Ce module n'importe que la bibliothèque standard (et exceptions.auth, argon2 à
+la demande) : les processus du pool sont démarrés en « spawn » et n'ont pas à
+charger l'application.
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import multiprocessing
+import os
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from exceptions.auth import PasswordHashingBusy
+
+HASH_POOL_WORKERS = int(os.getenv("HASH_POOL_WORKERS", str(min(2, os.cpu_count() or 1))))
+HASH_POOL_MAX_PENDING = int(os.getenv("HASH_POOL_MAX_PENDING", str(HASH_POOL_WORKERS * 4)))
+
+
+# ============================================================================
+# SCHÉMAS DE HACHAGE
+# ============================================================================
+# Un hash stocké est « nom_du_schéma$paramètres... » : le préfixe désigne le
+# schéma qui sait le vérifier. Les nouveaux hashs utilisent PASSWORD_HASH_SCHEME ;
+# un hash d'un autre schéma, ou plus faible que les réglages courants, est
+# recalculé à la connexion suivante (verify_password).
+class HashScheme(ABC):
+    name: str
+
+    @abstractmethod
+    def hash(self, password: str) -> str:
+        ...
+
+    @abstractmethod
+    def verify(self, password: str, stored_hash: str) -> bool:
+        ...
+
+    @abstractmethod
+    def needs_rehash(self, stored_hash: str) -> bool:
+        """Vrai si le hash a été calculé avec un coût inférieur aux réglages courants."""
+        ...
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("utf-8")
+
+
+class Pbkdf2Scheme(HashScheme):
+    """pbkdf2_sha256$iterations$salt$hash"""
+
+    name = "pbkdf2_sha256"
+
+    def __init__(self, iterations: int):
+        self.iterations = iterations
+
+    def hash(self, password: str) -> str:
+        salt = os.urandom(16)
+        dk = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, self.iterations)
+        return f"{self.name}${self.iterations}${_b64(salt)}${_b64(dk)}"
+
+    def _parse(self, stored_hash: str) -> tuple:
+        _, iterations, salt_b64, hash_b64 = stored_hash.split("$")
+        return int(iterations), base64.b64decode(salt_b64), base64.b64decode(hash_b64)
+
+    def verify(self, password: str, stored_hash: str) -> bool:
+        iterations, salt, stored_dk = self._parse(stored_hash)
+        new_dk = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+        return hmac.compare_digest(stored_dk, new_dk)
+
+    def needs_rehash(self, stored_hash: str) -> bool:
+        return self._parse(stored_hash)[0] < self.iterations
+
+
+class ScryptScheme(HashScheme):
+    """scrypt$n,r,p$salt$hash (coût mémoire : 128 * n * r octets)"""
+
+    name = "scrypt"
+
+    def __init__(self, n: int, r: int, p: int):
+        self.n, self.r, self.p = n, r, p
+
+    def _derive(self, password: str, salt: bytes, n: int, r: int, p: int, length: int = 32) -> bytes:
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r, dklen=length)
+
+    def hash(self, password: str) -> str:
+        salt = os.urandom(16)
+        dk = self._derive(password, salt, self.n, self.r, self.p)
+        return f"{self.name}${self.n},{self.r},{self.p}${_b64(salt)}${_b64(dk)}"
+
+    def _parse(self, stored_hash: str) -> tuple:
+        _, params, salt_b64, hash_b64 = stored_hash.split("$")
+        n, r, p = (int(value) for value in params.split(","))
+        return n, r, p, base64.b64decode(salt_b64), base64.b64decode(hash_b64)
+
+    def verify(self, password: str, stored_hash: str) -> bool:
+        n, r, p, salt, stored_dk = self._parse(stored_hash)
+        return hmac.compare_digest(stored_dk, self._derive(password, salt, n, r, p, len(stored_dk)))
+
+    def needs_rehash(self, stored_hash: str) -> bool:
+        n, r, p, _, _ = self._parse(stored_hash)
+        return n < self.n or r < self.r or p < self.p
+
+
+class Argon2Scheme(HashScheme):
+    """argon2id$<chaîne PHC d'argon2-cffi> ; dépendance optionnelle (pip install argon2-cffi)."""
+
+    name = "argon2id"
+
+    def __init__(self, time_cost: int, memory_cost: int, parallelism: int):
+        self.time_cost, self.memory_cost, self.parallelism = time_cost, memory_cost, parallelism
+        self._hasher = None
+
+    @property
+    def hasher(self):
+        if self._hasher is None:
+            from argon2 import PasswordHasher
+
+            self._hasher = PasswordHasher(
+                time_cost=self.time_cost, memory_cost=self.memory_cost, parallelism=self.parallelism
+            )
+        return self._hasher
+
+    def hash(self, password: str) -> str:
+        return f"{self.name}${self.hasher.hash(password)}"
+
+    def verify(self, password: str, stored_hash: str) -> bool:
+        from argon2.exceptions import VerificationError
+
+        try:
+            return self.hasher.verify(stored_hash.split("$", 1)[1], password)
+        except VerificationError:
+            return False
+
+    def needs_rehash(self, stored_hash: str) -> bool:
+        return self.hasher.check_needs_rehash(stored_hash.split("$", 1)[1])
+
+
+SCHEMES = {
+    scheme.name: scheme
+    for scheme in (
+        Pbkdf2Scheme(iterations=int(os.getenv("PBKDF2_ITERATIONS", "600000"))),
+        ScryptScheme(
+            n=int(os.getenv("SCRYPT_N", str(2 ** 15))),
+            r=int(os.getenv("SCRYPT_R", "8")),
+            p=int(os.getenv("SCRYPT_P", "1")),
+        ),
+        Argon2Scheme(
+            time_cost=int(os.getenv("ARGON2_TIME_COST", "3")),
+            memory_cost=int(os.getenv("ARGON2_MEMORY_COST", "65536")),
+            parallelism=int(os.getenv("ARGON2_PARALLELISM", "1")),
+        ),
+    )
+}
+PASSWORD_HASH_SCHEME = os.getenv("PASSWORD_HASH_SCHEME", Pbkdf2Scheme.name)
+if PASSWORD_HASH_SCHEME not in SCHEMES:
+    raise ValueError(f"Unknown PASSWORD_HASH_SCHEME: {PASSWORD_HASH_SCHEME}")
+
+
+def scheme_for(stored_hash: str) -> HashScheme:
+    scheme = SCHEMES.get(stored_hash.split("$", 1)[0])
+    if scheme is None:
+        raise ValueError("Invalid hash format")
+    return scheme
+
+
+def hash_password(password: str, scheme: str = None) -> str:
+    """Hash du mot de passe avec `scheme` (par défaut PASSWORD_HASH_SCHEME)."""
+    return SCHEMES[scheme or PASSWORD_HASH_SCHEME].hash(password)
+
+
+def check_password(password: str, stored_hash: str) -> bool:
+    try:
+        return scheme_for(stored_hash).verify(password, stored_hash)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid hash format")
+
+
+def needs_rehash(stored_hash: str) -> bool:
+    scheme = scheme_for(stored_hash)
+    return scheme.name != PASSWORD_HASH_SCHEME or scheme.needs_rehash(stored_hash)
+
+
+def verify_password(password: str, stored_hash: str) -> tuple:
+    """
+    (mot de passe correct, nouveau hash ou None). Le nouveau hash est calculé
+    dans le même appel (un seul aller-retour vers le pool) quand le hash stocké
+    doit être mis à niveau.
+    """
+    if not check_password(password, stored_hash):
+        return False, None
+    return True, hash_password(password) if needs_rehash(stored_hash) else None
+
+
+class HashingPool:
+    """Pool de processus borné : au plus `max_pending` calculs soumis et non terminés."""
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.pending_peak = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def _done(self, future: Future):
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+
+    def submit(self, fn, *args) -> Future:
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordHashingBusy
+            self.pending += 1
+            self.pending_peak = max(self.pending_peak, self.pending)
+            try:
+                try:
+                    future = self._get_executor().submit(fn, *args)
+                except BrokenProcessPool:
+                    # Un processus du pool est mort : on repart d'un pool neuf
+                    self._executor = None
+                    future = self._get_executor().submit(fn, *args)
+            except BaseException:
+                self.pending -= 1
+                raise
+        future.add_done_callback(self._done)
+        return future
+
+    def run(self, fn, *args):
+        """Exécute fn dans le pool et attend son résultat (services synchrones, hors boucle)."""
+        return self.submit(fn, *args).result()
+
+    async def run_async(self, fn, *args):
+        """Exécute fn dans le pool sans bloquer la boucle d'événements."""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def start(self):
+        """Démarre le pool avant la première connexion (spawn coûte plusieurs centaines de ms)."""
+        futures = [self._get_executor().submit(int) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    def statistics(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "pending_peak": self.pending_peak,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+
+hashing_pool = HashingPool(HASH_POOL_WORKERS, HASH_POOL_MAX_PENDING)
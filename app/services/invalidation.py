@@ -0,0 +1,125 @@
+"""
+Invalidation des caches locaux entre workers, par LISTEN/NOTIFY PostgreSQL.
+
+Les services de mutation appellent publish avant leur commit : PostgreSQL ne
+délivre la notification qu'à la validation de la transaction (jamais si elle
+est annulée). Chaque worker écoute le canal dans un thread (InvalidationListener,
+démarré par main.lifespan) et appelle les handlers enregistrés par les services
+avec subscribe. Un worker ignore ses propres événements : il a déjà invalidé
+ses entrées localement.
+
+Après chaque (re)connexion de l'écoute, les handlers de RESET vident tout :
+des événements ont pu être manqués pendant la coupure.
+"""
+
+import json
+import os
+import select as selectors
+import threading
+import uuid
+from collections import defaultdict
+
+import psycopg2
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+CHANNEL = "cache_invalidation"
+# Délai avant de relancer l'écoute après une erreur de connexion
+LISTEN_RECONNECT_SECONDS = float(os.getenv("CACHE_LISTEN_RECONNECT_SECONDS", "5"))
+# Fréquence à laquelle le thread d'écoute vérifie s'il doit s'arrêter
+LISTEN_POLL_SECONDS = 1.0
+
+FICHE = "fiche"
+# Pas d'événement pour les posts tant qu'aucun worker n'en garde en cache (les ETag lisent table_versions)
+USER = "user"
+# Révocations d'access tokens (services.revocation)
+TOKEN = "token"
+USER_TOKENS = "user_tokens"
+RESET = "*"
+
+WORKER_ID = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+_handlers = defaultdict(list)
+
+
+def subscribe(kind: str, handler):
+    """Appelle handler(key) pour chaque événement `kind` venu d'un autre worker."""
+    _handlers[kind].append(handler)
+
+
+def notification(kind: str, key: str = None):
+    payload = json.dumps({"worker": WORKER_ID, "kind": kind, "key": key})
+    return select(func.pg_notify(CHANNEL, payload))
+
+
+def publish(db: Session, kind: str, key: str = None):
+    """Émet l'événement dans la transaction en cours (sans effet hors PostgreSQL)."""
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(notification(kind, key))
+
+
+def dispatch(payload: str):
+    """Applique un événement reçu ; ceux de ce worker et les charges illisibles sont ignorés."""
+    try:
+        event = json.loads(payload)
+    except ValueError:
+        return
+    if not isinstance(event, dict) or event.get("worker") == WORKER_ID:
+        return
+    for handler in _handlers.get(event.get("kind"), ()):
+        handler(event.get("key"))
+
+
+def reset():
+    for handler in _handlers.get(RESET, ()):
+        handler(None)
+
+
+class InvalidationListener(threading.Thread):
+    """Écoute CHANNEL sur une connexion dédiée (hors pool) et applique les événements."""
+
+    def __init__(self, dsn: str):
+        super().__init__(name="cache-invalidation", daemon=True)
+        self.dsn = dsn
+        self._stopping = threading.Event()
+        self.connected = threading.Event()
+
+    def run(self):
+        while not self._stopping.is_set():
+            try:
+                self._listen()
+            except Exception as e:
+                self.connected.clear()
+                print(f"⚠️ Écoute des invalidations interrompue : {e}")
+                self._stopping.wait(LISTEN_RECONNECT_SECONDS)
+
+    def _listen(self):
+        connection = psycopg2.connect(self.dsn)
+        try:
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+            reset()
+            self.connected.set()
+            while not self._stopping.is_set():
+                if not selectors.select([connection], [], [], LISTEN_POLL_SECONDS)[0]:
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    dispatch(connection.notifies.pop(0).payload)
+        finally:
+            connection.close()
+
+    def stop(self):
+        self._stopping.set()
+        self.join(timeout=LISTEN_POLL_SECONDS * 2)
+
+
+def start_listener(db_engine):
+    """Démarre l'écoute pour le moteur principal ; None hors PostgreSQL."""
+    if db_engine.dialect.name != "postgresql":
+        return None
+    dsn = db_engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+    listener = InvalidationListener(dsn)
+    listener.start()
+    return listener
@@ -0,0 +1,13 @@
+"""
+Version asynchrone (AsyncSession) de la publication des invalidations.
+Même API que services.invalidation.publish, utilisée quand DATABASE_ASYNC est activé.
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from services.invalidation import FICHE, TOKEN, USER, USER_TOKENS, notification
+
+
+async def publish(db: AsyncSession, kind: str, key: str = None):
+    if db.get_bind().dialect.name == "postgresql":
+        await db.execute(notification(kind, key))
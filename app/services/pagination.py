@@ -0,0 +1,120 @@
+"""
+Pagination par curseur (keyset) partagée par les services de listes.
+
+Le curseur est opaque pour le client : c'est l'encodage base64 des valeurs de
+tri de la dernière ligne renvoyée. La page suivante filtre sur
+`(col1, col2) > (v1, v2)`, ce qui reste un parcours d'index quelle que soit
+la profondeur, contrairement à OFFSET.
+
+Une colonne de tri qui peut être NULL (tri facultatif sur une date renseignée
+ou non) est déclarée dans `nullable` : ses NULL sont triés en dernier et la
+comparaison est développée colonne par colonne, `(a, b) > (NULL, x)` n'étant
+jamais vrai en SQL.
+"""
+
+import base64
+import json
+import os
+from datetime import datetime
+from typing import Any, NamedTuple, Optional
+
+from sqlalchemy import and_, literal, or_, tuple_
+
+from exceptions.pagination import InvalidCursor
+
+PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT", "50"))
+PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", "200"))
+
+
+class Page(NamedTuple):
+    items: list
+    next_cursor: Optional[str]
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    if not limit or limit < 1:
+        return PAGE_SIZE_DEFAULT
+    return min(limit, PAGE_SIZE_MAX)
+
+
+def _to_json(value: Any):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def encode_cursor(values: list) -> str:
+    raw = json.dumps([_to_json(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order_by: list) -> list:
+    """Décode un curseur et convertit chaque valeur dans le type de sa colonne de tri."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(order_by):
+            raise ValueError
+        decoded = []
+        for value, column in zip(values, order_by):
+            if value is None:
+                decoded.append(None)
+                continue
+            python_type = column.type.python_type
+            if python_type is datetime:
+                decoded.append(datetime.fromisoformat(value))
+            else:
+                decoded.append(python_type(value))
+        return decoded
+    except (ValueError, TypeError, json.JSONDecodeError):
+        raise InvalidCursor
+
+
+def _after(order_by: list, values: list, descending: bool, nullable: frozenset):
+    """Condition « ligne située après le curseur », NULL triés en dernier."""
+    column, value, rest = order_by[0], values[0], order_by[1:]
+    if value is None:
+        # Le curseur est déjà dans les NULL : seules les colonnes suivantes départagent
+        return and_(column.is_(None), _after(rest, values[1:], descending, nullable))
+    if not nullable & {c.key for c in rest}:
+        # Comparaison de ligne : reste un parcours de l'index (col, id)
+        key = tuple_(*order_by)
+        bound = tuple_(*[literal(v, c.type) for v, c in zip(values, order_by)])
+        clause = key < bound if descending else key > bound
+    else:
+        clause = column < value if descending else column > value
+        clause = or_(clause, and_(column == value, _after(rest, values[1:], descending, nullable)))
+    if column.key in nullable:
+        clause = or_(clause, column.is_(None))
+    return clause
+
+
+def paginate(stmt, order_by: list, cursor: Optional[str] = None, limit: Optional[int] = None,
+             descending: bool = False, nullable: frozenset = frozenset(), skip: Optional[int] = None):
+    """
+    Ajoute tri, condition keyset et limite à un select.
+
+    Renvoie le select et la taille de page effective ; une ligne de plus est
+    demandée pour savoir s'il existe une page suivante (voir make_page).
+    La dernière colonne de `order_by` doit être unique et non nulle (l'id).
+    `skip` (OFFSET) n'est gardé que pour les anciens clients des listes.
+    """
+    limit = clamp_limit(limit)
+    nullable = frozenset(c.key for c in order_by) & frozenset(nullable)
+    if cursor:
+        stmt = stmt.where(_after(order_by, decode_cursor(cursor, order_by), descending, nullable))
+    elif skip:
+        stmt = stmt.offset(skip)
+    ordering = []
+    for c in order_by:
+        direction = c.desc() if descending else c.asc()
+        ordering.append(direction.nulls_last() if c.key in nullable else direction)
+    return stmt.order_by(*ordering).limit(limit + 1), limit
+
+
+def make_page(records: list, order_by: list, limit: int) -> Page:
+    items = list(records[:limit])
+    if len(records) <= limit:
+        return Page(items, None)
+    last = items[-1]
+    return Page(items, encode_cursor([getattr(last, c.key) for c in order_by]))
@@ -1,20 +1,44 @@
 from datetime import datetime
 
+from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 
+import database
 import models
 import serializers
 from sqlalchemy.orm import Session
 
 from services import user as user_service
+from services import versions as versions_service
+from services.pagination import Page, make_page, paginate
+from services.rows import RowsQuery
 from exceptions.post import PostNotFound, PostAlreadyExists, WrongAuthor
 
 
-def get_all_posts(db: Session, skip: int = 0, limit: int = 10) -> list[models.Post]:
-    records = db.query(models.Post).offset(skip).limit(limit).all()
-    for record in records:
-        record.id = str(record.id)
-    return records
+# Ordre stable de la liste : date de création puis id (clé du curseur)
+POSTS_ORDER_BY = [models.Post.date_creation_post, models.Post.id]
+# date_creation_post est nullable : ses NULL sont parcourus en dernier
+POSTS_NULLABLE_SORT_KEYS = frozenset({"date_creation_post"})
+
+
+# Colonnes lues par la liste : celles de PostWithAuthor et la clé de tri
+POST_LIST_COLUMNS = [models.Post.id, models.Post.title, models.Post.content, models.Post.date_creation_post]
+
+
+def select_posts_rows(cursor: str = None, limit: int = None, skip: int = None) -> RowsQuery:
+    """Construit le select Core paginé de la liste des posts, auteur joint dans la même requête (partagé avec posts_async)."""
+    stmt = (
+        select(*POST_LIST_COLUMNS, *user_service.AUTHOR_COLUMNS)
+        .outerjoin(models.User, models.User.id == models.Post.author_id)
+    )
+    stmt, limit = paginate(stmt, POSTS_ORDER_BY, cursor, limit, nullable=POSTS_NULLABLE_SORT_KEYS, skip=skip)
+    return RowsQuery(stmt, limit, POST_LIST_COLUMNS, user_service.AUTHOR_COLUMNS)
+
+
+@database.read_only
+def get_all_posts(db: Session, cursor: str = None, limit: int = None, skip: int = None) -> Page:
+    query = select_posts_rows(cursor, limit, skip)
+    return make_page(query.records(db.execute(query.stmt).all(), "author"), POSTS_ORDER_BY, query.limit)
 
 
 def get_post_by_id(post_id: str, db: Session) -> models.Post:
@@ -39,6 +63,7 @@ def update_post(post_id: str, db: Session, post: serializers.Post) -> models.Pos
         setattr(db_post, var, value) if value else None
     db_post.updated_at = datetime.now()
     db.add(db_post)
+    versions_service.bump_versions(db, versions_service.POSTS)
     db.commit()
     db.refresh(db_post)
     return db_post
@@ -47,6 +72,7 @@ def update_post(post_id: str, db: Session, post: serializers.Post) -> models.Pos
 def delete_post(post_id: str, db: Session) -> models.Post:
     db_post = get_post_by_id(post_id=post_id, db=db)
     db.delete(db_post)
+    versions_service.bump_versions(db, versions_service.POSTS)
     db.commit()
     return db_post
 
@@ -56,6 +82,7 @@ def delete_post_by_user(post_id: str, db: Session, user_id: str) -> models.Post:
     if db_post.author_id != user_id:
         raise WrongAuthor
     db.delete(db_post)
+    versions_service.bump_versions(db, versions_service.POSTS)
     db.commit()
     return db_post
 
@@ -64,6 +91,7 @@ def delete_all_posts(db: Session) -> list[models.Post]:
     records = db.query(models.Post).filter()
     for record in records:
         db.delete(record)
+    versions_service.bump_versions(db, versions_service.POSTS)
     db.commit()
     return records
 
@@ -72,12 +100,13 @@ def create_post(db: Session, post: serializers.Post) -> models.Post:
     author_id = post.author_id
 
     # Peut raise un UserNotFound
-    user_service.get_user_by_id(user_id=author_id, db=db)
+    user_service.get_user_ref(user_id=author_id, db=db)
 
     db_post = models.Post(**post.model_dump())
     db.add(db_post)
 
     try:
+        versions_service.bump_versions(db, versions_service.POSTS)
         db.commit()
     except IntegrityError:
         raise PostAlreadyExists
@@ -90,7 +119,7 @@ def create_post_for_fiche(fiche_id: str, db: Session, post: serializers.Post) ->
     author_id = post.author_id
 
     # Peut raise un UserNotFound
-    user_service.get_user_by_id(user_id=author_id, db=db)
+    user_service.get_user_ref(user_id=author_id, db=db)
 
     fiche = db.query(models.FicheLapin).filter(models.FicheLapin.id == fiche_id).first()
     if not fiche:
@@ -100,6 +129,7 @@ def create_post_for_fiche(fiche_id: str, db: Session, post: serializers.Post) ->
     db.add(db_post)
 
     try:
+        versions_service.bump_versions(db, versions_service.POSTS)
         db.commit()
     except IntegrityError:
         raise PostAlreadyExists
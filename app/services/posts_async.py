@@ -0,0 +1,123 @@
+"""
+Version asynchrone (AsyncSession) des services de posts.
+Même API que services.posts, utilisée quand DATABASE_ASYNC est activé.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import database
+import models
+import serializers
+from services import user_async as user_service
+from services import versions_async as versions_service
+from services.pagination import Page, make_page
+from services.posts import POSTS_ORDER_BY, select_posts_rows
+from exceptions.post import PostNotFound, PostAlreadyExists, WrongAuthor
+
+
+@database.read_only
+async def get_all_posts(db: AsyncSession, cursor: str = None, limit: int = None, skip: int = None) -> Page:
+    query = select_posts_rows(cursor, limit, skip)
+    result = await db.execute(query.stmt)
+    return make_page(query.records(result.all(), "author"), POSTS_ORDER_BY, query.limit)
+
+
+async def get_post_by_id(post_id: str, db: AsyncSession) -> models.Post:
+    result = await db.execute(select(models.Post).where(models.Post.id == post_id))
+    record = result.scalars().first()
+    if not record:
+        raise PostNotFound
+    return record
+
+
+async def get_posts_by_title(title: str, db: AsyncSession) -> list[models.Post]:
+    result = await db.execute(select(models.Post).where(models.Post.title == title))
+    return result.scalars().all()
+
+
+async def update_post(post_id: str, db: AsyncSession, post: serializers.Post) -> models.Post:
+    db_post = await get_post_by_id(post_id=post_id, db=db)
+    for var, value in vars(post).items():
+        setattr(db_post, var, value) if value else None
+    db_post.updated_at = datetime.now()
+    db.add(db_post)
+    await versions_service.bump_versions(db, versions_service.POSTS)
+    await db.commit()
+    await db.refresh(db_post)
+    return db_post
+
+
+async def delete_post(post_id: str, db: AsyncSession) -> models.Post:
+    db_post = await get_post_by_id(post_id=post_id, db=db)
+    await db.delete(db_post)
+    await versions_service.bump_versions(db, versions_service.POSTS)
+    await db.commit()
+    return db_post
+
+
+async def delete_post_by_user(post_id: str, db: AsyncSession, user_id: str) -> models.Post:
+    db_post = await get_post_by_id(post_id=post_id, db=db)
+    if db_post.author_id != user_id:
+        raise WrongAuthor
+    await db.delete(db_post)
+    await versions_service.bump_versions(db, versions_service.POSTS)
+    await db.commit()
+    return db_post
+
+
+async def delete_all_posts(db: AsyncSession) -> list[models.Post]:
+    result = await db.execute(select(models.Post))
+    records = result.scalars().all()
+    await db.execute(delete(models.Post))
+    await versions_service.bump_versions(db, versions_service.POSTS)
+    await db.commit()
+    return records
+
+
+async def create_post(db: AsyncSession, post: serializers.Post) -> models.Post:
+    author_id = post.author_id
+
+    # Peut raise un UserNotFound
+    await user_service.get_user_ref(user_id=author_id, db=db)
+
+    db_post = models.Post(**post.model_dump())
+    db.add(db_post)
+
+    try:
+        await versions_service.bump_versions(db, versions_service.POSTS)
+        await db.commit()
+    except IntegrityError:
+        raise PostAlreadyExists
+
+    await db.refresh(db_post)
+
+    return db_post
+
+
+async def create_post_for_fiche(fiche_id: str, db: AsyncSession, post: serializers.Post) -> models.Post:
+    author_id = post.author_id
+
+    # Peut raise un UserNotFound
+    await user_service.get_user_ref(user_id=author_id, db=db)
+
+    result = await db.execute(select(models.FicheLapin).where(models.FicheLapin.id == fiche_id))
+    fiche = result.scalars().first()
+    if not fiche:
+        raise Exception("Fiche lapin not found")
+
+    db_post = models.Post(**post.model_dump(), fiche_lapin_id=fiche_id, date_creation_post=datetime.utcnow())
+    db.add(db_post)
+
+    try:
+        await versions_service.bump_versions(db, versions_service.POSTS)
+        await db.commit()
+    except IntegrityError:
+        raise PostAlreadyExists
+
+    await db.refresh(db_post)
+
+    return db_post
@@ -0,0 +1,184 @@
+"""
+Limitation de débit de POST /auth/token, vérifiée avant tout hachage.
+
+Deux seaux par tentative de connexion : un par adresse IP (rafales d'un même
+client) et un par nom d'utilisateur (force brute répartie sur plusieurs IP).
+Une tentative refusée renvoie le délai avant la prochaine tentative possible
+(en-tête Retry-After du 429).
+
+Derrière un reverse proxy ou un répartiteur, l'adresse de la connexion est
+celle du proxy : tous les clients partageraient un seul seau. Soit uvicorn
+réécrit l'adresse (--proxy-headers --forwarded-allow-ips=<proxies>), soit
+TRUSTED_PROXY_HOPS donne le nombre de proxies de confiance qui ajoutent chacun
+leur entrée à X-Forwarded-For (voir client_address).
+
+Backends (RATE_LIMIT_BACKEND) :
+- memory : seaux à jetons par worker, répartis sur des shards ayant chacun
+  son verrou pour que les requêtes concurrentes ne se sérialisent pas ;
+- redis : compteurs à fenêtre glissante partagés par tous les workers (deux
+  fenêtres fixes pondérées). Un serveur indisponible laisse passer.
+"""
+
+import math
+import os
+import threading
+import time
+
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+RATE_LIMIT_SHARDS = int(os.getenv("RATE_LIMIT_SHARDS", "16"))
+# Au-delà, les seaux pleins (clients inactifs) sont oubliés
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+# capacité (rafale autorisée), puis tentatives par minute
+LOGIN_IP_BURST = int(os.getenv("LOGIN_IP_BURST", "20"))
+LOGIN_IP_PER_MINUTE = float(os.getenv("LOGIN_IP_PER_MINUTE", "10"))
+LOGIN_USERNAME_BURST = int(os.getenv("LOGIN_USERNAME_BURST", "5"))
+LOGIN_USERNAME_PER_MINUTE = float(os.getenv("LOGIN_USERNAME_PER_MINUTE", "5"))
+# Proxies de confiance devant l'application ; 0 : adresse de la connexion
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+
+
+def client_address(request) -> str:
+    """
+    Adresse du client pour le seau par IP. Avec TRUSTED_PROXY_HOPS = n, c'est
+    l'entrée de X-Forwarded-For ajoutée par le plus éloigné des n proxies : les
+    entrées précédentes viennent du client et peuvent être falsifiées.
+    """
+    if TRUSTED_PROXY_HOPS:
+        hops = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+        if len(hops) >= TRUSTED_PROXY_HOPS:
+            return hops[-TRUSTED_PROXY_HOPS]
+    return request.client.host if request.client else "unknown"
+
+
+class _Shard:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets: dict[str, tuple[float, float]] = {}
+
+
+class TokenBucketLimiter:
+    """`capacity` jetons par clé, rechargés de `per_second` par seconde ; une tentative coûte un jeton."""
+
+    def __init__(self, capacity: int, per_second: float, shards: int = RATE_LIMIT_SHARDS,
+                 max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.capacity = capacity
+        self.per_second = per_second
+        self._shards = [_Shard() for _ in range(max(shards, 1))]
+        self._max_keys_per_shard = max(max_keys // len(self._shards), 1)
+
+    def _refilled(self, tokens: float, updated: float, now: float) -> float:
+        return min(self.capacity, tokens + (now - updated) * self.per_second)
+
+    def _prune(self, shard: _Shard, now: float):
+        for key, (tokens, updated) in list(shard.buckets.items()):
+            if self._refilled(tokens, updated, now) >= self.capacity:
+                del shard.buckets[key]
+
+    def hit(self, key: str) -> float:
+        """Consomme un jeton : 0 si la tentative est admise, sinon les secondes à attendre."""
+        shard = self._shards[hash(key) % len(self._shards)]
+        now = time.monotonic()
+        with shard.lock:
+            tokens, updated = shard.buckets.get(key, (self.capacity, now))
+            tokens = self._refilled(tokens, updated, now)
+            if tokens >= 1:
+                shard.buckets[key] = (tokens - 1, now)
+                if len(shard.buckets) > self._max_keys_per_shard:
+                    self._prune(shard, now)
+                return 0.0
+            shard.buckets[key] = (tokens, now)
+            return (1 - tokens) / self.per_second
+
+    def clear(self):
+        for shard in self._shards:
+            with shard.lock:
+                shard.buckets.clear()
+
+
+class SlidingWindowLimiter:
+    """
+    Au plus `capacity` tentatives par fenêtre de capacity / per_second secondes,
+    comptées dans Redis : compteur de la fenêtre courante plus celui de la
+    précédente, pondéré par la part de celle-ci encore couverte.
+    """
+
+    def __init__(self, client, capacity: int, per_second: float, prefix: str):
+        self.client = client
+        self.capacity = capacity
+        self.window = capacity / per_second
+        self.prefix = prefix
+        self.errors = 0
+
+    def hit(self, key: str) -> float:
+        now = time.time()
+        current = int(now // self.window)
+        elapsed = now - current * self.window
+        current_key = f"{self.prefix}{key}:{current}"
+        try:
+            pipeline = self.client.pipeline()
+            pipeline.incr(current_key)
+            pipeline.expire(current_key, math.ceil(self.window * 2))
+            pipeline.get(f"{self.prefix}{key}:{current - 1}")
+            count, _, previous = pipeline.execute()
+        except Exception:
+            self.errors += 1
+            return 0.0
+        weighted = int(previous or 0) * (1 - elapsed / self.window) + count
+        if weighted <= self.capacity:
+            return 0.0
+        return self.window - elapsed
+
+    def clear(self):
+        try:
+            keys = list(self.client.scan_iter(match=self.prefix + "*"))
+            if keys:
+                self.client.delete(*keys)
+        except Exception:
+            self.errors += 1
+
+
+class LoginRateLimiter:
+    def __init__(self, by_ip, by_username):
+        self.by_ip = by_ip
+        self.by_username = by_username
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.rejected = 0
+
+    def check(self, ip: str, username: str) -> int:
+        """0 si la tentative est admise, sinon la valeur de Retry-After (secondes entières)."""
+        wait = self.by_ip.hit(ip) or self.by_username.hit(username.strip().lower())
+        with self._lock:
+            if wait:
+                self.rejected += 1
+            else:
+                self.allowed += 1
+        return math.ceil(wait)
+
+    def clear(self):
+        self.by_ip.clear()
+        self.by_username.clear()
+
+    def statistics(self) -> dict:
+        with self._lock:
+            return {"backend": RATE_LIMIT_BACKEND, "allowed": self.allowed, "rejected": self.rejected}
+
+
+def make_login_limiter() -> LoginRateLimiter:
+    if RATE_LIMIT_BACKEND == "redis":
+        # Dépendance optionnelle, seulement pour ce backend
+        import redis
+
+        client = redis.Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+        return LoginRateLimiter(
+            SlidingWindowLimiter(client, LOGIN_IP_BURST, LOGIN_IP_PER_MINUTE / 60, prefix="login:ip:"),
+            SlidingWindowLimiter(client, LOGIN_USERNAME_BURST, LOGIN_USERNAME_PER_MINUTE / 60, prefix="login:user:"),
+        )
+    return LoginRateLimiter(
+        TokenBucketLimiter(LOGIN_IP_BURST, LOGIN_IP_PER_MINUTE / 60),
+        TokenBucketLimiter(LOGIN_USERNAME_BURST, LOGIN_USERNAME_PER_MINUTE / 60),
+    )
+
+
+login_limiter = make_login_limiter()
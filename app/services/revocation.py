@@ -0,0 +1,94 @@
+"""
+Révocation des access tokens avant leur expiration.
+
+Deux listes en mémoire de chaque worker, propagées aux autres par les
+événements de services.invalidation (émis dans la transaction de l'écriture) :
+- TOKEN : un token précis, par empreinte (déconnexion) ;
+- USER_TOKENS : tous les tokens d'un utilisateur émis avant un instant
+  (suppression du compte, changement de rôle : le rôle est dans le token).
+
+Chaque entrée est oubliée quand plus aucun token qu'elle concerne n'est
+valide. Un événement manqué pendant une coupure de l'écoute n'est pas rejoué :
+le token concerné reste accepté par les autres workers jusqu'à son expiration.
+"""
+
+import os
+import threading
+import time
+
+from services import invalidation
+
+# Au moins la durée de vie d'un access token (services.auth.JWT_EXPIRATION_MINUTES)
+USER_REVOCATION_SECONDS = float(os.getenv("USER_REVOCATION_SECONDS", "3600"))
+
+# Empreinte du token (hex) -> son expiration ; id utilisateur -> instant de la révocation (epoch)
+revoked_tokens: dict[str, float] = {}
+revoked_users: dict[str, float] = {}
+_lock = threading.Lock()
+
+
+def _prune(now: float):
+    for key, expires_at in list(revoked_tokens.items()):
+        if expires_at <= now:
+            del revoked_tokens[key]
+    for user_id, cutoff in list(revoked_users.items()):
+        if cutoff + USER_REVOCATION_SECONDS <= now:
+            del revoked_users[user_id]
+
+
+def revoke_token(key: str, expires_at: float):
+    now = time.time()
+    with _lock:
+        _prune(now)
+        if expires_at > now:
+            revoked_tokens[key] = expires_at
+
+
+def revoke_user(user_id: str, cutoff: float):
+    """Refuse les tokens de l'utilisateur émis avant `cutoff`."""
+    with _lock:
+        _prune(time.time())
+        revoked_users[user_id] = max(cutoff, revoked_users.get(user_id, 0.0))
+
+
+def is_revoked(key: str, payload: dict) -> bool:
+    if key in revoked_tokens:
+        return True
+    cutoff = revoked_users.get(payload.get("user_id"))
+    # Un token sans iat (émis avant son ajout) est plus ancien que toute révocation
+    return cutoff is not None and payload.get("iat", 0) < cutoff
+
+
+def event_key(subject: str, instant: float) -> str:
+    """Clé d'un événement TOKEN (empreinte, expiration) ou USER_TOKENS (id, révocation)."""
+    return f"{subject}:{instant}"
+
+
+def _parse(key: str):
+    subject, _, instant = (key or "").rpartition(":")
+    try:
+        return subject, float(instant)
+    except ValueError:
+        return None, None
+
+
+def _on_token(key: str):
+    subject, expires_at = _parse(key)
+    if subject:
+        revoke_token(subject, expires_at)
+
+
+def _on_user(key: str):
+    subject, cutoff = _parse(key)
+    if subject:
+        revoke_user(subject, cutoff)
+
+
+def clear():
+    with _lock:
+        revoked_tokens.clear()
+        revoked_users.clear()
+
+
+invalidation.subscribe(invalidation.TOKEN, _on_token)
+invalidation.subscribe(invalidation.USER_TOKENS, _on_user)
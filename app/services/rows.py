@@ -0,0 +1,44 @@
+"""
+Lecture des listes par select Core : les lignes (tuples de colonnes) deviennent
+des enregistrements légers, sans objet ORM, carte d'identité ni suivi des
+modifications. Les sérialiseurs (from_attributes) et le curseur de pagination
+les lisent comme des objets ORM (fiche.nom, post.author.username).
+"""
+
+from typing import NamedTuple
+
+
+class Record(dict):
+    """Dictionnaire lisible aussi par attribut."""
+
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+class RowsQuery(NamedTuple):
+    """Select Core paginé et forme de ses lignes : colonnes, puis colonnes de la relation jointe."""
+
+    stmt: object
+    limit: int
+    columns: list
+    # Vide si la relation n'est pas lue ; sa clé primaire en premier
+    related_columns: tuple = ()
+
+    def records(self, rows, relation: str) -> list:
+        """La relation est imbriquée sous `relation` (None si la jointure externe ne trouve rien)."""
+        keys = [column.key for column in self.columns]
+        if not self.related_columns:
+            return [Record(zip(keys, row)) for row in rows]
+        split = len(keys)
+        related_keys = [column.key for column in self.related_columns]
+        records = []
+        for row in rows:
+            record = Record(zip(keys, row[:split]))
+            record[relation] = Record(zip(related_keys, row[split:])) if row[split] is not None else None
+            records.append(record)
+        return records
@@ -0,0 +1,114 @@
+"""
+Index n-grammes en mémoire pour la recherche approchée des noms de lapins.
+
+Repli de l'index GIN pg_trgm (migration 4) quand l'extension n'est pas
+disponible, et seul moteur sous SQLite. Même découpage que pg_trgm : chaque mot
+est encadré de deux espaces devant et d'un derrière, puis coupé en trigrammes ;
+la similarité est le nombre de trigrammes communs divisé par le nombre de
+trigrammes distincts des deux noms. Les accents et la casse sont ignorés
+(« calin » trouve « Câlin »), comme par f_unaccent sous PostgreSQL (migration 8).
+
+Les listes de postings (trigramme -> ids) limitent le calcul aux noms qui
+partagent au moins un trigramme avec la requête.
+"""
+
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from typing import NamedTuple, Optional
+
+# Seuil par défaut de pg_trgm (pg_trgm.similarity_threshold)
+SIMILARITY_THRESHOLD = 0.3
+
+
+class NameMatch(NamedTuple):
+    id: str
+    nom: str
+    score: float
+
+
+def normalize(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def trigrams(text: str) -> frozenset:
+    grams = set()
+    for word in re.findall(r"[^\W_]+", normalize(text)):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+class TrigramIndex:
+    """Noms indexés par trigramme ; sûr entre threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._names: dict[str, str] = {}
+        self._grams: dict[str, frozenset] = {}
+        self._postings: dict[str, set] = defaultdict(set)
+        self.built_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def _remove(self, key: str):
+        for gram in self._grams.pop(key, ()):
+            postings = self._postings[gram]
+            postings.discard(key)
+            if not postings:
+                del self._postings[gram]
+        self._names.pop(key, None)
+
+    def _add(self, key: str, name: str):
+        self._remove(key)
+        grams = trigrams(name)
+        self._names[key] = name
+        self._grams[key] = grams
+        for gram in grams:
+            self._postings[gram].add(key)
+
+    def add(self, key: str, name: str):
+        with self._lock:
+            self._add(key, name)
+
+    def remove(self, key: str):
+        with self._lock:
+            self._remove(key)
+
+    def rebuild(self, items):
+        """Remplace tout le contenu par les couples (id, nom) donnés."""
+        with self._lock:
+            self._names.clear()
+            self._grams.clear()
+            self._postings.clear()
+            for key, name in items:
+                self._add(key, name)
+            self.built_at = time.monotonic()
+
+    def expire(self):
+        """Force la reconstruction au prochain accès (modification faite par un autre worker)."""
+        self.built_at = None
+
+    def is_fresh(self, ttl: float) -> bool:
+        return self.built_at is not None and time.monotonic() - self.built_at < ttl
+
+    def search(self, query: str, limit: int = 10, threshold: float = SIMILARITY_THRESHOLD) -> list:
+        """Les `limit` noms les plus proches de `query`, du plus au moins similaire."""
+        wanted = trigrams(query)
+        if not wanted:
+            return []
+        with self._lock:
+            shared = Counter()
+            for gram in wanted:
+                shared.update(self._postings.get(gram, ()))
+            matches = []
+            for key, common in shared.items():
+                score = common / (len(wanted) + len(self._grams[key]) - common)
+                if score >= threshold:
+                    matches.append(NameMatch(key, self._names[key], round(score, 4)))
+        return heapq.nsmallest(limit, matches, key=lambda match: (-match.score, match.nom))
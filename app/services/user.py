@@ -1,18 +1,63 @@
+import os
+import time
 from datetime import datetime
+from typing import NamedTuple
 
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+import database
 import models
 import serializers
 from exceptions.user import UserNotFound
-from services.auth import hash_password
+from services import invalidation, revocation
+from services.hashing import hash_password, hashing_pool
+from services.cache import MISSING, LRUCache, fiche_cache
+from services.pagination import Page, make_page, paginate
+from services import versions as versions_service
 
 
-def get_all_users(db: Session, skip: int = 0, limit: int = 10) -> list[models.User]:
-    records = db.query(models.User).offset(skip).limit(limit).all()
+# Les utilisateurs n'ont pas de date de création : l'id suffit comme clé de curseur
+USERS_ORDER_BY = [models.User.id]
+
+# Auteur sérialisé dans les listes de fiches et de posts (serializers.UserOutput, sans
+# le hash du mot de passe), lu par jointure dans la même requête ; la clé primaire en premier (RowsQuery)
+AUTHOR_COLUMNS = (
+    models.User.id, models.User.username, models.User.firstName,
+    models.User.lastName, models.User.email, models.User.role,
+)
+
+
+# Existence et rôle des auteurs, vérifiés à chaque création de fiche ou de post.
+# Invalidé par update_user et delete_user de ce processus, sinon après USER_CACHE_TTL secondes.
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+user_cache = LRUCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+invalidation.subscribe(invalidation.USER, user_cache.invalidate)
+invalidation.subscribe(invalidation.RESET, lambda key: user_cache.clear())
+
+
+class UserRef(NamedTuple):
+    id: str
+    role: str
+
+
+def select_user_ref(user_id: str):
+    return select(models.User.id, models.User.role).where(models.User.id == user_id)
+
+
+def select_users(cursor: str = None, limit: int = None, skip: int = None):
+    """Construit le select paginé de la liste des utilisateurs (partagé avec user_async)."""
+    return paginate(select(models.User), USERS_ORDER_BY, cursor, limit, skip=skip)
+
+
+@database.read_only
+def get_all_users(db: Session, cursor: str = None, limit: int = None, skip: int = None) -> Page:
+    stmt, limit = select_users(cursor, limit, skip)
+    records = db.execute(stmt).scalars().all()
     for record in records:
         record.id = str(record.id)
-    return records
+    return make_page(records, USERS_ORDER_BY, limit)
 
 
 def get_user_by_id(user_id: str, db: Session) -> models.User:
@@ -23,6 +68,18 @@ def get_user_by_id(user_id: str, db: Session) -> models.User:
     return record
 
 
+def get_user_ref(user_id: str, db: Session) -> UserRef:
+    """Id et rôle d'un utilisateur existant, depuis user_cache si possible (lève UserNotFound)."""
+    ref = user_cache.get(user_id)
+    if ref is MISSING:
+        row = db.execute(select_user_ref(user_id)).first()
+        if not row:
+            raise UserNotFound
+        ref = UserRef(str(row.id), row.role)
+        user_cache.set(user_id, ref)
+    return ref
+
+
 def get_users_by_username(title: str, db: Session) -> list[models.User]:
     records = db.query(models.User).filter(models.User.username == username).all()
     for record in records:
@@ -32,11 +89,23 @@ def get_users_by_username(title: str, db: Session) -> list[models.User]:
 
 def update_user(user_id: str, db: Session, user: serializers.User) -> models.User:
     db_user = get_user_by_id(user_id=user_id, db=db)
+    # Le rôle est dans les access tokens : ceux émis avant le changement sont révoqués
+    role_changed = bool(user.role) and user.role != db_user.role
     for var, value in vars(user).items():
         setattr(db_user, var, value) if value else None
     db_user.updated_at = datetime.now()
     db.add(db_user)
+    versions_service.bump_versions(db, versions_service.USERS)
+    invalidation.publish(db, invalidation.USER, user_id)
+    cutoff = time.time()
+    if role_changed:
+        invalidation.publish(db, invalidation.USER_TOKENS, revocation.event_key(user_id, cutoff))
     db.commit()
+    if role_changed:
+        revocation.revoke_user(user_id, cutoff)
+    user_cache.invalidate(user_id)
+    # Les fiches en cache embarquent leur auteur (et sont supprimées avec lui)
+    fiche_cache.clear()
     db.refresh(db_user)
     return db_user
 
@@ -44,7 +113,14 @@ def update_user(user_id: str, db: Session, user: serializers.User) -> models.Use
 def delete_user(user_id: str, db: Session) -> models.User:
     db_user = get_user_by_id(user_id=user_id, db=db)
     db.delete(db_user)
+    versions_service.bump_versions(db, versions_service.FICHES, versions_service.POSTS, versions_service.USERS)
+    invalidation.publish(db, invalidation.USER, user_id)
+    cutoff = time.time()
+    invalidation.publish(db, invalidation.USER_TOKENS, revocation.event_key(user_id, cutoff))
     db.commit()
+    revocation.revoke_user(user_id, cutoff)
+    user_cache.invalidate(user_id)
+    fiche_cache.clear()
     return db_user
 
 
@@ -54,7 +130,7 @@ def create_user(db: Session, user: serializers.User) -> models.User:
     lastName = user.lastName
     email = user.email
     role = user.role
-    hashed_password = hash_password(user.password)
+    hashed_password = hashing_pool.run(hash_password, user.password)
     db_user = models.User(username=username, password=hashed_password, firstName=firstName, lastName=lastName, email=email, role=role)
     db.add(db_user)
     db.commit()
@@ -0,0 +1,106 @@
+"""
+Version asynchrone (AsyncSession) des services utilisateurs.
+Même API que services.user, utilisée quand DATABASE_ASYNC est activé.
+"""
+
+import time
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import database
+import models
+import serializers
+from exceptions.user import UserNotFound
+from services import invalidation_async as invalidation
+from services import revocation
+from services.hashing import hash_password, hashing_pool
+from services.pagination import Page, make_page
+from services.cache import MISSING, fiche_cache
+from services.user import USERS_ORDER_BY, UserRef, select_user_ref, select_users, user_cache
+from services import versions_async as versions_service
+
+
+@database.read_only
+async def get_all_users(db: AsyncSession, cursor: str = None, limit: int = None, skip: int = None) -> Page:
+    stmt, limit = select_users(cursor, limit, skip)
+    result = await db.execute(stmt)
+    return make_page(result.scalars().all(), USERS_ORDER_BY, limit)
+
+
+async def get_user_by_id(user_id: str, db: AsyncSession) -> models.User:
+    result = await db.execute(select(models.User).where(models.User.id == user_id))
+    record = result.scalars().first()
+    if not record:
+        raise UserNotFound
+    return record
+
+
+async def get_user_ref(user_id: str, db: AsyncSession) -> UserRef:
+    ref = user_cache.get(user_id)
+    if ref is MISSING:
+        row = (await db.execute(select_user_ref(user_id))).first()
+        if not row:
+            raise UserNotFound
+        ref = UserRef(str(row.id), row.role)
+        user_cache.set(user_id, ref)
+    return ref
+
+
+async def get_users_by_username(username: str, db: AsyncSession) -> list[models.User]:
+    result = await db.execute(select(models.User).where(models.User.username == username))
+    return result.scalars().all()
+
+
+async def update_user(user_id: str, db: AsyncSession, user: serializers.User) -> models.User:
+    db_user = await get_user_by_id(user_id=user_id, db=db)
+    role_changed = bool(user.role) and user.role != db_user.role
+    for var, value in vars(user).items():
+        setattr(db_user, var, value) if value else None
+    db_user.updated_at = datetime.now()
+    db.add(db_user)
+    await versions_service.bump_versions(db, versions_service.USERS)
+    await invalidation.publish(db, invalidation.USER, user_id)
+    cutoff = time.time()
+    if role_changed:
+        await invalidation.publish(db, invalidation.USER_TOKENS, revocation.event_key(user_id, cutoff))
+    await db.commit()
+    if role_changed:
+        revocation.revoke_user(user_id, cutoff)
+    user_cache.invalidate(user_id)
+    # Les fiches en cache embarquent leur auteur (et sont supprimées avec lui)
+    fiche_cache.clear()
+    await db.refresh(db_user)
+    return db_user
+
+
+async def delete_user(user_id: str, db: AsyncSession) -> models.User:
+    db_user = await get_user_by_id(user_id=user_id, db=db)
+    await db.delete(db_user)
+    await versions_service.bump_versions(db, versions_service.FICHES, versions_service.POSTS, versions_service.USERS)
+    await invalidation.publish(db, invalidation.USER, user_id)
+    cutoff = time.time()
+    await invalidation.publish(db, invalidation.USER_TOKENS, revocation.event_key(user_id, cutoff))
+    await db.commit()
+    revocation.revoke_user(user_id, cutoff)
+    user_cache.invalidate(user_id)
+    fiche_cache.clear()
+    return db_user
+
+
+async def create_user(db: AsyncSession, user: serializers.User) -> models.User:
+    # Le hachage PBKDF2 est coûteux en CPU : il s'exécute dans le pool de processus dédié
+    hashed_password = await hashing_pool.run_async(hash_password, user.password)
+    db_user = models.User(
+        username=user.username,
+        password=hashed_password,
+        firstName=user.firstName,
+        lastName=user.lastName,
+        email=user.email,
+        role=user.role,
+    )
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
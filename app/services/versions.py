@@ -0,0 +1,52 @@
+"""
+Compteurs d'écritures par table, base des ETag des listes et détails.
+
+Les services de mutation appellent bump_versions avant leur commit : le
+compteur avance dans la même transaction que les données, donc jamais sans
+elles. Les routers lisent les compteurs avant les données et au même endroit
+qu'elles (get_versions est read_only : même réplica que les listes, voir
+database.RoutingSession), pour qu'une écriture concurrente ou un réplica en
+retard donne au pire un ETag plus ancien que la réponse, jamais l'inverse.
+"""
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+import database
+from models.tableVersion import TableVersion
+
+FICHES = "fiche_lapin"
+POSTS = "posts"
+USERS = "users"
+
+
+def select_versions(tables: tuple):
+    return select(TableVersion.name, TableVersion.version).where(TableVersion.name.in_(tables))
+
+
+def increment_versions(dialect_name: str, tables: tuple):
+    """
+    Un seul INSERT ... ON CONFLICT DO UPDATE pour toutes les tables : les lignes
+    semées par la migration 5 sont incrémentées, une ligne absente (create_all
+    des tests) est créée sans course entre deux premiers écrivains. Les tables
+    sont triées pour que deux transactions verrouillent les lignes dans le même
+    ordre (pas d'interblocage entre delete_user et une création de fiche).
+    """
+    insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    stmt = insert(TableVersion).values([{"name": table, "version": 1} for table in sorted(set(tables))])
+    return stmt.on_conflict_do_update(
+        index_elements=[TableVersion.name], set_={"version": TableVersion.version + 1}
+    )
+
+
+@database.read_only
+def get_versions(db: Session, tables: tuple) -> dict:
+    versions = dict.fromkeys(tables, 0)
+    versions.update(db.execute(select_versions(tables)).all())
+    return versions
+
+
+def bump_versions(db: Session, *tables: str):
+    """Incrémente les compteurs des tables modifiées, dans la transaction en cours."""
+    db.execute(increment_versions(db.get_bind().dialect.name, tables))
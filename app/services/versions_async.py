@@ -0,0 +1,21 @@
+"""
+Version asynchrone (AsyncSession) des compteurs d'écritures.
+Même API que services.versions, utilisée quand DATABASE_ASYNC est activé.
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import database
+
+from services.versions import FICHES, POSTS, USERS, increment_versions, select_versions
+
+
+@database.read_only
+async def get_versions(db: AsyncSession, tables: tuple) -> dict:
+    versions = dict.fromkeys(tables, 0)
+    versions.update((await db.execute(select_versions(tables))).all())
+    return versions
+
+
+async def bump_versions(db: AsyncSession, *tables: str):
+    await db.execute(increment_versions(db.get_bind().dialect.name, tables))
@@ -3,9 +3,14 @@ Configuration globale pour pytest
 """
 
 import os
+from contextlib import asynccontextmanager
+from functools import partial
+
 import pytest
+import pytest_asyncio
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from services.auth import hash_password
 from models import User
@@ -47,12 +52,93 @@ def test_db_session(test_db_engine):
         BaseSQL.metadata.drop_all(bind=test_db_engine)
 
 
+@pytest.fixture(scope="function")
+def fiche_search(test_db_engine, test_db_session):
+    """Installe la recherche plein texte (migration 3) sur la base de test"""
+    from migrations.versions import v0003_fiche_search
+
+    # Termine la transaction de la session du test : ses verrous bloqueraient le DDL
+    test_db_session.commit()
+    with test_db_engine.begin() as connection:
+        v0003_fiche_search.upgrade(connection)
+    yield
+    test_db_session.commit()
+    with test_db_engine.begin() as connection:
+        v0003_fiche_search.downgrade(connection)
+
+
+@pytest_asyncio.fixture(scope="function")
+async def test_async_db_session(test_db_session):
+    """Fixture pour une AsyncSession sur la même base que test_db_session"""
+    from database import to_async_url
+
+    engine = create_async_engine(to_async_url(os.getenv("DATABASE_URL")))
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+
+
 @pytest.fixture(scope="function")
 def client():
     """Fixture pour TestClient"""
+    import database
     from main import app
 
-    return TestClient(app)
+    if not database.DATABASE_ASYNC:
+        yield TestClient(app)
+        return
+
+    # Mode asynchrone : les connexions asyncpg du pool sont liées à la boucle qui
+    # les a ouvertes. Le client garde donc une seule boucle pour tout le test
+    # (sans exécuter le cycle de vie de l'application : migrations, préchauffage),
+    # puis les connexions sont abandonnées pour le test suivant.
+    @asynccontextmanager
+    async def no_lifespan(app):
+        yield
+
+    lifespan = app.router.lifespan_context
+    app.router.lifespan_context = no_lifespan
+    try:
+        with TestClient(app) as test_client:
+            yield test_client
+            for db_engine in (database.async_engine, *database.async_replica_engines):
+                test_client.portal.call(partial(db_engine.dispose, close=False))
+    finally:
+        app.router.lifespan_context = lifespan
+
+
+@pytest.fixture(scope="function")
+def query_counter():
+    """Compte les requêtes SQL émises par le moteur de l'application (synchrone ou asynchrone)"""
+    import database
+
+    # Les événements d'un moteur asynchrone se posent sur son sync_engine
+    engine = database.async_engine.sync_engine if database.DATABASE_ASYNC else database.engine
+    statements = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _count)
+    yield statements
+    event.remove(engine, "before_cursor_execute", _count)
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Vide les caches en mémoire (et le limiteur de connexions) : les tests modifient la base sans passer par les services"""
+    from services import revocation
+    from services.auth import token_cache
+    from services.cache import fiche_cache
+    from services.ratelimit import login_limiter
+    from services.user import user_cache
+
+    user_cache.clear()
+    fiche_cache.clear()
+    token_cache.clear()
+    revocation.clear()
+    login_limiter.clear()
+    yield
 
 
 @pytest.fixture(scope="session")
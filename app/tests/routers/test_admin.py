@@ -0,0 +1,134 @@
+"""
+Tests pour le router d'administration (statistiques du pool et des caches)
+"""
+
+import os
+import threading
+
+import jwt
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+import database
+
+
+def _token(user_id, role=None):
+    JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "should-be-an-environment-variable")
+    JWT_SECRET_ALGORITHM = os.getenv("JWT_SECRET_ALGORITHM", "HS256")
+    return jwt.encode({"user_id": user_id, "role": role}, JWT_SECRET_KEY, algorithm=JWT_SECRET_ALGORITHM)
+
+
+def test_get_pool_statistics_as_admin(client):
+    """Un admin obtient l'état et les compteurs du pool principal"""
+    response = client.get("/admin/pool", headers={"Authorization": f"Bearer {_token('admin-id', 'admin')}"})
+
+    assert response.status_code == 200
+    primary = response.json()["primary"]
+    for key in ("size", "checked_out", "overflow", "checkouts", "waits", "timeouts", "overflow_peak"):
+        assert key in primary
+
+
+def test_get_pool_statistics_forbidden_for_benevole(client):
+    """Un bénévole ne peut pas consulter les statistiques"""
+    response = client.get("/admin/pool", headers={"Authorization": f"Bearer {_token('user-id', 'benevole')}"})
+
+    assert response.status_code == 403
+
+
+def test_admin_token_is_verified_once(client):
+    """Le rôle est lu sur le payload déjà vérifié : un seul passage par verify_token"""
+    from unittest.mock import patch
+
+    from routers import utils
+
+    with patch("routers.utils.verify_token", wraps=utils.verify_token) as verify:
+        response = client.get("/admin/pool", headers={"Authorization": f"Bearer {_token('admin-id', 'admin')}"})
+
+    assert response.status_code == 200
+    verify.assert_called_once()
+
+
+def test_get_cache_statistics_as_admin(client):
+    """Un admin obtient les compteurs du cache des utilisateurs"""
+    response = client.get("/admin/caches", headers={"Authorization": f"Bearer {_token('admin-id', 'admin')}"})
+
+    assert response.status_code == 200
+    for key in ("size", "maxsize", "hits", "misses", "evictions", "hit_ratio"):
+        assert key in response.json()["users"]
+    assert "decode_time_total_ms" in response.json()["tokens"]
+
+
+def test_warm_up_pool_keeps_connections_open():
+    """Le préchauffage laisse les connexions ouvertes et disponibles dans le pool"""
+    engine = database.create_db_engine(os.getenv("DATABASE_URL"), name="test-warmup")
+
+    opened = database.warm_up_pool(engine, connections=2)
+
+    stats = database.pool_statistics(engine)["test-warmup"]
+    assert opened == 2
+    assert stats["checked_in"] == 2
+    assert stats["checkouts"] == 2
+    engine.dispose()
+
+
+def _saturated_engine(name, timeout):
+    return create_engine(
+        os.getenv("DATABASE_URL"),
+        poolclass=database.InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=timeout,
+        pool_logging_name=name,
+    )
+
+
+def test_pool_counts_waits():
+    """Un emprunt qui attend une restitution puis réussit est compté comme une attente"""
+    engine = _saturated_engine("test-wait", timeout=5)
+    held = engine.connect()
+    threading.Timer(0.2, held.close).start()
+
+    engine.connect().close()
+
+    stats = database.pool_statistics(engine)["test-wait"]
+    assert stats["checkouts"] == 2
+    assert stats["waits"] == 1
+    assert stats["timeouts"] == 0
+    assert stats["wait_time_max_ms"] >= 100
+    assert stats["wait_time_total_ms"] == stats["wait_time_max_ms"]
+    engine.dispose()
+
+
+def test_unlimited_overflow_never_waits():
+    """Avec max_overflow=-1 (débordement illimité), aucun emprunt n'est compté comme une attente"""
+    engine = create_engine(
+        os.getenv("DATABASE_URL"),
+        poolclass=database.InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=-1,
+        pool_logging_name="test-unlimited",
+    )
+    connections = [engine.connect() for _ in range(3)]
+    for connection in connections:
+        connection.close()
+
+    stats = database.pool_statistics(engine)["test-unlimited"]
+    assert stats["checkouts"] == 3
+    assert stats["waits"] == 0
+    engine.dispose()
+
+
+def test_pool_counts_timeouts():
+    """Un pool saturé compte le timeout de l'emprunt"""
+    engine = _saturated_engine("test-timeout", timeout=0.1)
+    held = engine.connect()
+
+    with pytest.raises(PoolTimeoutError):
+        engine.connect()
+
+    stats = database.pool_statistics(engine)["test-timeout"]
+    assert stats["checked_out"] == 1
+    assert stats["timeouts"] == 1
+    held.close()
+    engine.dispose()
@@ -18,9 +18,9 @@ def test_get_access_token_success(client):
     user_credentials = {"username": "testuser", "password": "testpassword"}
     mock_token = "mock_jwt_token_abc123"
 
-    # Mock generate_access_token pour retourner un token
+    # Mock generate_tokens pour retourner un token
     with patch(
-        "routers.auth.generate_access_token", return_value=mock_token
+        "routers.auth.generate_tokens", return_value=(mock_token, "mock_refresh_token")
     ) as mock_generate:
         # Act
         response = client.post("/auth/token", json=user_credentials)
@@ -43,9 +43,9 @@ def test_get_access_token_user_not_found(client):
     # Arrange
     user_credentials = {"username": "nonexistent", "password": "anypassword"}
 
-    # Mock generate_access_token pour lever UserNotFound
+    # Mock generate_tokens pour lever UserNotFound
     with patch(
-        "routers.auth.generate_access_token", side_effect=UserNotFound("User not found")
+        "routers.auth.generate_tokens", side_effect=UserNotFound("User not found")
     ) as mock_generate:
         response = client.post("/auth/token", json=user_credentials)
         assert response.status_code == 404
@@ -63,9 +63,9 @@ def test_get_access_token_incorrect_password(client):
     # Arrange
     user_credentials = {"username": "testuser", "password": "wrongpassword"}
 
-    # Mock generate_access_token pour lever IncorrectPassword
+    # Mock generate_tokens pour lever IncorrectPassword
     with patch(
-        "routers.auth.generate_access_token",
+        "routers.auth.generate_tokens",
         side_effect=IncorrectPassword("Incorrect password"),
     ) as mock_generate:
         # Act
@@ -133,7 +133,7 @@ def test_get_access_token_empty_credentials(client):
 
     # Mock pour simuler l'échec avec UserNotFound
     with patch(
-        "routers.auth.generate_access_token", side_effect=UserNotFound("User not found")
+        "routers.auth.generate_tokens", side_effect=UserNotFound("User not found")
     ) as mock_generate:
         response = client.post("/auth/token", json=empty_credentials)
         assert response.status_code == 404
@@ -152,9 +152,9 @@ def test_get_access_token_with_special_characters(client):
     special_credentials = {"username": "user@example.com", "password": "P@ssw0rd!#$"}
     mock_token = "mock_token_with_special_chars"
 
-    # Mock generate_access_token
+    # Mock generate_tokens
     with patch(
-        "routers.auth.generate_access_token", return_value=mock_token
+        "routers.auth.generate_tokens", return_value=(mock_token, "mock_refresh_token")
     ) as mock_generate:
         response = client.post("/auth/token", json=special_credentials)
         assert response.status_code == 200
@@ -166,17 +166,84 @@ def test_get_access_token_verifies_db_session_passed(client):
     """
     Test que la session de base de données est bien passée
 
-    Scénario: Vérifier que generate_access_token reçoit la session DB
+    Scénario: Vérifier que generate_tokens reçoit la session DB
     Résultat attendu: Session DB dans les arguments d'appel
     """
     # Arrange
     user_credentials = {"username": "testuser", "password": "testpassword"}
 
-    # Mock generate_access_token
+    # Mock generate_tokens
     with patch(
-        "routers.auth.generate_access_token", return_value="test_token"
+        "routers.auth.generate_tokens", return_value=("test_token", "test_refresh_token")
     ) as mock_generate:
         response = client.post("/auth/token", json=user_credentials)
         assert response.status_code == 200
         assert response.json()["access_token"] == "test_token"
         mock_generate.assert_called_once()
+
+
+def test_refresh_rotates_tokens(client, test_user, test_user_password):
+    """
+    Test de l'échange d'un refresh token
+
+    Scénario: Connexion, échange du refresh token, puis rejeu de l'ancien
+    Résultat attendu: Nouveaux tokens ; le rejeu est refusé et révoque aussi le nouveau
+    """
+    login = client.post("/auth/token", json={"username": test_user.username, "password": test_user_password})
+    first_refresh = login.json()["refresh_token"]
+
+    refreshed = client.post("/auth/refresh", json={"refresh_token": first_refresh})
+    assert refreshed.status_code == 200
+    assert refreshed.json()["access_token"]
+    second_refresh = refreshed.json()["refresh_token"]
+    assert second_refresh != first_refresh
+
+    assert client.post("/auth/refresh", json={"refresh_token": first_refresh}).status_code == 401
+    assert client.post("/auth/refresh", json={"refresh_token": second_refresh}).status_code == 401
+
+
+def test_refresh_unknown_token(client, test_db_session):
+    """Un refresh token inconnu est refusé"""
+    response = client.post("/auth/refresh", json={"refresh_token": "inconnu"})
+
+    assert response.status_code == 401
+
+
+def test_get_access_token_rate_limited(client):
+    """
+    Trop de tentatives pour un même utilisateur
+
+    Résultat attendu: 429 avec Retry-After, sans appel au service (ni hachage)
+    """
+    from services.ratelimit import LoginRateLimiter, TokenBucketLimiter
+
+    limiter = LoginRateLimiter(TokenBucketLimiter(10, 1), TokenBucketLimiter(1, 0.1))
+    user_credentials = {"username": "testuser", "password": "testpassword"}
+
+    with patch("routers.auth.login_limiter", limiter), patch(
+        "routers.auth.generate_tokens", return_value=("token", "refresh")
+    ) as mock_generate:
+        assert client.post("/auth/token", json=user_credentials).status_code == 200
+        response = client.post("/auth/token", json=user_credentials)
+
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "10"
+        mock_generate.assert_called_once()
+
+
+def test_logout_revokes_access_and_refresh_tokens(client, test_user, test_user_password):
+    """
+    Déconnexion avec le refresh token
+
+    Résultat attendu: 204 ; l'access token et le refresh token sont ensuite refusés
+    """
+    login = client.post("/auth/token", json={"username": test_user.username, "password": test_user_password}).json()
+    headers = {"Authorization": f"Bearer {login['access_token']}"}
+    assert client.get("/ficheslapin/", headers=headers).status_code == 200
+
+    response = client.post("/auth/logout", json={"refresh_token": login["refresh_token"]}, headers=headers)
+
+    assert response.status_code == 204
+    assert client.get("/ficheslapin/", headers=headers).status_code == 401
+    assert client.post("/auth/refresh", json={"refresh_token": login["refresh_token"]}).status_code == 401
+    assert client.post("/auth/logout", headers=headers).status_code == 401
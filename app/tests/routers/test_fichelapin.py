@@ -3,6 +3,7 @@ Tests pour le router de fiches lapin
 Couvre les opérations CRUD et les règles métier
 """
 
+import json
 import pytest
 import jwt
 import os
@@ -540,4 +541,272 @@ def test_get_fiches_lapin_filtered_by_author(
     
     # Cleanup
     test_db_session.delete(fiche_user_2)
-    test_db_session.commit()
\ No newline at end of file
+    test_db_session.commit()
+
+
+def test_get_all_fiches_lapin_next_cursor_header(client, test_db_session, test_user, auth_token):
+    """
+    Test de la pagination par curseur de la liste
+
+    Scénario: Trois fiches, pages de deux
+    Résultat attendu: En-tête X-Next-Cursor sur la première page, absent sur la dernière
+    """
+    for i in range(3):
+        test_db_session.add(FicheLapin(
+            nom=f"Page_{i}", numero_arrivee_association=i, date_creation_fiche=datetime.now(), auteur_id=test_user.id
+        ))
+    test_db_session.commit()
+    headers = {"Authorization": f"Bearer {auth_token}"}
+
+    first = client.get("/ficheslapin/?limit=2", headers=headers)
+    second = client.get(f"/ficheslapin/?limit=2&cursor={first.headers['X-Next-Cursor']}", headers=headers)
+
+    assert len(first.json()) == 2
+    assert 'rel="next"' in first.headers["Link"]
+    assert len(second.json()) == 1
+    assert "X-Next-Cursor" not in second.headers
+    assert client.get("/ficheslapin/?cursor=abc", headers=headers).status_code == 400
+
+
+def test_get_all_fiches_lapin_envelope(client, test_db_session, test_user, auth_token, monkeypatch):
+    """
+    Test de la liste sans curseur et de ?envelope=true
+
+    Scénario: Plus de fiches que la page par défaut
+    Résultat attendu: Le tableau nu est tronqué à PAGE_SIZE_DEFAULT (suite dans X-Next-Cursor) ;
+    l'enveloppe porte le même curseur dans le corps, et null sur la dernière page
+    """
+    monkeypatch.setattr("services.pagination.PAGE_SIZE_DEFAULT", 2)
+    for i in range(3):
+        test_db_session.add(FicheLapin(
+            nom=f"Enveloppe_{i}", numero_arrivee_association=i, date_creation_fiche=datetime.now(), auteur_id=test_user.id
+        ))
+    test_db_session.commit()
+    headers = {"Authorization": f"Bearer {auth_token}"}
+
+    bare = client.get("/ficheslapin/", headers=headers)
+    first = client.get("/ficheslapin/?envelope=true", headers=headers).json()
+    last = client.get(f"/ficheslapin/?envelope=true&cursor={first['next_cursor']}", headers=headers).json()
+    projected = client.get("/ficheslapin/?envelope=true&fields=nom", headers=headers).json()
+
+    assert len(bare.json()) == 2
+    assert first["items"] == bare.json()
+    assert first["next_cursor"] == bare.headers["X-Next-Cursor"]
+    assert len(last["items"]) == 1 and last["next_cursor"] is None
+    assert set(projected["items"][0]) == {"id", "nom"}
+    assert projected["next_cursor"] == first["next_cursor"]
+
+
+def test_get_all_fiches_lapin_fast_json(client, test_db_session, test_user, auth_token, monkeypatch):
+    """
+    Test du chemin de sérialisation rapide (FAST_JSON_RESPONSES)
+
+    Scénario: Même liste paginée sérialisée par FastAPI puis par le TypeAdapter
+    Résultat attendu: Corps JSON identiques, ETag et curseur conservés
+    """
+    for i in range(3):
+        test_db_session.add(FicheLapin(
+            nom=f"Rapide_{i}", numero_arrivee_association=i, date_creation_fiche=datetime.now(), auteur_id=test_user.id
+        ))
+    test_db_session.commit()
+    headers = {"Authorization": f"Bearer {auth_token}"}
+
+    default = client.get("/ficheslapin/?limit=2", headers=headers)
+    monkeypatch.setattr("routers.utils.FAST_JSON_RESPONSES", True)
+    fast = client.get("/ficheslapin/?limit=2", headers=headers)
+
+    assert fast.status_code == 200
+    assert fast.json() == default.json()
+    assert fast.headers["ETag"] == default.headers["ETag"]
+    assert fast.headers["X-Next-Cursor"] == default.headers["X-Next-Cursor"]
+
+
+def test_export_fiches_lapin_ndjson(client, auth_token, test_fiche_lapin):
+    """
+    Test de l'export NDJSON
+
+    Scénario: Export de toutes les fiches
+    Résultat attendu: Une fiche complète (avec son auteur) par ligne
+    """
+    response = client.get("/ficheslapin/export.ndjson", headers={"Authorization": f"Bearer {auth_token}"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    fiches = [json.loads(line) for line in response.text.splitlines()]
+    assert str(test_fiche_lapin.id) in [fiche["id"] for fiche in fiches]
+    assert all("auteur" in fiche for fiche in fiches)
+    assert all("password" not in fiche["auteur"] for fiche in fiches)
+
+
+def test_export_fiches_lapin_csv(client, auth_token, test_fiche_lapin):
+    """
+    Test de l'export CSV
+
+    Scénario: Export des colonnes id et nom, puis d'une colonne inconnue
+    Résultat attendu: En-tête et une ligne par fiche ; 400 pour la colonne inconnue
+    """
+    headers = {"Authorization": f"Bearer {auth_token}"}
+
+    response = client.get("/ficheslapin/export.csv?columns=id,nom", headers=headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    lines = response.text.splitlines()
+    assert lines[0] == "id,nom"
+    assert f"{test_fiche_lapin.id},Pompon" in lines
+    assert client.get("/ficheslapin/export.csv?columns=password", headers=headers).status_code == 400
+
+
+def test_bulk_import_fiches_lapin(client, auth_token):
+    """
+    Test de l'import en masse
+
+    Scénario: Tableau JSON puis NDJSON, avec une ligne invalide dans chacun
+    Résultat attendu: Fiches valides créées, erreurs rapportées par ligne
+    """
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    fiches = [
+        {"nom": "Bulk_1", "numero_arrivee_association": 1, "date_creation_fiche": "2024-01-01T00:00:00"},
+        {"nom": "Bulk_2"},
+    ]
+
+    response = client.post("/ficheslapin/bulk", json=fiches, headers=headers)
+    ndjson = client.post(
+        "/ficheslapin/bulk",
+        content=json.dumps(fiches[0]) + "\n{not json\n",
+        headers={**headers, "Content-Type": "application/x-ndjson"},
+    )
+
+    assert response.status_code == 200
+    assert response.json()["created"] == 1
+    assert [error["row"] for error in response.json()["errors"]] == [1]
+    assert ndjson.json()["created"] == 1
+    assert [error["row"] for error in ndjson.json()["errors"]] == [1]
+    assert client.get(f"/ficheslapin/{response.json()['ids'][0]}", headers=headers).json()["nom"] == "Bulk_1"
+    atomic = client.post("/ficheslapin/bulk?all_or_nothing=true", json=fiches, headers=headers)
+    assert atomic.status_code == 422
+    assert atomic.json()["created"] == 0
+
+
+def test_get_fiches_lapin_sparse_fields(client, auth_token, test_fiche_lapin):
+    """
+    Test du paramètre fields= sur la liste et le détail
+
+    Scénario: Demande de nom et sexe uniquement
+    Résultat attendu: Seuls id, nom et sexe sont renvoyés ; un champ inconnu donne 400
+    """
+    headers = {"Authorization": f"Bearer {auth_token}"}
+
+    listing = client.get("/ficheslapin/?fields=nom,sexe", headers=headers)
+    detail = client.get(f"/ficheslapin/{test_fiche_lapin.id}?fields=nom", headers=headers)
+
+    assert listing.status_code == 200
+    assert listing.json() == [{"id": test_fiche_lapin.id, "nom": "Pompon", "sexe": "M"}]
+    assert detail.json() == {"id": test_fiche_lapin.id, "nom": "Pompon"}
+    assert client.get("/ficheslapin/?fields=mot_de_passe", headers=headers).status_code == 400
+
+
+def test_get_fiches_lapin_filters_and_sort(client, test_db_session, test_user, test_user_2, auth_token):
+    """
+    Test des filtres et du tri de la liste
+
+    Scénario: Filtre par auteur et par sexe, tri par nom décroissant
+    Résultat attendu: Seules les fiches correspondantes, dans l'ordre demandé ; tri inconnu refusé
+    """
+    for nom, sexe, auteur_id in [("Alpha", "F", test_user.id), ("Beta", "F", test_user.id),
+                                 ("Gamma", "M", test_user.id), ("Delta", "F", test_user_2.id)]:
+        test_db_session.add(FicheLapin(
+            nom=nom, numero_arrivee_association=1, sexe=sexe, auteur_id=auteur_id, date_creation_fiche=datetime.now()
+        ))
+    test_db_session.commit()
+    headers = {"Authorization": f"Bearer {auth_token}"}
+
+    response = client.get(f"/ficheslapin/?auteur_id={test_user.id}&sexe=F&sort=-nom", headers=headers)
+
+    assert response.status_code == 200
+    assert [fiche["nom"] for fiche in response.json()] == ["Beta", "Alpha"]
+    assert client.get("/ficheslapin/?sort=password", headers=headers).status_code == 400
+    assert client.get("/ficheslapin/?date_arrivee_min=hier", headers=headers).status_code == 422
+
+
+def test_search_fiches_lapin(client, auth_token, test_fiche_lapin, fiche_search):
+    """
+    Test de la recherche plein texte
+
+    Scénario: Recherche du nom d'une fiche existante
+    Résultat attendu: La fiche est renvoyée ; une requête vide est refusée
+    """
+    headers = {"Authorization": f"Bearer {auth_token}"}
+
+    response = client.get("/ficheslapin/search?q=pompon", headers=headers)
+
+    assert response.status_code == 200
+    assert [fiche["id"] for fiche in response.json()] == [test_fiche_lapin.id]
+    assert client.get("/ficheslapin/search?q=", headers=headers).status_code == 422
+
+
+def test_similar_fiche_names(client, auth_token, test_fiche_lapin):
+    """
+    Test de la recherche approchée des noms
+
+    Scénario: Nom mal orthographié
+    Résultat attendu: Le nom correct est proposé avec son score
+    """
+    from services import ficheLapin as ficheLapin_service
+
+    ficheLapin_service.name_index.built_at = None
+    headers = {"Authorization": f"Bearer {auth_token}"}
+
+    response = client.get("/ficheslapin/names?q=pompn", headers=headers)
+
+    assert response.status_code == 200
+    assert response.json()[0]["id"] == test_fiche_lapin.id
+    assert response.json()[0]["nom"] == "Pompon"
+    assert 0 < response.json()[0]["score"] <= 1
+    ficheLapin_service.name_index.built_at = None
+
+
+def test_get_fiches_lapin_conditional_get(client, auth_token, test_fiche_lapin):
+    """
+    Test des requêtes conditionnelles (ETag)
+
+    Scénario: Relecture avec If-None-Match, avant puis après une modification
+    Résultat attendu: 304 tant que rien n'a changé, 200 avec un nouvel ETag ensuite
+    """
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    first = client.get("/ficheslapin/", headers=headers)
+    etag = first.headers["ETag"]
+
+    cached = client.get("/ficheslapin/", headers={**headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["ETag"] == etag
+    # Les paramètres de la requête font partie de l'ETag
+    assert client.get("/ficheslapin/?fields=nom", headers={**headers, "If-None-Match": etag}).status_code == 200
+
+    client.put(f"/ficheslapin/{test_fiche_lapin.id}", json={"nom": "Pompon II"}, headers=headers)
+
+    refreshed = client.get("/ficheslapin/", headers={**headers, "If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.headers["ETag"] != etag
+
+
+def test_get_fiche_lapin_by_id_cached(client, auth_token, test_user, test_fiche_lapin):
+    """
+    Test du cache du détail
+
+    Scénario: Lecture, relecture conditionnelle, modification puis nouvelle lecture
+    Résultat attendu: 304 sur la relecture ; la modification est visible aussitôt
+    """
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    first = client.get(f"/ficheslapin/{test_fiche_lapin.id}", headers=headers)
+
+    cached = client.get(f"/ficheslapin/{test_fiche_lapin.id}", headers={**headers, "If-None-Match": first.headers["ETag"]})
+    assert cached.status_code == 304
+
+    client.put(f"/ficheslapin/{test_fiche_lapin.id}", json={"nom": "Pompon II"}, headers=headers)
+
+    response = client.get(f"/ficheslapin/{test_fiche_lapin.id}", headers={**headers, "If-None-Match": first.headers["ETag"]})
+    assert response.status_code == 200
+    assert response.json()["nom"] == "Pompon II"
+    assert response.json()["auteur"]["username"] == test_user.username
@@ -0,0 +1,70 @@
+"""
+Tests de non-régression N+1 : nombre de requêtes SQL par endpoint
+"""
+
+import pytest
+import jwt
+import os
+from datetime import datetime
+
+from models import FicheLapin, Post, User
+
+
+@pytest.fixture
+def auth_token(test_user):
+    """Fixture pour générer un token JWT valide pour l'utilisateur de test"""
+    JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "should-be-an-environment-variable")
+    JWT_SECRET_ALGORITHM = os.getenv("JWT_SECRET_ALGORITHM", "HS256")
+    return jwt.encode(
+        {"user_id": str(test_user.id)},
+        JWT_SECRET_KEY,
+        algorithm=JWT_SECRET_ALGORITHM,
+    )
+
+
+@pytest.fixture
+def many_fiches(test_db_session, test_user):
+    """Dix fiches et dix posts répartis sur cinq auteurs"""
+    authors = [test_user] + [User(username=f"auteur_{i}", password="x") for i in range(4)]
+    test_db_session.add_all(authors[1:])
+    test_db_session.commit()
+    for i in range(10):
+        author = authors[i % len(authors)]
+        fiche = FicheLapin(
+            nom=f"Lapin_{i}", numero_arrivee_association=i, date_creation_fiche=datetime.now(), auteur_id=author.id
+        )
+        test_db_session.add(fiche)
+        test_db_session.flush()
+        test_db_session.add(Post(
+            title=f"Note {i}", content="RAS", author_id=author.id,
+            fiche_lapin_id=fiche.id, date_creation_post=datetime.now(),
+        ))
+    test_db_session.commit()
+
+
+@pytest.mark.parametrize("endpoint, expected_queries", [
+    ("/ficheslapin/", 2),   # versions (ETag) + fiches jointes à leurs auteurs
+    ("/posts/", 2),         # versions (ETag) + posts joints à leurs auteurs
+])
+def test_list_query_count_is_constant(client, auth_token, many_fiches, query_counter, endpoint, expected_queries):
+    """Une liste de N éléments coûte un nombre constant de requêtes"""
+    response = client.get(endpoint, headers={"Authorization": f"Bearer {auth_token}"})
+
+    assert response.status_code == 200
+    assert len(response.json()) == 10
+    assert len(query_counter) == expected_queries
+
+
+def test_detail_query_count(client, auth_token, many_fiches, test_db_session, query_counter):
+    """Le détail d'une fiche charge la fiche et son auteur en une seule requête, puis sort du cache"""
+    fiche_id = test_db_session.query(FicheLapin.id).first()[0]
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    query_counter.clear()
+
+    response = client.get(f"/ficheslapin/{fiche_id}", headers=headers)
+
+    assert response.status_code == 200
+    assert len(query_counter) == 1
+    query_counter.clear()
+    assert client.get(f"/ficheslapin/{fiche_id}", headers=headers).json() == response.json()
+    assert len(query_counter) == 0
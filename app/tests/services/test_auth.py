@@ -4,6 +4,10 @@ from services.auth import (
     generate_access_token,
     _encode_jwt,
     decode_jwt,
+    decode_statistics,
+    revoke_token,
+    token_cache,
+    verify_token,
 )
 from exceptions.user import UserNotFound, IncorrectPassword
 from serializers import User
@@ -75,6 +79,21 @@ def test_generate_access_token_incorrect_password(test_db_session, test_user):
         generate_access_token(test_db_session, user_login)
 
 
+def test_generate_access_token_upgrades_weak_hash(test_db_session, test_user, test_user_password):
+    """Un hash de coût inférieur aux réglages est recalculé à la connexion, sans changer le mot de passe"""
+    from services.hashing import Pbkdf2Scheme, check_password, needs_rehash
+
+    test_user.password = Pbkdf2Scheme(iterations=1000).hash(test_user_password)
+    test_db_session.commit()
+    user_login = User(username=test_user.username, password=test_user_password)
+
+    generate_access_token(test_db_session, user_login)
+
+    test_db_session.refresh(test_user)
+    assert not needs_rehash(test_user.password)
+    assert check_password(test_user_password, test_user.password)
+
+
 def test_encode_jwt_correct(test_user):
     """Test que encode_jwt retourne un token JWT"""
     token = _encode_jwt(test_user)
@@ -97,3 +116,68 @@ def test_decode_jwt_invalid_token(test_user):
     with pytest.raises(HTTPException) as err:
         decode_jwt(token)
     assert err.value.status_code == 401
+
+
+def test_verify_token_decodes_once(test_user):
+    """Un token déjà vérifié est servi par le cache, sans nouvelle vérification HMAC"""
+    token = _encode_jwt(test_user)
+    decodes = decode_statistics.decodes
+
+    assert verify_token(token)["user_id"] == str(test_user.id)
+    assert verify_token(token)["user_id"] == str(test_user.id)
+    assert decode_statistics.decodes == decodes + 1
+    assert token_cache.hits >= 1
+
+
+def test_verify_token_does_not_cache_invalid_token():
+    """Un token refusé l'est à chaque appel"""
+    for _ in range(2):
+        with pytest.raises(HTTPException) as err:
+            verify_token("invalid_token")
+        assert err.value.status_code == 401
+    assert token_cache.statistics()["size"] == 0
+
+
+def test_revoked_token_is_refused(test_user):
+    """Un token révoqué est refusé bien qu'il soit encore valide et en cache"""
+    token = _encode_jwt(test_user)
+    verify_token(token)
+
+    revoke_token(token)
+
+    with pytest.raises(HTTPException) as err:
+        verify_token(token)
+    assert err.value.status_code == 401
+    assert err.value.detail == "Token revoked"
+
+
+def test_role_change_revokes_previous_tokens(test_db_session, test_user):
+    """Un changement de rôle révoque les tokens émis avant lui, pas ceux émis après"""
+    from services import revocation
+    from services.user import update_user
+
+    token = _encode_jwt(test_user)
+    verify_token(token)
+
+    update_user(test_user.id, test_db_session, User(username=test_user.username, password="", role="admin"))
+
+    with pytest.raises(HTTPException) as err:
+        verify_token(token)
+    assert err.value.detail == "Token revoked"
+    assert test_user.id in revocation.revoked_users
+    assert verify_token(_encode_jwt(test_user))["user_id"] == test_user.id
+
+
+def test_revocation_event_from_another_worker(test_user):
+    """Les révocations publiées par un autre worker s'appliquent localement"""
+    import time
+
+    from services import revocation
+
+    token = _encode_jwt(test_user)
+    verify_token(token)
+
+    revocation._on_user(revocation.event_key(test_user.id, time.time() + 1))
+
+    with pytest.raises(HTTPException):
+        verify_token(token)
@@ -0,0 +1,190 @@
+"""
+Tests du cache LRU+TTL, des backends de réponses sérialisées et du cache des utilisateurs
+"""
+
+import os
+import time
+import uuid
+
+import pytest
+
+from exceptions.user import UserNotFound
+from services import cache
+from services import user as user_service
+from services.cache import MISSING, LRUCache, MemoryBackend, RedisBackend
+
+
+@pytest.fixture(params=["fakeredis", "server"])
+def redis_client(request):
+    """
+    Client redis-py sur fakeredis (qui vérifie les commandes et leurs arguments
+    comme un serveur), ou sur un vrai serveur si REDIS_TEST_URL est défini.
+    Les clés des tests sont dans un espace de noms propre, supprimé ensuite.
+    """
+    if request.param == "fakeredis":
+        fakeredis = pytest.importorskip("fakeredis")
+        client = fakeredis.FakeRedis(server=fakeredis.FakeServer())
+    else:
+        url = os.getenv("REDIS_TEST_URL")
+        if not url:
+            pytest.skip("REDIS_TEST_URL non défini")
+        redis = pytest.importorskip("redis")
+        client = redis.Redis.from_url(url)
+    namespace = f"test-{uuid.uuid4().hex}:"
+    yield client, namespace
+    keys = list(client.scan_iter(match=namespace + "*"))
+    if keys:
+        client.delete(*keys)
+
+
+def test_lru_cache_evicts_least_recently_used():
+    """Au-delà de maxsize, l'entrée la moins récemment lue est évincée"""
+    lru = LRUCache(maxsize=2, ttl=60)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    lru.get("a")
+    lru.set("c", 3)
+
+    assert lru.get("b") is MISSING
+    assert (lru.get("a"), lru.get("c")) == (1, 3)
+    assert lru.statistics()["evictions"] == 1
+
+
+def test_lru_cache_expires_entries(monkeypatch):
+    """Une entrée plus vieille que ttl est un échec"""
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    lru = LRUCache(maxsize=10, ttl=5)
+    lru.set("a", 1)
+
+    now[0] += 4
+    assert lru.get("a") == 1
+    now[0] += 2
+    assert lru.get("a") is MISSING
+    assert (lru.hits, lru.misses) == (1, 1)
+
+
+def test_lru_cache_bounds_bytes():
+    """Avec max_bytes, les entrées les plus anciennes sont évincées pour tenir le budget"""
+    lru = LRUCache(maxsize=10, ttl=60, max_bytes=10)
+    lru.set("a", b"12345")
+    lru.set("b", b"12345")
+    lru.set("c", b"123")
+    lru.set("big", b"x" * 11)
+
+    assert lru.get("a") is MISSING
+    assert lru.get("big") is MISSING
+    assert lru.statistics()["bytes"] == 8
+
+
+def test_memory_backend_returns_none_on_miss():
+    """Le backend mémoire suit l'interface commune (None si absent)"""
+    backend = MemoryBackend(maxsize=2, ttl=60)
+    backend.set("a", b"{}")
+
+    assert backend.get("a") == b"{}"
+    backend.delete("a")
+    assert backend.get("a") is None
+
+
+def test_redis_backend_round_trip(redis_client):
+    """Les entrées sont préfixées, expirent avec le ttl et clear ne vide que le préfixe"""
+    client, namespace = redis_client
+    client.set(namespace + "autre:1", b"x")
+    backend = RedisBackend(client, ttl=60, prefix=namespace + "fiche:")
+
+    backend.set("1", b'{"id": "1"}')
+    assert client.get(namespace + "fiche:1") == b'{"id": "1"}'
+    assert 0 < client.pttl(namespace + "fiche:1") <= 60_000
+    assert backend.get("1") == b'{"id": "1"}'
+    assert backend.get("2") is None
+
+    backend.clear()
+    assert backend.get("1") is None
+    assert client.get(namespace + "autre:1") == b"x"
+    assert (backend.hits, backend.misses, backend.errors) == (1, 2, 0)
+
+
+def test_redis_backend_entries_expire(redis_client):
+    """Une entrée disparaît du serveur après le ttl du backend"""
+    client, namespace = redis_client
+    backend = RedisBackend(client, ttl=0.05, prefix=namespace + "fiche:")
+
+    backend.set("1", b"{}")
+    time.sleep(0.1)
+
+    assert backend.get("1") is None
+    assert backend.errors == 0
+
+
+def test_redis_backend_degrades_to_miss():
+    """Un serveur indisponible fait relire la base au lieu d'échouer"""
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    backend = RedisBackend(fakeredis.FakeRedis(server=server), ttl=60, prefix="fiche:")
+    server.connected = False
+
+    backend.set("1", b"{}")
+    assert backend.get("1") is None
+    backend.delete("1")
+    backend.clear()
+    assert backend.statistics()["errors"] == 4
+
+
+@pytest.fixture
+def user_cache():
+    user_service.user_cache.clear()
+    yield user_service.user_cache
+    user_service.user_cache.clear()
+
+
+def test_get_user_ref_hits_cache(test_db_session, test_user, user_cache):
+    """La seconde vérification d'un auteur est servie par le cache"""
+    hits, misses = user_cache.hits, user_cache.misses
+    ref = user_service.get_user_ref(test_user.id, test_db_session)
+
+    assert user_service.get_user_ref(test_user.id, test_db_session) == ref
+    assert ref == (test_user.id, test_user.role)
+    assert (user_cache.hits - hits, user_cache.misses - misses) == (1, 1)
+
+
+def test_delete_user_invalidates_cache(test_db_session, user_cache):
+    """Un utilisateur supprimé n'est plus trouvé"""
+    from models import User
+
+    user = User(username="ephemere", password="x")
+    test_db_session.add(user)
+    test_db_session.commit()
+    user_service.get_user_ref(user.id, test_db_session)
+
+    user_service.delete_user(user.id, test_db_session)
+
+    with pytest.raises(UserNotFound):
+        user_service.get_user_ref(user.id, test_db_session)
+
+
+def test_unknown_user_is_not_cached(test_db_session, user_cache):
+    """Un échec n'est pas mis en cache (l'utilisateur peut être créé ensuite)"""
+    with pytest.raises(UserNotFound):
+        user_service.get_user_ref("inconnu", test_db_session)
+
+    assert user_cache.statistics()["size"] == 0
+
+
+def test_incomplete_backend_cannot_be_created():
+    """Un backend qui n'implémente pas toute l'interface échoue à sa création"""
+    class NoStatisticsBackend(cache.CacheBackend):
+        def get(self, key):
+            return None
+
+        def set(self, key, value):
+            pass
+
+        def delete(self, key):
+            pass
+
+        def clear(self):
+            pass
+
+    with pytest.raises(TypeError):
+        NoStatisticsBackend()
@@ -0,0 +1,118 @@
+"""
+Tests de l'import CSV des tableurs historiques
+"""
+
+import io
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from models import FicheLapin, User
+from services.csv_import import import_csv, map_columns, parse_date, parse_int, parse_weight
+from services.user import user_cache
+
+LEGACY_CSV = """Nom;N° d'arrivée;Date d'arrivée;Poids (g);Sexe;Puce;Couleur
+Kala;32;21/04/2022;1,8 kg;F;ABC12345;grise
+Pompon;33;2022-05-02;1650;M;;blanc
+Caramel;34;hier;2000;M;;roux
+"""
+
+
+def test_parse_weight_units():
+    """Les poids sont ramenés en grammes, avec ou sans unité"""
+    assert parse_weight("1,8 kg") == 1800
+    assert parse_weight("1.8") == 1800
+    assert parse_weight("1800") == 1800
+    assert parse_weight("1650 g") == 1650
+    with pytest.raises(ValueError):
+        parse_weight("lourd")
+
+
+def test_parse_date_and_int_formats():
+    """Dates françaises, ISO ou numéro de série Excel ; numéros préfixés de N°"""
+    assert parse_date("21/04/2022") == datetime(2022, 4, 21)
+    assert parse_date("2022-04-21") == datetime(2022, 4, 21)
+    assert parse_date("44672") == datetime(2022, 4, 21)
+    assert parse_int("N°32") == 32
+    assert parse_int("32.0") == 32
+
+
+def test_map_columns_accepts_legacy_headers():
+    """Les libellés des tableurs sont ramenés aux champs de la fiche ; les autres sont ignorés"""
+    fields, unknown = map_columns(["Nom", "N° d'arrivée", "Poids (g)", "Puce", "Couleur"])
+
+    assert fields == ["nom", "numero_arrivee_association", "poids_actuel", "numero_identification", None]
+    assert unknown == ["Couleur"]
+
+
+def test_import_csv_creates_and_reports_rejects(test_db_session, test_user):
+    """Les lignes lisibles sont créées, les autres rapportées avec leur numéro de ligne"""
+    report = import_csv(test_db_session, io.StringIO(LEGACY_CSV), test_user.id, chunk_size=2).as_dict()
+
+    assert (report["rows"], report["inserted"], report["updated"], report["rejected"]) == (3, 2, 0, 1)
+    assert report["rejects"][0]["line"] == 4
+    assert report["unknown_columns"] == ["Couleur"]
+    kala = test_db_session.execute(select(FicheLapin).where(FicheLapin.nom == "Kala")).scalars().one()
+    assert (kala.poids_actuel, kala.sexe, kala.date_arrivee_association) == (1800, "Femelle", datetime(2022, 4, 21))
+    assert kala.auteur_id == test_user.id
+
+
+def test_import_csv_upserts_on_identification_then_number(test_db_session, test_user):
+    """Une seconde importation met à jour les fiches existantes sans effacer les cellules vides"""
+    import_csv(test_db_session, io.StringIO(LEGACY_CSV), test_user.id)
+    update_csv = "Puce,N° arrivée,Poids,Nom\nABC12345,99,2 kg,\n,33,1700,Pompon\n,35,1500,Noisette\n"
+
+    report = import_csv(test_db_session, io.StringIO(update_csv), test_user.id).as_dict()
+
+    assert (report["inserted"], report["updated"], report["rejected"]) == (1, 2, 0)
+    test_db_session.expire_all()
+    fiches = {fiche.nom: fiche for fiche in test_db_session.execute(select(FicheLapin)).scalars()}
+    assert set(fiches) == {"Kala", "Pompon", "Noisette"}
+    assert (fiches["Kala"].poids_actuel, fiches["Kala"].numero_arrivee_association) == (2000, 99)
+    assert fiches["Pompon"].poids_actuel == 1700
+    assert fiches["Pompon"].sexe == "Mâle"
+
+
+
+def test_import_csv_new_identification_is_a_new_fiche(test_db_session, test_user):
+    """Un numéro d'identification inconnu crée une fiche, même si son numéro d'arrivée existe déjà"""
+    import_csv(test_db_session, io.StringIO(LEGACY_CSV), test_user.id)
+    new_csv = "Puce;N° arrivée;Nom\nXYZ98765;33;Neige\n"
+
+    report = import_csv(test_db_session, io.StringIO(new_csv), test_user.id).as_dict()
+
+    assert (report["inserted"], report["updated"], report["rejected"]) == (1, 0, 0)
+    test_db_session.expire_all()
+    fiches = {fiche.nom: fiche for fiche in test_db_session.execute(select(FicheLapin)).scalars()}
+    assert fiches["Pompon"].numero_identification is None
+    assert fiches["Neige"].numero_identification == "XYZ98765"
+
+@pytest.fixture
+def other_user(test_db_session):
+    user = User(username="autre_benevole", password="x", role="benevole")
+    test_db_session.add(user)
+    test_db_session.commit()
+    yield user
+    test_db_session.delete(user)
+    test_db_session.commit()
+
+
+def test_import_csv_does_not_update_other_authors_fiches(test_db_session, test_user, other_user):
+    """Une fiche d'un autre auteur n'est pas modifiable par l'import, sauf par un admin"""
+    import_csv(test_db_session, io.StringIO(LEGACY_CSV), other_user.id)
+    update_csv = "Puce;N° arrivée;Poids\nABC12345;32;2 kg\n;33;1700\n"
+
+    report = import_csv(test_db_session, io.StringIO(update_csv), test_user.id).as_dict()
+
+    assert (report["inserted"], report["updated"], report["rejected"]) == (0, 0, 2)
+    test_db_session.expire_all()
+    kala = test_db_session.execute(select(FicheLapin).where(FicheLapin.nom == "Kala")).scalars().one()
+    assert kala.poids_actuel == 1800
+
+    test_user.role = "admin"
+    test_db_session.commit()
+    user_cache.clear()
+    report = import_csv(test_db_session, io.StringIO(update_csv), test_user.id).as_dict()
+
+    assert report["updated"] == 2
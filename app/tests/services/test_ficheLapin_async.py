@@ -0,0 +1,122 @@
+"""
+Tests des services asynchrones (AsyncSession)
+"""
+
+import pytest
+from datetime import datetime
+
+from exceptions.ficheLapin import FicheLapinAlreadyExists, FicheLapinNotFound, WrongAuthor
+from exceptions.user import UserNotFound, IncorrectPassword
+from serializers import FicheLapin, Post, User
+from services import ficheLapin_async, auth_async, posts_async, user_async
+
+
+def _fiche(auteur_id, nom="Pompon"):
+    return FicheLapin(
+        nom=nom,
+        auteur_id=str(auteur_id),
+        numero_arrivee_association=1,
+        date_creation_fiche=datetime.now(),
+    )
+
+
+@pytest.mark.asyncio
+async def test_create_and_get_fichelapin(test_async_db_session, test_user):
+    """La fiche créée est relue avec son auteur chargé"""
+    created = await ficheLapin_async.create_fichelapin(test_async_db_session, _fiche(test_user.id))
+
+    record = await ficheLapin_async.get_fichelapin_by_id(created.id, test_async_db_session)
+
+    assert record.nom == "Pompon"
+    assert record.auteur.username == test_user.username
+
+
+@pytest.mark.asyncio
+async def test_create_fichelapin_unknown_author(test_async_db_session):
+    """Un auteur inexistant lève UserNotFound"""
+    with pytest.raises(UserNotFound):
+        await ficheLapin_async.create_fichelapin(test_async_db_session, _fiche("inconnu"))
+
+
+@pytest.mark.asyncio
+async def test_get_all_ficheslapin_filtered_by_author(test_async_db_session, test_user):
+    """Le filtre user_id ne renvoie que les fiches de l'auteur"""
+    await ficheLapin_async.create_fichelapin(test_async_db_session, _fiche(test_user.id))
+
+    mine = await ficheLapin_async.get_all_ficheslapin(test_async_db_session, user_id=test_user.id)
+    others = await ficheLapin_async.get_all_ficheslapin(test_async_db_session, user_id="autre")
+
+    assert len(mine.items) == 1
+    assert others.items == []
+
+
+@pytest.mark.asyncio
+async def test_import_ficheslapin_conflict(test_async_db_session, test_user, monkeypatch):
+    """Une violation de contrainte pendant l'import annule tout et lève FicheLapinAlreadyExists"""
+    created = await ficheLapin_async.create_fichelapin(test_async_db_session, _fiche(test_user.id))
+    fiche_id = created.id
+    monkeypatch.setattr("services.ficheLapin.uuid.uuid4", lambda: fiche_id)
+
+    with pytest.raises(FicheLapinAlreadyExists):
+        await ficheLapin_async.import_ficheslapin(
+            test_async_db_session,
+            [{"nom": "Doublon", "numero_arrivee_association": 2, "date_creation_fiche": "2024-01-01T00:00:00"}],
+            auteur_id=test_user.id,
+        )
+
+    page = await ficheLapin_async.get_all_ficheslapin(test_async_db_session)
+    assert [fiche.nom for fiche in page.items] == ["Pompon"]
+
+
+@pytest.mark.asyncio
+async def test_update_and_delete_fichelapin(test_async_db_session, test_user):
+    """Seul l'auteur peut modifier puis supprimer sa fiche"""
+    created = await ficheLapin_async.create_fichelapin(test_async_db_session, _fiche(test_user.id))
+
+    with pytest.raises(WrongAuthor):
+        await ficheLapin_async.update_fichelapin(created.id, test_async_db_session, {"poids_actuel": 1}, "autre")
+
+    updated = await ficheLapin_async.update_fichelapin(
+        created.id, test_async_db_session, {"poids_actuel": 2100}, test_user.id
+    )
+    assert updated.poids_actuel == 2100
+
+    await ficheLapin_async.delete_fichelapin_by_user(created.id, test_async_db_session, test_user.id)
+    with pytest.raises(FicheLapinNotFound):
+        await ficheLapin_async.get_fichelapin_by_id(created.id, test_async_db_session)
+
+
+@pytest.mark.asyncio
+async def test_get_all_posts_loads_author(test_async_db_session, test_user):
+    """Les posts sont renvoyés avec leur auteur chargé"""
+    fiche = await ficheLapin_async.create_fichelapin(test_async_db_session, _fiche(test_user.id))
+
+    await posts_async.create_post_for_fiche(
+        fiche.id, test_async_db_session, Post(title="Note", content="RAS", author_id=str(test_user.id))
+    )
+
+    posts = (await posts_async.get_all_posts(test_async_db_session)).items
+
+    assert len(posts) == 1
+    assert posts[0].author.username == test_user.username
+
+
+@pytest.mark.asyncio
+async def test_get_user_by_id_not_found(test_async_db_session):
+    """Un identifiant inconnu lève UserNotFound"""
+    with pytest.raises(UserNotFound):
+        await user_async.get_user_by_id("inconnu", test_async_db_session)
+
+
+@pytest.mark.asyncio
+async def test_generate_access_token_async(test_async_db_session, test_user, test_user_password):
+    """Le token est généré avec le bon mot de passe, refusé sinon"""
+    token = await auth_async.generate_access_token(
+        test_async_db_session, User(username=test_user.username, password=test_user_password)
+    )
+    assert isinstance(token, str)
+
+    with pytest.raises(IncorrectPassword):
+        await auth_async.generate_access_token(
+            test_async_db_session, User(username=test_user.username, password="wrongpassword")
+        )
@@ -0,0 +1,87 @@
+"""
+Tests des filtres et tris de la liste des fiches
+"""
+
+import pytest
+from datetime import datetime, timedelta
+
+from exceptions.ficheLapin import InvalidFilter, InvalidSort
+from models import FicheLapin
+from services import ficheLapin as ficheLapin_service
+
+
+@pytest.fixture
+def fiches(test_db_session, test_user):
+    """Quatre fiches, dont une sans date d'arrivée"""
+    start = datetime(2024, 1, 1)
+    rows = [
+        ("Caramel", "F", "calme", start + timedelta(days=3)),
+        ("Amande", "M", "joueur", start),
+        ("Bambou", "F", "joueur", None),
+        ("Dune", "M", "calme", start + timedelta(days=1)),
+    ]
+    for i, (nom, sexe, caractere, arrivee) in enumerate(rows):
+        test_db_session.add(FicheLapin(
+            nom=nom, numero_arrivee_association=i, sexe=sexe, caractere=caractere,
+            date_arrivee_association=arrivee, date_creation_fiche=start, auteur_id=test_user.id,
+        ))
+    test_db_session.commit()
+    yield
+    test_db_session.query(FicheLapin).delete()
+    test_db_session.commit()
+
+
+def _all_pages(db, **kwargs):
+    names, cursor = [], None
+    while True:
+        page = ficheLapin_service.get_all_ficheslapin(db=db, cursor=cursor, limit=1, **kwargs)
+        names.extend(f.nom for f in page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            return names
+
+
+def test_filters_are_combined(test_db_session, fiches):
+    """Les filtres s'additionnent (ET)"""
+    page = ficheLapin_service.get_all_ficheslapin(
+        db=test_db_session, filters={"sexe": "F", "caractere": "joueur"}
+    )
+
+    assert [f.nom for f in page.items] == ["Bambou"]
+
+
+def test_arrival_number_filter(test_db_session, fiches):
+    """Le numéro d'arrivée désigne une fiche, qu'elle soit ou non dans la première page"""
+    page = ficheLapin_service.get_all_ficheslapin(db=test_db_session, limit=1, filters={"numero_arrivee_association": 3})
+
+    assert [f.nom for f in page.items] == ["Dune"]
+
+
+def test_date_range_filter(test_db_session, fiches):
+    """Les bornes de la plage de dates sont incluses"""
+    page = ficheLapin_service.get_all_ficheslapin(
+        db=test_db_session,
+        filters={"date_arrivee_min": datetime(2024, 1, 1), "date_arrivee_max": datetime(2024, 1, 2)},
+        sort="date_arrivee_association",
+    )
+
+    assert [f.nom for f in page.items] == ["Amande", "Dune"]
+
+
+def test_sort_by_name_descending(test_db_session, fiches):
+    """?sort=-nom parcourt les pages par nom décroissant"""
+    assert _all_pages(test_db_session, sort="-nom") == ["Dune", "Caramel", "Bambou", "Amande"]
+
+
+def test_sort_on_nullable_column_keeps_nulls_last(test_db_session, fiches):
+    """Les fiches sans date d'arrivée arrivent en dernier, sans être perdues entre deux pages"""
+    assert _all_pages(test_db_session, sort="date_arrivee_association") == ["Amande", "Dune", "Caramel", "Bambou"]
+    assert _all_pages(test_db_session, sort="-date_arrivee_association") == ["Caramel", "Dune", "Amande", "Bambou"]
+
+
+def test_unknown_filter_or_sort_is_rejected(test_db_session):
+    """Seuls les filtres et tris de la liste blanche sont traduits en SQL"""
+    with pytest.raises(InvalidFilter):
+        ficheLapin_service.get_all_ficheslapin(db=test_db_session, filters={"password": "x"})
+    with pytest.raises(InvalidSort):
+        ficheLapin_service.get_all_ficheslapin(db=test_db_session, sort="auteur.password")
@@ -0,0 +1,127 @@
+"""
+Tests des schémas de hachage des mots de passe et du pool de processus
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from exceptions.auth import PasswordHashingBusy
+from services import hashing
+from services.hashing import (
+    Argon2Scheme,
+    HashingPool,
+    Pbkdf2Scheme,
+    ScryptScheme,
+    check_password,
+    hash_password,
+    needs_rehash,
+    verify_password,
+)
+
+# Coûts réduits pour les tests
+FAST_PBKDF2 = Pbkdf2Scheme(iterations=1000)
+FAST_SCRYPT = ScryptScheme(n=2 ** 10, r=8, p=1)
+
+
+def test_scrypt_round_trip():
+    """Un hash scrypt est vérifié par check_password d'après son préfixe"""
+    hashed = FAST_SCRYPT.hash("motdepasse")
+
+    assert hashed.startswith("scrypt$1024,8,1$")
+    assert check_password("motdepasse", hashed)
+    assert not check_password("autre", hashed)
+
+
+def test_argon2_round_trip():
+    """argon2id, disponible si argon2-cffi est installé"""
+    pytest.importorskip("argon2")
+    scheme = Argon2Scheme(time_cost=1, memory_cost=1024, parallelism=1)
+    hashed = scheme.hash("motdepasse")
+
+    assert scheme.verify("motdepasse", hashed)
+    assert not scheme.verify("autre", hashed)
+
+
+def test_unknown_scheme_is_invalid():
+    """Un préfixe inconnu est un format invalide"""
+    with pytest.raises(ValueError):
+        check_password("motdepasse", "md5$abc")
+
+
+def test_incomplete_scheme_cannot_be_created():
+    """Un schéma sans needs_rehash échoue à sa création, pas à la première connexion"""
+
+    class NoRehashScheme(hashing.HashScheme):
+        name = "incomplet"
+
+        def hash(self, password):
+            return password
+
+        def verify(self, password, stored_hash):
+            return password == stored_hash
+
+    with pytest.raises(TypeError):
+        NoRehashScheme()
+
+
+def test_weaker_hash_needs_rehash():
+    """Un hash PBKDF2 de moins d'itérations que le réglage courant est à recalculer"""
+    assert needs_rehash(FAST_PBKDF2.hash("motdepasse"))
+    assert not needs_rehash(hash_password("motdepasse"))
+
+
+def test_verify_password_upgrades_other_scheme(monkeypatch):
+    """Après une connexion réussie, un hash d'un autre schéma est remplacé par le schéma courant"""
+    monkeypatch.setitem(hashing.SCHEMES, "scrypt", FAST_SCRYPT)
+    monkeypatch.setattr(hashing, "PASSWORD_HASH_SCHEME", "scrypt")
+    legacy = FAST_PBKDF2.hash("motdepasse")
+
+    valid, upgraded = verify_password("motdepasse", legacy)
+
+    assert valid
+    assert upgraded.startswith("scrypt$")
+    assert check_password("motdepasse", upgraded)
+    assert verify_password("autre", legacy) == (False, None)
+    assert verify_password("motdepasse", upgraded) == (True, None)
+
+
+@pytest.fixture
+def pool():
+    pool = HashingPool(workers=1, max_pending=1)
+    yield pool
+    pool.shutdown()
+
+
+def test_pool_hashes_in_worker_process(pool):
+    """Le hachage fait dans le pool est vérifiable, et inversement"""
+    hashed = pool.run(FAST_PBKDF2.hash, "motdepasse")
+
+    assert check_password("motdepasse", hashed)
+    assert pool.run(check_password, "motdepasse", hashed) is True
+    assert pool.statistics()["completed"] == 2
+
+
+def test_pool_rejects_when_saturated(pool):
+    """Au-delà de max_pending calculs en cours, la demande est refusée sans attendre"""
+    running = pool.submit(time.sleep, 0.5)
+
+    with pytest.raises(PasswordHashingBusy):
+        pool.submit(FAST_PBKDF2.hash, "motdepasse")
+
+    running.result()
+    # Le compteur est décrémenté par le callback de fin, juste après le résultat
+    deadline = time.monotonic() + 1
+    while pool.statistics()["pending"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert pool.statistics()["rejected"] == 1
+    assert pool.statistics()["pending"] == 0
+    assert check_password("motdepasse", pool.run(FAST_PBKDF2.hash, "motdepasse"))
+
+
+def test_pool_run_async(pool):
+    """La version asynchrone attend le résultat sans bloquer la boucle"""
+    hashed = asyncio.run(pool.run_async(FAST_PBKDF2.hash, "motdepasse"))
+
+    assert check_password("motdepasse", hashed)
@@ -0,0 +1,52 @@
+"""
+Tests de l'import en masse des fiches
+"""
+
+from sqlalchemy import func, select
+
+from models import FicheLapin
+from services import ficheLapin as ficheLapin_service
+
+
+def _record(i, **overrides):
+    return {"nom": f"Import_{i}", "numero_arrivee_association": i, "date_creation_fiche": "2024-01-01T00:00:00", **overrides}
+
+
+def _count(db):
+    return db.execute(select(func.count()).select_from(FicheLapin)).scalar()
+
+
+def test_import_inserts_valid_rows_in_batches(test_db_session, test_user, monkeypatch):
+    """Toutes les fiches valides sont créées (par lots de BULK_IMPORT_BATCH_SIZE) au nom de l'utilisateur"""
+    monkeypatch.setattr(ficheLapin_service, "BULK_IMPORT_BATCH_SIZE", 2)
+    records = [_record(i, auteur_id="ignored") for i in range(5)]
+
+    report = ficheLapin_service.import_ficheslapin(test_db_session, records, auteur_id=test_user.id)
+
+    assert len(report.ids) == 5 and report.errors == []
+    fiches = test_db_session.execute(select(FicheLapin).order_by(FicheLapin.numero_arrivee_association)).scalars().all()
+    assert [fiche.nom for fiche in fiches] == [f"Import_{i}" for i in range(5)]
+    assert {fiche.auteur_id for fiche in fiches} == {test_user.id}
+
+
+def test_import_reports_errors_per_row(test_db_session, test_user):
+    """Les lignes invalides sont rapportées avec leur index, les autres sont créées"""
+    records = [_record(0), {"nom": "Sans numéro"}, "pas un objet", _record(3, poids_actuel="lourd")]
+
+    report = ficheLapin_service.import_ficheslapin(test_db_session, records, auteur_id=test_user.id)
+
+    assert len(report.ids) == 1
+    assert [error["row"] for error in report.errors] == [1, 2, 3]
+    assert report.errors[0]["errors"][0]["loc"] == ("numero_arrivee_association",)
+    assert _count(test_db_session) == 1
+
+
+def test_import_all_or_nothing(test_db_session, test_user):
+    """Avec all_or_nothing, une seule ligne invalide empêche toute création"""
+    records = [_record(0), {"nom": "Sans numéro"}]
+
+    report = ficheLapin_service.import_ficheslapin(test_db_session, records, auteur_id=test_user.id, all_or_nothing=True)
+
+    assert report.ids == []
+    assert len(report.errors) == 1
+    assert _count(test_db_session) == 0
@@ -0,0 +1,71 @@
+"""
+Tests de l'invalidation des caches entre workers (LISTEN/NOTIFY)
+"""
+
+import json
+import threading
+
+import pytest
+from sqlalchemy import func, select
+
+from services import invalidation
+from services.cache import fiche_cache
+from services.ficheLapin import name_index
+from services.user import UserRef, user_cache
+
+
+def _event(kind, key=None, worker="autre-worker"):
+    return json.dumps({"worker": worker, "kind": kind, "key": key})
+
+
+def test_dispatch_evicts_fiche():
+    """Une fiche modifiée ailleurs sort du cache local et l'index des noms est à reconstruire"""
+    fiche_cache.set("fiche-1", b"{}")
+    name_index.rebuild([])
+
+    invalidation.dispatch(_event(invalidation.FICHE, "fiche-1"))
+
+    assert fiche_cache.get("fiche-1") is None
+    assert not name_index.is_fresh(60)
+
+
+def test_dispatch_evicts_user_and_embedding_fiches():
+    """Un utilisateur modifié ailleurs sort du cache, ainsi que les fiches qui l'embarquent"""
+    user_cache.set("user-1", UserRef("user-1", "benevole"))
+    fiche_cache.set("fiche-1", b"{}")
+
+    invalidation.dispatch(_event(invalidation.USER, "user-1"))
+
+    assert user_cache.statistics()["size"] == 0
+    assert fiche_cache.get("fiche-1") is None
+
+
+def test_dispatch_ignores_own_and_malformed_events():
+    """Les événements de ce worker (déjà appliqués) et les charges illisibles sont ignorés"""
+    fiche_cache.set("fiche-1", b"{}")
+
+    invalidation.dispatch(_event(invalidation.FICHE, "fiche-1", worker=invalidation.WORKER_ID))
+    invalidation.dispatch("pas du json")
+    invalidation.dispatch("[]")
+
+    assert fiche_cache.get("fiche-1") == b"{}"
+
+
+def test_listener_applies_notifications(test_db_engine, test_db_session):
+    """Une notification validée par un autre worker est appliquée par le thread d'écoute"""
+    if test_db_engine.dialect.name != "postgresql":
+        pytest.skip("LISTEN/NOTIFY nécessite PostgreSQL")
+    received = threading.Event()
+    invalidation.subscribe("test", lambda key: received.set())
+    listener = invalidation.start_listener(test_db_engine)
+    try:
+        assert listener.connected.wait(timeout=5)
+
+        test_db_session.execute(select(func.pg_notify(invalidation.CHANNEL, _event("test", "1"))))
+        assert not received.wait(timeout=0.5)
+        test_db_session.commit()
+
+        assert received.wait(timeout=5)
+    finally:
+        listener.stop()
+        invalidation._handlers.pop("test", None)
@@ -0,0 +1,123 @@
+"""
+Tests de la pagination par curseur (keyset)
+"""
+
+import pytest
+from datetime import datetime, timedelta
+
+from exceptions.pagination import InvalidCursor
+from models import FicheLapin, Post
+from services import ficheLapin as ficheLapin_service
+from services import posts as posts_service
+from services import user as user_service
+from services.pagination import PAGE_SIZE_MAX, clamp_limit
+
+
+@pytest.fixture
+def five_fiches(test_db_session, test_user):
+    """Cinq fiches dont deux partagent la même date de création"""
+    start = datetime(2024, 1, 1)
+    dates = [start, start + timedelta(days=1), start + timedelta(days=1), start + timedelta(days=2), start + timedelta(days=3)]
+    for i, date in enumerate(dates):
+        test_db_session.add(FicheLapin(
+            nom=f"Lapin_{i}", numero_arrivee_association=i, date_creation_fiche=date, auteur_id=test_user.id
+        ))
+    test_db_session.commit()
+    yield
+    test_db_session.query(FicheLapin).delete()
+    test_db_session.commit()
+
+
+def test_pages_cover_every_fiche_once(test_db_session, five_fiches):
+    """Parcourir les pages renvoie chaque fiche une seule fois, dans l'ordre"""
+    seen, cursor, pages = [], None, 0
+    while True:
+        page = ficheLapin_service.get_all_ficheslapin(db=test_db_session, cursor=cursor, limit=2)
+        seen.extend(f.id for f in page.items)
+        pages += 1
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    records = test_db_session.query(FicheLapin).order_by(FicheLapin.date_creation_fiche, FicheLapin.id).all()
+    assert pages == 3
+    assert seen == [f.id for f in records]
+
+
+def test_last_page_has_no_cursor(test_db_session, five_fiches):
+    """Une page qui contient tout n'a pas de curseur suivant"""
+    page = ficheLapin_service.get_all_ficheslapin(db=test_db_session, limit=5)
+
+    assert len(page.items) == 5
+    assert page.next_cursor is None
+
+
+def test_invalid_cursor(test_db_session):
+    """Un curseur illisible lève InvalidCursor"""
+    with pytest.raises(InvalidCursor):
+        ficheLapin_service.get_all_ficheslapin(db=test_db_session, cursor="pas-un-curseur")
+
+
+def test_clamp_limit():
+    """La taille de page est bornée"""
+    assert clamp_limit(10_000) == PAGE_SIZE_MAX
+    assert clamp_limit(None) > 0
+
+
+def test_pages_keep_fiches_without_creation_date(test_db_session, test_user):
+    """Les fiches sans date de création (colonne nullable) sont parcourues en dernier, aucune n'est perdue"""
+    for i in range(3):
+        test_db_session.add(FicheLapin(
+            id=f"f{i}", nom=f"Lapin_{i}", numero_arrivee_association=i,
+            date_creation_fiche=datetime(2024, 1, 1), auteur_id=test_user.id,
+        ))
+    test_db_session.commit()
+    test_db_session.query(FicheLapin).filter(FicheLapin.id != "f0").update({"date_creation_fiche": None})
+    test_db_session.commit()
+
+    seen, cursor = [], None
+    while True:
+        page = ficheLapin_service.get_all_ficheslapin(db=test_db_session, cursor=cursor, limit=1)
+        seen.extend(f.id for f in page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    assert seen == ["f0", "f1", "f2"]
+    test_db_session.query(FicheLapin).delete()
+    test_db_session.commit()
+
+
+def test_pages_keep_posts_without_creation_date(test_db_session, test_user):
+    """Même garantie pour la liste des posts"""
+    for i in range(3):
+        test_db_session.add(Post(id=f"p{i}", title=f"Post_{i}", date_creation_post=datetime(2024, 1, 1), author_id=test_user.id))
+    test_db_session.commit()
+    test_db_session.query(Post).filter(Post.id != "p1").update({"date_creation_post": None})
+    test_db_session.commit()
+
+    seen, cursor = [], None
+    while True:
+        page = posts_service.get_all_posts(db=test_db_session, cursor=cursor, limit=1)
+        seen.extend(p.id for p in page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    assert seen == ["p1", "p0", "p2"]
+    test_db_session.query(Post).delete()
+    test_db_session.commit()
+
+
+def test_skip_is_still_accepted(test_db_session, test_user):
+    """L'ancien paramètre skip (OFFSET) des listes de posts et d'utilisateurs reste accepté"""
+    for i in range(3):
+        test_db_session.add(Post(id=f"p{i}", title=f"Post_{i}", date_creation_post=datetime(2024, 1, i + 1), author_id=test_user.id))
+    test_db_session.commit()
+
+    page = posts_service.get_all_posts(db=test_db_session, skip=2)
+
+    assert [p.id for p in page.items] == ["p2"]
+    assert user_service.get_all_users(db=test_db_session, skip=1).items == []
+    test_db_session.query(Post).delete()
+    test_db_session.commit()
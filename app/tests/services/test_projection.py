@@ -0,0 +1,54 @@
+"""
+Tests de la projection de colonnes (?fields=) des fiches lapin
+"""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from exceptions.ficheLapin import InvalidFields
+from serializers.ficheLapin import dump_projection, fiche_lapin_projection, parse_fields
+from services.ficheLapin import select_ficheslapin
+
+
+def test_parse_fields_always_includes_id():
+    """L'id est toujours renvoyé, les espaces sont ignorés"""
+    assert parse_fields(" nom, photo ") == frozenset({"id", "nom", "photo"})
+    assert parse_fields(None) is None
+
+
+def test_parse_fields_rejects_unknown_field():
+    """Un champ hors du schéma est refusé"""
+    with pytest.raises(InvalidFields):
+        parse_fields("nom,password")
+
+
+def test_projection_model_is_cached_per_field_set():
+    """Le modèle réduit est construit une seule fois par jeu de champs"""
+    fields = parse_fields("nom,sexe")
+
+    model = fiche_lapin_projection(fields)
+
+    assert model is fiche_lapin_projection(parse_fields("sexe,nom"))
+    assert set(model.model_fields) == {"id", "nom", "sexe"}
+
+
+def test_detail_and_list_share_the_same_serialization():
+    """Une fiche seule et la même fiche dans une liste sont sérialisées à l'identique"""
+    fields = parse_fields("nom")
+    fiche = SimpleNamespace(id="f1", nom="Pompon", sexe="M")
+
+    assert json.loads(dump_projection(fields, fiche)) == {"id": "f1", "nom": "Pompon"}
+    assert json.loads(dump_projection(fields, [fiche])) == [json.loads(dump_projection(fields, fiche))]
+
+
+def test_select_only_reads_requested_columns():
+    """Le SELECT ne lit que les colonnes demandées et la clé de tri"""
+    stmt, _ = select_ficheslapin(fields=parse_fields("nom"))
+
+    sql = str(stmt)
+
+    assert "fiche_lapin.nom" in sql
+    assert "fiche_lapin.date_creation_fiche" in sql
+    assert "fiche_lapin.caractere" not in sql
@@ -0,0 +1,116 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from services.ratelimit import LoginRateLimiter, SlidingWindowLimiter, TokenBucketLimiter
+
+
+@pytest.fixture
+def redis_server():
+    """Serveur fakeredis : commandes, pipeline et réponses (bytes) comme un vrai serveur"""
+    fakeredis = pytest.importorskip("fakeredis")
+    return fakeredis, fakeredis.FakeServer()
+
+
+def test_token_bucket_allows_burst_then_refuses():
+    """Les `capacity` premières tentatives passent, la suivante attend un jeton"""
+    limiter = TokenBucketLimiter(capacity=3, per_second=1)
+
+    assert [limiter.hit("1.2.3.4") for _ in range(3)] == [0, 0, 0]
+    wait = limiter.hit("1.2.3.4")
+    assert 0 < wait <= 1
+    # Les autres clés ont leur propre seau
+    assert limiter.hit("5.6.7.8") == 0
+
+
+def test_token_bucket_refills_over_time(monkeypatch):
+    """Un jeton revient après 1 / per_second secondes"""
+    now = [100.0]
+    monkeypatch.setattr("services.ratelimit.time.monotonic", lambda: now[0])
+    limiter = TokenBucketLimiter(capacity=1, per_second=0.5)
+
+    assert limiter.hit("key") == 0
+    assert limiter.hit("key") == 2
+    now[0] += 2
+    assert limiter.hit("key") == 0
+
+
+def test_token_bucket_forgets_idle_keys(monkeypatch):
+    """Au-delà de max_keys, les seaux pleins (clients inactifs) sont oubliés"""
+    now = [0.0]
+    monkeypatch.setattr("services.ratelimit.time.monotonic", lambda: now[0])
+    limiter = TokenBucketLimiter(capacity=1, per_second=1, shards=1, max_keys=10)
+
+    for i in range(10):
+        limiter.hit(f"ip-{i}")
+    now[0] += 5
+    limiter.hit("ip-new")
+
+    assert sum(len(shard.buckets) for shard in limiter._shards) == 1
+
+
+def test_token_bucket_is_exact_under_concurrency():
+    """Les shards sont verrouillés : jamais plus de `capacity` tentatives admises"""
+    limiter = TokenBucketLimiter(capacity=50, per_second=0.001)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        waits = list(executor.map(lambda _: limiter.hit("same-key"), range(200)))
+
+    assert waits.count(0) == 50
+
+
+def test_sliding_window_counts_in_shared_store(redis_server):
+    """Deux limiteurs (deux workers) partagent les mêmes compteurs, qui expirent"""
+    fakeredis, server = redis_server
+    client = fakeredis.FakeRedis(server=server)
+    worker_a = SlidingWindowLimiter(client, capacity=2, per_second=2 / 60, prefix="login:ip:")
+    worker_b = SlidingWindowLimiter(fakeredis.FakeRedis(server=server), capacity=2, per_second=2 / 60, prefix="login:ip:")
+
+    assert worker_a.hit("1.2.3.4") == 0
+    assert worker_b.hit("1.2.3.4") == 0
+    assert 0 < worker_a.hit("1.2.3.4") <= 60
+    assert all(0 < client.ttl(key) <= 120 for key in client.scan_iter(match="login:ip:*"))
+    assert worker_a.errors == worker_b.errors == 0
+
+
+def test_sliding_window_fails_open(redis_server):
+    """Redis indisponible : la tentative passe, l'erreur est comptée"""
+    fakeredis, server = redis_server
+    limiter = SlidingWindowLimiter(fakeredis.FakeRedis(server=server), capacity=1, per_second=1, prefix="login:ip:")
+    server.connected = False
+
+    assert limiter.hit("1.2.3.4") == 0
+    assert limiter.errors == 1
+
+
+def test_login_limiter_checks_username_across_ips():
+    """Le seau par nom d'utilisateur bloque une attaque répartie sur plusieurs IP"""
+    limiter = LoginRateLimiter(
+        TokenBucketLimiter(capacity=10, per_second=1),
+        TokenBucketLimiter(capacity=2, per_second=0.01),
+    )
+
+    assert limiter.check("10.0.0.1", "alice") == 0
+    assert limiter.check("10.0.0.2", "Alice") == 0
+    assert limiter.check("10.0.0.3", "alice ") == 100
+    assert limiter.statistics()["rejected"] == 1
+
+
+def test_client_address_behind_trusted_proxies(monkeypatch):
+    """Derrière n proxies de confiance, l'adresse vient de X-Forwarded-For, sans croire les entrées du client"""
+    from types import SimpleNamespace
+
+    from services import ratelimit
+
+    def request(forwarded_for=None):
+        headers = {"x-forwarded-for": forwarded_for} if forwarded_for else {}
+        return SimpleNamespace(headers=headers, client=SimpleNamespace(host="10.0.0.1"))
+
+    assert ratelimit.client_address(request("6.6.6.6, 203.0.113.7")) == "10.0.0.1"
+
+    monkeypatch.setattr(ratelimit, "TRUSTED_PROXY_HOPS", 1)
+    assert ratelimit.client_address(request("6.6.6.6, 203.0.113.7")) == "203.0.113.7"
+    assert ratelimit.client_address(request()) == "10.0.0.1"
+
+    monkeypatch.setattr(ratelimit, "TRUSTED_PROXY_HOPS", 2)
+    assert ratelimit.client_address(request("6.6.6.6, 203.0.113.7, 10.0.0.2")) == "203.0.113.7"
@@ -0,0 +1,147 @@
+"""
+Tests du routage des lectures vers un réplica (deux bases SQLite locales)
+"""
+
+import json
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import BaseSQL, PrimaryPins, RoutingSession
+from models import FicheLapin, User
+from models.tableVersion import TableVersion
+from services import ficheLapin as ficheLapin_service
+from services import versions as versions_service
+from services.cache import fiche_cache
+
+
+@pytest.fixture
+def routed_session(tmp_path):
+    """Session routée sur un primaire et un réplica en retard d'une écriture (fiche 'Replica', version 1)"""
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    for engine, nom, version in ((primary, "Primaire", 2), (replica, "Replica", 1)):
+        BaseSQL.metadata.create_all(bind=engine)
+        with sessionmaker(bind=engine)() as seed:
+            seed.add(User(id="u1", username="auteur", password="x"))
+            seed.add(FicheLapin(id="f1", nom=nom, numero_arrivee_association=1, auteur_id="u1"))
+            seed.add(TableVersion(name=versions_service.FICHES, version=version))
+            seed.commit()
+
+    pins = PrimaryPins(seconds=60)
+    Session = sessionmaker(class_=RoutingSession, primary=primary, replicas=[replica], pins=pins)
+    session = Session()
+    session.info["caller"] = "benevole-1"
+    yield session
+    session.close()
+    primary.dispose()
+    replica.dispose()
+
+
+def test_read_only_services_use_replica(routed_session):
+    """Les services de lecture décorés lisent sur le réplica"""
+    fiches = ficheLapin_service.get_all_ficheslapin(db=routed_session).items
+
+    assert [f.nom for f in fiches] == ["Replica"]
+
+
+def test_detail_cache_is_filled_from_primary(routed_session):
+    """Un échec du cache du détail est relu sur le primaire, jamais sur un réplica en retard"""
+    fiche_cache.delete("f1")
+
+    content = ficheLapin_service.get_fichelapin_json("f1", routed_session)
+
+    assert json.loads(content)["nom"] == "Primaire"
+    assert fiche_cache.get("f1") == content
+    fiche_cache.delete("f1")
+
+
+def test_unmarked_queries_use_primary(routed_session):
+    """Sans marquage read_only, la requête va sur le primaire"""
+    fiche = routed_session.query(FicheLapin).filter(FicheLapin.id == "f1").first()
+
+    assert fiche.nom == "Primaire"
+
+
+def test_caller_pinned_to_primary_after_write(routed_session):
+    """Après une écriture, l'appelant relit ses propres données sur le primaire"""
+    routed_session.add(FicheLapin(nom="Nouvelle", numero_arrivee_association=2, auteur_id="u1"))
+    routed_session.commit()
+
+    noms = {f.nom for f in ficheLapin_service.get_all_ficheslapin(db=routed_session).items}
+
+    assert noms == {"Primaire", "Nouvelle"}
+
+
+def test_other_callers_not_pinned(routed_session):
+    """L'épinglage ne concerne que l'appelant qui a écrit"""
+    routed_session.add(FicheLapin(nom="Nouvelle", numero_arrivee_association=2, auteur_id="u1"))
+    routed_session.commit()
+    routed_session.info["caller"] = "benevole-2"
+
+    fiches = ficheLapin_service.get_all_ficheslapin(db=routed_session).items
+
+    assert [f.nom for f in fiches] == ["Replica"]
+
+
+def test_versions_are_read_where_the_list_is_read(routed_session):
+    """Les compteurs des ETag viennent du même réplica que la liste, pas du primaire"""
+    versions = versions_service.get_versions(routed_session, (versions_service.FICHES,))
+    fiches = ficheLapin_service.get_all_ficheslapin(db=routed_session).items
+
+    assert (versions, [f.nom for f in fiches]) == ({versions_service.FICHES: 1}, ["Replica"])
+
+
+def test_read_only_reads_stay_on_one_replica(tmp_path, routed_session):
+    """Une session garde le même réplica jusqu'à sa prochaine écriture"""
+    other = create_engine(f"sqlite:///{tmp_path / 'other.db'}")
+    routed_session.replicas.append(other)
+
+    routed_session.info["read_only"] = True
+    binds = {routed_session.get_bind() for _ in range(20)}
+
+    assert len(binds) == 1
+    other.dispose()
+
+
+def test_list_etag_follows_the_replica(routed_session):
+    """
+    Un ETag obtenu sur un réplica en retard ne couvre pas les données à jour :
+    une fois le réplica rattrapé, la même requête renvoie 200 et non 304
+    """
+    import database
+    from main import app
+    from services.auth import _encode_jwt
+
+    if database.DATABASE_ASYNC:
+        pytest.skip("session routée synchrone")
+    from fastapi.testclient import TestClient
+
+    app.dependency_overrides[database.get_db] = lambda: routed_session
+    headers = {"Authorization": f"Bearer {_encode_jwt(routed_session.get(User, 'u1'))}"}
+    replica = routed_session.replicas[0]
+    try:
+        client = TestClient(app)
+        stale = client.get("/ficheslapin/", headers=headers)
+        assert [f["nom"] for f in stale.json()] == ["Replica"]
+
+        with replica.begin() as connection:
+            connection.execute(FicheLapin.__table__.update().values(nom="Primaire"))
+            connection.execute(TableVersion.__table__.update().values(version=2))
+        routed_session.rollback()
+
+        fresh = client.get("/ficheslapin/", headers={**headers, "If-None-Match": stale.headers["ETag"]})
+        assert fresh.status_code == 200
+        assert [f["nom"] for f in fresh.json()] == ["Primaire"]
+    finally:
+        app.dependency_overrides.pop(database.get_db)
+
+
+def test_primary_pin_expires():
+    """Un épinglage expire après sa durée"""
+    pins = PrimaryPins(seconds=0)
+    pins.pin("benevole-1")
+
+    assert pins.is_pinned("benevole-1") is False
+    assert PrimaryPins(seconds=60).is_pinned("inconnu") is False
@@ -0,0 +1,74 @@
+"""
+Tests du chemin de lecture Core des listes (lignes plutôt qu'objets ORM)
+"""
+
+from datetime import datetime
+
+import pytest
+
+from models import FicheLapin, Post
+from serializers.ficheLapin import parse_fields
+from services import ficheLapin as ficheLapin_service
+from services import posts as posts_service
+from services.rows import Record
+
+
+@pytest.fixture
+def fiche_and_post(test_db_session, test_user):
+    fiche = FicheLapin(id="f1", nom="Pompon", numero_arrivee_association=1, auteur_id=test_user.id)
+    post = Post(id="p1", title="Arrivée", content="RAS", author_id=test_user.id,
+                fiche_lapin_id="f1", date_creation_post=datetime(2024, 1, 1))
+    test_db_session.add_all([fiche, post])
+    test_db_session.commit()
+    # Hors de la session : une liste ORM les y ferait revenir
+    test_db_session.expunge(fiche)
+    test_db_session.expunge(post)
+    yield
+    test_db_session.query(Post).delete()
+    test_db_session.query(FicheLapin).delete()
+    test_db_session.commit()
+
+
+def test_record_reads_keys_as_attributes():
+    """Un enregistrement se lit comme un objet ORM, une clé absente lève AttributeError"""
+    record = Record(nom="Pompon", auteur=Record(username="jeanne"))
+
+    assert record.nom == "Pompon"
+    assert record.auteur.username == "jeanne"
+    assert getattr(record, "photo", None) is None
+
+
+def test_list_does_not_load_orm_objects(test_db_session, test_user, fiche_and_post):
+    """Fiches, posts et auteurs arrivent en lignes : rien n'entre dans la session"""
+    username = test_user.username
+    loaded = set(test_db_session.identity_map.keys())
+
+    fiches = ficheLapin_service.get_all_ficheslapin(db=test_db_session).items
+    posts = posts_service.get_all_posts(db=test_db_session).items
+
+    assert fiches[0].nom == "Pompon"
+    assert fiches[0].auteur.username == username
+    assert posts[0].author.username == username
+    assert set(test_db_session.identity_map.keys()) == loaded
+
+
+def test_author_is_joined_only_when_requested():
+    """La projection sans auteur ne joint pas la table des utilisateurs"""
+    without_author = ficheLapin_service.select_ficheslapin_rows(fields=parse_fields("nom"))
+    with_author = ficheLapin_service.select_ficheslapin_rows(fields=parse_fields("nom,auteur"))
+
+    assert "users" not in str(without_author.stmt)
+    assert "fiche_lapin.caractere" not in str(without_author.stmt)
+    assert "LEFT OUTER JOIN users" in str(with_author.stmt)
+
+
+def test_missing_author_is_none():
+    """Une jointure externe sans auteur donne None, pas un auteur vide"""
+    query = ficheLapin_service.select_ficheslapin_rows(fields=parse_fields("nom,auteur"))
+    row = (datetime(2024, 1, 1), "f1", "Pompon") + (None,) * len(query.related_columns)
+
+    [record] = query.records([row], "auteur")
+
+    assert [c.key for c in query.columns] == ["date_creation_fiche", "id", "nom"]
+    assert record.nom == "Pompon"
+    assert record.auteur is None
@@ -0,0 +1,74 @@
+"""
+Tests de la recherche plein texte des fiches
+"""
+
+import pytest
+from datetime import datetime
+
+from models import FicheLapin
+from services import ficheLapin as ficheLapin_service
+
+
+@pytest.fixture
+def fiches(test_db_session, test_user, fiche_search):
+    rows = [
+        dict(nom="Noisette", caractere="calme et câlin"),
+        dict(nom="Caramel", caractere="craintif", problemes_sante_connus="malocclusion dentaire"),
+        dict(nom="Réglisse", caractere="curieux", nom_veterinaire="Dr Noisette"),
+        dict(nom="Pompon", caractere="joueur", type_foin="foin de crau"),
+    ]
+    for i, row in enumerate(rows):
+        test_db_session.add(FicheLapin(
+            numero_arrivee_association=i, date_creation_fiche=datetime(2024, 1, 1), auteur_id=test_user.id, **row
+        ))
+    test_db_session.commit()
+    yield
+    test_db_session.query(FicheLapin).delete()
+    test_db_session.commit()
+
+
+def _names(page):
+    return [f.nom for f in page.items]
+
+
+def test_search_matches_free_text_fields(test_db_session, fiches):
+    """Chaque champ libre est cherché"""
+    assert _names(ficheLapin_service.search_ficheslapin(test_db_session, "dentaire")) == ["Caramel"]
+    assert _names(ficheLapin_service.search_ficheslapin(test_db_session, "crau")) == ["Pompon"]
+
+
+def test_search_ranks_name_first(test_db_session, fiches):
+    """Un mot trouvé dans le nom passe avant le même mot chez le vétérinaire"""
+    assert _names(ficheLapin_service.search_ficheslapin(test_db_session, "noisette")) == ["Noisette", "Réglisse"]
+
+
+def test_search_matches_prefixes_on_every_backend(test_db_session, fiches):
+    """Tous les mots doivent être présents, chacun en préfixe, quelle que soit la base"""
+    assert _names(ficheLapin_service.search_ficheslapin(test_db_session, "malocc")) == ["Caramel"]
+    assert _names(ficheLapin_service.search_ficheslapin(test_db_session, "craint dent")) == ["Caramel"]
+    assert _names(ficheLapin_service.search_ficheslapin(test_db_session, "craint crau")) == []
+
+
+def test_search_sees_later_updates(test_db_session, fiches):
+    """L'index suit les modifications des fiches"""
+    fiche = test_db_session.query(FicheLapin).filter(FicheLapin.nom == "Pompon").one()
+    fiche.caractere = "gourmand"
+    test_db_session.commit()
+
+    assert _names(ficheLapin_service.search_ficheslapin(test_db_session, "gourmand")) == ["Pompon"]
+    assert _names(ficheLapin_service.search_ficheslapin(test_db_session, "joueur")) == []
+
+
+def test_search_pages(test_db_session, fiches):
+    """Les résultats se parcourent page par page"""
+    first = ficheLapin_service.search_ficheslapin(test_db_session, "noisette", limit=1)
+    second = ficheLapin_service.search_ficheslapin(test_db_session, "noisette", cursor=first.next_cursor, limit=1)
+
+    assert _names(first) + _names(second) == ["Noisette", "Réglisse"]
+    assert second.next_cursor is None
+
+
+def test_search_ignores_query_syntax(test_db_session, fiches):
+    """La ponctuation de la requête ne provoque pas d'erreur"""
+    assert ficheLapin_service.search_ficheslapin(test_db_session, '"').items == []
+    assert _names(ficheLapin_service.search_ficheslapin(test_db_session, '(crau*')) == ["Pompon"]
@@ -0,0 +1,115 @@
+"""
+Tests de la recherche approchée des noms (index n-grammes en mémoire)
+"""
+
+import time
+
+import pytest
+from datetime import datetime
+
+from models import FicheLapin
+from services import ficheLapin as ficheLapin_service
+from services.trigram import TrigramIndex, trigrams
+
+
+@pytest.fixture
+def index():
+    index = TrigramIndex()
+    index.rebuild([("1", "Câlin_3"), ("2", "Némo_7"), ("3", "Pistache_12"), ("4", "Pistache_40"), ("5", "Moka")])
+    return index
+
+
+def test_trigrams_ignore_accents_case_and_suffix_separator():
+    """Même découpage que pg_trgm, sans accents ni majuscules ; _ sépare les mots"""
+    assert trigrams("Câlin") == trigrams("calin") == {"  c", " ca", "cal", "ali", "lin", "in "}
+    assert trigrams("Pistache_12") == trigrams("pistache") | trigrams("12")
+
+
+def test_search_tolerates_typos(index):
+    """Une faute de frappe retrouve le bon nom"""
+    assert index.search("pistashe")[0].nom.startswith("Pistache")
+    assert index.search("nemo")[0].nom == "Némo_7"
+    assert index.search("calin")[0].id == "1"
+
+
+def test_search_returns_top_k_by_score(index):
+    """Les résultats sont triés par similarité et limités à k"""
+    matches = index.search("Pistache_12", limit=2)
+
+    assert [m.id for m in matches] == ["3", "4"]
+    assert matches[0].score == 1.0 > matches[1].score
+
+
+def test_search_ignores_unrelated_names(index):
+    """Sous le seuil de similarité, rien n'est renvoyé"""
+    assert index.search("zzz") == []
+    assert index.search("") == []
+
+
+def test_add_and_remove_keep_postings_current(index):
+    """Ajouts et suppressions sont visibles immédiatement"""
+    index.add("6", "Flocon")
+    index.remove("5")
+    index.add("1", "Biscotte")
+
+    assert index.search("flocon")[0].id == "6"
+    assert index.search("moka") == []
+    assert index.search("calin") == []
+    assert len(index) == 5
+
+
+def test_search_is_fast_on_tens_of_thousands_of_names():
+    """Quelques millisecondes pour 20 000 noms"""
+    index = TrigramIndex()
+    names = ["Luna", "Pixel", "Némo", "Câlin", "Moka", "Pistache", "Oréo", "Plume", "Caramel", "Noisette"]
+    index.rebuild((str(i), f"{names[i % len(names)]}_{i}") for i in range(20_000))
+
+    start = time.perf_counter()
+    matches = index.search("Noisete_19", limit=5)
+    elapsed = time.perf_counter() - start
+
+    assert matches[0].nom == "Noisette_19"
+    assert elapsed < 0.5
+
+
+@pytest.fixture
+def fiches(test_db_session, test_user):
+    ficheLapin_service.name_index.built_at = None
+    for i, nom in enumerate(["Câlin_1", "Caramel_2", "Noisette_3"]):
+        test_db_session.add(FicheLapin(
+            nom=nom, numero_arrivee_association=i, date_creation_fiche=datetime(2024, 1, 1), auteur_id=test_user.id
+        ))
+    test_db_session.commit()
+    yield
+    test_db_session.query(FicheLapin).delete()
+    test_db_session.commit()
+    ficheLapin_service.name_index.built_at = None
+
+
+def test_get_similar_names_from_database(test_db_session, fiches):
+    """Le service renvoie les noms proches d'après la base"""
+    matches = ficheLapin_service.get_similar_names(test_db_session, "caramell", limit=1)
+
+    assert [m.nom for m in matches] == ["Caramel_2"]
+
+
+def test_get_similar_names_sees_new_fiches(test_db_session, test_user, fiches):
+    """Une fiche créée par ce processus est trouvée sans attendre la reconstruction"""
+    import serializers
+
+    ficheLapin_service.get_similar_names(test_db_session, "calin")
+    ficheLapin_service.create_fichelapin(test_db_session, serializers.FicheLapin(
+        nom="Flocon_4", auteur_id=test_user.id, numero_arrivee_association=4, date_creation_fiche=datetime(2024, 1, 1)
+    ))
+
+    assert ficheLapin_service.get_similar_names(test_db_session, "flocn")[0].nom == "Flocon_4"
+
+
+def test_pg_trgm_query_ignores_accents_like_the_memory_index():
+    """Sous PostgreSQL, le nom et la requête passent tous deux par f_unaccent (index de la migration 8)"""
+    from sqlalchemy.dialects import postgresql
+
+    sql = str(ficheLapin_service.select_similar_names("helene").compile(dialect=postgresql.dialect()))
+
+    assert "similarity(f_unaccent(fiche_lapin.nom), f_unaccent(" in sql
+    assert "f_unaccent(fiche_lapin.nom) %% f_unaccent(" in sql
@@ -0,0 +1,44 @@
+"""
+Tests des compteurs d'écritures par table (ETag)
+"""
+
+from services import versions as versions_service
+from services.versions import FICHES, POSTS, USERS
+
+
+def test_get_versions_defaults_to_zero(test_db_session):
+    """Une table sans compteur est à la version 0"""
+    assert versions_service.get_versions(test_db_session, (FICHES, POSTS)) == {FICHES: 0, POSTS: 0}
+
+
+def test_bump_versions_only_touches_given_tables(test_db_session):
+    """Seuls les compteurs des tables modifiées avancent"""
+    versions_service.bump_versions(test_db_session, FICHES)
+    test_db_session.commit()
+    versions_service.bump_versions(test_db_session, FICHES, POSTS)
+    test_db_session.commit()
+
+    assert versions_service.get_versions(test_db_session, (FICHES, POSTS, USERS)) == {FICHES: 2, POSTS: 1, USERS: 0}
+
+
+def test_bump_versions_rolls_back_with_the_transaction(test_db_session):
+    """Un compteur n'avance pas si l'écriture est annulée"""
+    versions_service.bump_versions(test_db_session, FICHES)
+    test_db_session.commit()
+    versions_service.bump_versions(test_db_session, FICHES)
+    test_db_session.rollback()
+
+    assert versions_service.get_versions(test_db_session, (FICHES,)) == {FICHES: 1}
+
+
+def test_bump_versions_is_a_single_upsert():
+    """Un seul INSERT ... ON CONFLICT pour toutes les tables, dans un ordre fixe (pas de select puis insert)"""
+    from sqlalchemy.dialects import postgresql
+
+    compiled = versions_service.increment_versions("postgresql", (USERS, FICHES, USERS)).compile(
+        dialect=postgresql.dialect()
+    )
+
+    assert "ON CONFLICT (name) DO UPDATE SET version = (table_versions.version + " in str(compiled)
+    assert [compiled.params["name_m0"], compiled.params["name_m1"]] == [FICHES, USERS]
+    assert "name_m2" not in compiled.params
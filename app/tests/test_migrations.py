@@ -0,0 +1,72 @@
+"""
+Tests des migrations de schéma versionnées
+"""
+
+import pytest
+from sqlalchemy import create_engine, inspect
+
+import migrations
+from database import BaseSQL
+
+
+@pytest.fixture
+def empty_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+    yield engine
+    engine.dispose()
+
+
+def test_upgrade_reaches_head(empty_engine):
+    """Une base vide est migrée jusqu'à la dernière révision"""
+    applied = migrations.upgrade(empty_engine)
+
+    assert applied[-1] == migrations.head_version()
+    assert migrations.verify(empty_engine) == migrations.head_version()
+
+
+def test_upgrade_is_idempotent(empty_engine):
+    """Relancer upgrade sur une base à jour n'applique rien"""
+    migrations.upgrade(empty_engine)
+
+    assert migrations.upgrade(empty_engine) == []
+
+
+def test_verify_rejects_unmigrated_database(empty_engine):
+    """Le démarrage refuse une base qui n'est pas à la dernière révision"""
+    with pytest.raises(migrations.SchemaOutOfDate):
+        migrations.verify(empty_engine)
+
+
+def test_initial_migration_creates_hot_query_indexes(empty_engine):
+    """Les colonnes filtrées par les services sont indexées"""
+    migrations.upgrade(empty_engine, target=1)
+
+    inspector = inspect(empty_engine)
+    fiche_indexes = {tuple(i["column_names"]) for i in inspector.get_indexes("fiche_lapin")}
+    post_indexes = {tuple(i["column_names"]) for i in inspector.get_indexes("posts")}
+    assert {("auteur_id",), ("nom",), ("date_prochain_vaccin",)} <= fiche_indexes
+    assert {("fiche_lapin_id",), ("author_id",), ("title",)} <= post_indexes
+
+
+def test_migrated_schema_matches_models(empty_engine, tmp_path):
+    """Le schéma migré a les mêmes tables, colonnes et index que les modèles"""
+    reference = create_engine(f"sqlite:///{tmp_path / 'reference.db'}")
+    BaseSQL.metadata.create_all(bind=reference)
+    migrations.upgrade(empty_engine)
+
+    migrated, expected = inspect(empty_engine), inspect(reference)
+    for table in expected.get_table_names():
+        assert {c["name"] for c in migrated.get_columns(table)} == {c["name"] for c in expected.get_columns(table)}
+        assert {i["name"] for i in migrated.get_indexes(table)} == {i["name"] for i in expected.get_indexes(table)}
+    reference.dispose()
+
+
+def test_downgrade_to_zero(empty_engine):
+    """Annuler toutes les révisions ramène la base à la révision 0"""
+    migrations.upgrade(empty_engine)
+
+    migrations.downgrade(empty_engine, target=0)
+
+    with empty_engine.connect() as connection:
+        assert migrations.current_version(connection) == 0
+    assert "fiche_lapin" not in inspect(empty_engine).get_table_names()
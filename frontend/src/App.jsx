@@ -5,10 +5,17 @@ import logo from './assets/logo.png';
 import defaultRabbit from './assets/default-rabbit.jpg';
 
 
+// Fiches chargées par page (la suivante à la demande)
+const PAGE_SIZE = 30;
+// Délai après la dernière frappe avant d'interroger le serveur
+const SEARCH_DELAY_MS = 300;
+
 export default function App() {
   const [token, setToken] = useState(localStorage.getItem('token'));
   const [fiches, setFiches] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState('');
   const [view, setView] = useState('login');
   const [searchTerm, setSearchTerm] = useState('');
@@ -23,10 +30,10 @@ export default function App() {
   });
 
   useEffect(() => {
-    if (token) {
-      fetchFiches();
-    }
-  }, [token]);
+    if (!token) return;
+    const timer = setTimeout(fetchFiches, searchTerm ? SEARCH_DELAY_MS : 0);
+    return () => clearTimeout(timer);
+  }, [token, searchTerm]);
 
   const handleLogin = async () => {
     setLoading(true);
@@ -48,13 +55,28 @@ export default function App() {
     setToken(null);
     setView('login');
     setFiches([]);
+    setNextCursor(null);
+  };
+
+  // Recherche faite par le serveur, sur toutes les fiches et pas seulement la page chargée :
+  // un numéro passe par le filtre de la liste, un texte par la recherche plein texte
+  const requestFiches = (cursor) => {
+    const term = searchTerm.trim();
+    if (/^\d+$/.test(term)) {
+      return api.getAllFiches({ limit: PAGE_SIZE, cursor, numero_arrivee_association: term });
+    }
+    if (term) {
+      return api.searchFiches(term, { limit: PAGE_SIZE, cursor });
+    }
+    return api.getAllFiches({ limit: PAGE_SIZE, cursor });
   };
 
   const fetchFiches = async () => {
     setLoading(true);
     try {
-      const data = await api.getAllFiches();
-      setFiches(data);
+      const page = await requestFiches();
+      setFiches(page.items);
+      setNextCursor(page.nextCursor);
     } catch (err) {
       if (err.message.includes('401')) {
         handleLogout();
@@ -66,6 +88,19 @@ export default function App() {
     }
   };
 
+  const loadMoreFiches = async () => {
+    setLoadingMore(true);
+    try {
+      const page = await requestFiches(nextCursor);
+      setFiches(current => [...current, ...page.items]);
+      setNextCursor(page.nextCursor);
+    } catch (err) {
+      setError(err.message);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleCreateFiche = async () => {
     setLoading(true);
     setError('');
@@ -108,11 +143,6 @@ export default function App() {
     }
   };
 
-  const filteredFiches = fiches.filter(fiche => 
-    fiche.nom.toLowerCase().includes(searchTerm.toLowerCase()) ||
-    fiche.numero_arrivee_association.toString().includes(searchTerm)
-  );
-
   // LOGIN VIEW
   if (view === 'login' || !token) {
     return (
@@ -411,7 +441,7 @@ export default function App() {
             </div>
             <p className="text-gray-600 mt-6 font-medium">Chargement des fiches...</p>
           </div>
-        ) : filteredFiches.length === 0 ? (
+        ) : fiches.length === 0 ? (
           <div className="bg-white/80 backdrop-blur-lg rounded-2xl shadow-xl p-16 text-center border border-emerald-100">
             <div className="relative inline-block mb-6">
               <div className="absolute inset-0 bg-gradient-to-br from-emerald-300 to-green-300 rounded-full blur-xl opacity-50"></div>
@@ -428,7 +458,7 @@ export default function App() {
           </div>
         ) : (
           <div className="grid gap-6 md:grid-cols-2 lg:grid-cols-3">
-            {filteredFiches.map((fiche) => (
+            {fiches.map((fiche) => (
               <div key={fiche.id} className="group bg-white/80 backdrop-blur-lg rounded-2xl shadow-lg hover:shadow-2xl transition-all overflow-hidden border border-emerald-100 hover:border-emerald-300 transform hover:-translate-y-1">
                 {/* Image du lapin */}
                 <div className="relative h-48 bg-gradient-to-br from-emerald-100 to-green-100 overflow-hidden">
@@ -492,6 +522,18 @@ export default function App() {
             ))}
           </div>
         )}
+
+        {!loading && nextCursor && (
+          <div className="text-center mt-8">
+            <button
+              onClick={loadMoreFiches}
+              disabled={loadingMore}
+              className="px-6 py-3 bg-white/80 backdrop-blur-lg text-emerald-700 font-semibold rounded-xl shadow-lg border border-emerald-100 hover:border-emerald-300 transition-all disabled:opacity-50"
+            >
+              {loadingMore ? 'Chargement...' : 'Charger plus de fiches'}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
@@ -44,6 +44,28 @@ class ApiService {
     }
   }
 
+  // Listes paginées : une page par appel ({ items, nextCursor }) ; la page suivante
+  // se demande avec { cursor: nextCursor }, lu dans l'en-tête X-Next-Cursor
+  async requestPage(endpoint, params = {}) {
+    const token = this.getToken();
+    const query = new URLSearchParams(
+      Object.entries(params).filter(([, value]) => value !== undefined && value !== null && value !== '')
+    ).toString();
+    const response = await fetch(`${this.baseURL}${endpoint}${query ? `?${query}` : ''}`, {
+      headers: {
+        'Content-Type': 'application/json',
+        ...(token && { 'Authorization': `Bearer ${token}` }),
+      },
+    });
+    const data = await response.json();
+
+    if (!response.ok) {
+      throw new Error(data.detail || `HTTP Error: ${response.status}`);
+    }
+
+    return { items: data, nextCursor: response.headers.get('X-Next-Cursor') };
+  }
+
   // Auth
   async login(username, password) {
     const data = await this.request('/auth/token', {
@@ -66,13 +88,19 @@ class ApiService {
     });
   }
 
-  async getAllUsers() {
-    return this.request('/users/');
+  async getAllUsers(params = {}) {
+    return this.requestPage('/users/', params);
   }
 
   // Fiches Lapin
-  async getAllFiches() {
-    return this.request('/ficheslapin/');
+  // Une page ; filtres et tri appliqués côté serveur : { limit, cursor, sexe, date_arrivee_min, sort, ... }
+  async getAllFiches(params = {}) {
+    return this.requestPage('/ficheslapin/', params);
+  }
+
+  // Recherche plein texte côté serveur (nom, caractère, santé...), une page par appel
+  async searchFiches(q, params = {}) {
+    return this.requestPage('/ficheslapin/search', { q, ...params });
   }
 
   async getFicheById(id) {
@@ -100,8 +128,8 @@ class ApiService {
   }
 
   // Posts
-  async getAllPosts() {
-    return this.request('/posts/');
+  async getAllPosts(params = {}) {
+    return this.requestPage('/posts/', params);
   }
 
   async createPost(postData) {